@@ -3,6 +3,7 @@ from __future__ import annotations
 from typing import List, Dict, Optional, Any, Tuple
 import math
 import re
+import time
 
 from sympy import (
     simplify,
@@ -28,6 +29,7 @@ from sympy.parsing.sympy_parser import (
 )
 from sympy import Matrix
 from libs.schemas import CASJob, CASResult
+from libs.tracing import span
 
 
 # =====================================================================
@@ -48,33 +50,39 @@ SAFE_FUNCS = {
 }
 
 
-def run_cas(jobs: List[CASJob]) -> List[CASResult]:
+def run_cas(jobs: List[CASJob], stats: Optional[Dict[str, float]] = None) -> List[CASResult]:
+    """stats가 주어지면 {"jobs": n, "simplify_s": 초}를 누적 (프로세스풀 경계 너머로 반환용)."""
     out: List[CASResult] = []
     for j in jobs:
         expr_s = j.expr.strip()
-        try:
-            # allow only whitelisted function calls before parsing
-            for match in re.finditer(r"([A-Za-z_][A-Za-z0-9_]*)\s*\(", expr_s):
-                name = match.group(1)
-                if name not in SAFE_FUNCS:
-                    raise ValueError(f"function {name} not allowed")
-
-            transformations = standard_transformations + (implicit_multiplication_application,)
-            expr = parse_expr(expr_s, transformations=transformations, local_dict=SAFE_FUNCS)
-
-            for f in expr.atoms(Function):
-                name = f.func.__name__
-                if name not in SAFE_FUNCS:
-                    raise ValueError(f"function {name} not allowed")
-
-            val = simplify(expr)
-            out.append(CASResult(id=j.id, result_tex=latex(val), result_py=str(val)))
-        except Exception as e:
-            import traceback
-            error_detail = (
-                f"CAS error in {j.id}: {e}\nExpression: {expr_s}\nTraceback: {traceback.format_exc()}"
-            )
-            raise ValueError(error_detail)
+        with span("cas.job", cat="cas", id=j.id):
+            try:
+                # allow only whitelisted function calls before parsing
+                for match in re.finditer(r"([A-Za-z_][A-Za-z0-9_]*)\s*\(", expr_s):
+                    name = match.group(1)
+                    if name not in SAFE_FUNCS:
+                        raise ValueError(f"function {name} not allowed")
+
+                transformations = standard_transformations + (implicit_multiplication_application,)
+                expr = parse_expr(expr_s, transformations=transformations, local_dict=SAFE_FUNCS)
+
+                for f in expr.atoms(Function):
+                    name = f.func.__name__
+                    if name not in SAFE_FUNCS:
+                        raise ValueError(f"function {name} not allowed")
+
+                t0 = time.perf_counter()
+                val = simplify(expr)
+                if stats is not None:
+                    stats["jobs"] = stats.get("jobs", 0) + 1
+                    stats["simplify_s"] = stats.get("simplify_s", 0.0) + (time.perf_counter() - t0)
+                out.append(CASResult(id=j.id, result_tex=latex(val), result_py=str(val)))
+            except Exception as e:
+                import traceback
+                error_detail = (
+                    f"CAS error in {j.id}: {e}\nExpression: {expr_s}\nTraceback: {traceback.format_exc()}"
+                )
+                raise ValueError(error_detail)
     return out
 
 
@@ -268,8 +276,10 @@ def _generate_seed_variants(
 # -------------------------
 
 def run_geocas(constraint_spec: Optional[Dict] = None,
-               hint: Optional[Dict] = None) -> Dict:
+               hint: Optional[Dict] = None,
+               stats: Optional[Dict[str, float]] = None) -> Dict:
     """
+    stats가 주어지면 nsolve 시드 시도/실패 횟수를 누적 ({"seed_attempts", "seed_failures"}).
     ExactGeometry dict 반환:
     {
       "frame": "unit_circle",
@@ -348,10 +358,13 @@ def run_geocas(constraint_spec: Optional[Dict] = None,
     best = None  # (residual, solved_dict)
 
     if unknown_syms:
-        for seed in seed_list:
+        for seed_idx, seed in enumerate(seed_list):
             x0 = [seed[lbl] for lbl in point_labels if lbl != ref_lbl]
+            if stats is not None:
+                stats["seed_attempts"] = stats.get("seed_attempts", 0) + 1
             try:
-                sol_vec = nsolve([e.lhs - e.rhs for e in eqs_to_solve], unknown_syms, x0, tol=1e-14, maxsteps=200)
+                with span("geocas.nsolve", cat="geocas", seed=seed_idx):
+                    sol_vec = nsolve([e.lhs - e.rhs for e in eqs_to_solve], unknown_syms, x0, tol=1e-14, maxsteps=200)
                 solved = {ref_lbl: 0.0}
                 for sym, val in zip(unknown_syms, list(sol_vec)):
                     solved[str(sym)[2:]] = _wrap_pipi(float(val))
@@ -368,6 +381,8 @@ def run_geocas(constraint_spec: Optional[Dict] = None,
                     best = cand
             except Exception:
                 # 실패 시 다음 시드로
+                if stats is not None:
+                    stats["seed_failures"] = stats.get("seed_failures", 0) + 1
                 continue
 
         # 모든 시드 실패 → 폴백(초기값)
@@ -434,3 +449,18 @@ def run_geocas(constraint_spec: Optional[Dict] = None,
                     raise ValueError(f"Noncollinear violated: {X},{Y},{Z} are collinear")
 
     return exact
+
+
+# =====================================================================
+# 프로세스풀 실행용 래퍼: 결과와 함께 stats를 반환 (부모 프로세스에서 메트릭 집계)
+# =====================================================================
+
+def run_cas_with_stats(jobs: List[CASJob]) -> Tuple[List[CASResult], Dict[str, float]]:
+    stats: Dict[str, float] = {}
+    return run_cas(jobs, stats=stats), stats
+
+
+def run_geocas_with_stats(constraint_spec: Optional[Dict] = None,
+                          hint: Optional[Dict] = None) -> Tuple[Dict, Dict[str, float]]:
+    stats: Dict[str, float] = {}
+    return run_geocas(constraint_spec=constraint_spec, hint=hint, stats=stats), stats
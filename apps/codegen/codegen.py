@@ -1,19 +1,33 @@
 import re
 import time
-import base64
+import asyncio
+import functools
 import json
 import logging
 import os
+from collections import deque
 from tomllib import load
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Set
+from typing import Callable, Deque, List, Dict, Any, Optional, Set
 
-from openai import APIError, RateLimitError
-from libs.tokens import get_openai_client
-from libs.schemas import ProblemDoc, CodegenJob
+from libs.tokens import get_openai_client, get_async_openai_client
+from libs.metrics import CACHE_REQUESTS, LLM_CANDIDATES, LLM_ESCALATIONS, LLM_FALLBACKS, LLM_REPAIRS, LLM_STREAM_ABORTS, PROMPT_TOKENS_EST, record_llm_usage
+from libs.tracing import span
+from libs import cassette, llm_cache, retry
+from libs.compact import compact_payload
+from libs.imageprep import PreparedImage, prepare_images
+from libs.io_utils import sha256_str
+from apps.codegen.stream import CAS_JOB_RE, ContractStreamParser, StreamEvent
+from libs.schemas import ProblemDoc, CodegenJob, ConstraintSpec
 from libs.layout import reading_order
-from apps.router.router import PICTURE_CATS
-from apps.render.fill import collect_geo_placeholders, extract_geo_labels
+from apps.router.router import PICTURE_CATS, route_problem
+from apps.render.fill import (
+    collect_cas_placeholders,
+    collect_geo_placeholders,
+    detect_invalid_cas_token_patterns,
+    detect_numeric_point_literals,
+    extract_geo_labels,
+)
 
 # -------------------------------
 # Debug helpers
@@ -37,10 +51,14 @@ CONFIGS = Path(__file__).parents[2] / "configs"
 # SoT: 항상 system_prompt.txt만 사용
 SYSTEM_PROMPT_PATH = Path(__file__).parents[2] / "system_prompt.txt"
 SYSTEM_PROMPT_TEXT = SYSTEM_PROMPT_PATH.read_text(encoding="utf-8")
+# 프롬프트 캐시 라우팅 키: 같은 시스템 프롬프트를 쓰는 요청이 같은 캐시 샤드로 가도록 (프롬프트가 바뀌면 키도 바뀜)
+PROMPT_CACHE_KEY = f"manion-codegen-{sha256_str(SYSTEM_PROMPT_TEXT)[:16]}"
 
 IMAGE_CATS = {"Formula", "Picture", "Diagram", "Graph", "Figure"}
 
+@functools.lru_cache(maxsize=1)
 def _cfg():
+    # 프로세스당 한 번만 파싱 (설정 변경 시 _cfg.cache_clear())
     with open(CONFIGS / "openai.toml", "rb") as f:
         return load(f)
 
@@ -50,50 +68,88 @@ def _sys_text(with_image: bool) -> str:
 
 # -------------------------------
 # 메시지 구성 (Responses / Chat)
+#   [정적 prefix: 시스템 프롬프트] + [문제별: 메타/OCR/힌트/이미지]
+#   prefix 는 모든 호출에서 바이트 단위로 동일해야 프롬프트 캐시(cached_tokens)가 적중한다.
+#   → 문제별 값(경로, HAS_DIAGRAM, 이미지 등)을 system 메시지에 넣지 말 것.
 # -------------------------------
 
-def _build_user_parts_for_chat(doc: ProblemDoc, with_image: bool, has_diagram: bool) -> List[Dict[str, Any]]:
-    ocr_dump = [{"bbox": i.bbox, "category": i.category, "text": i.text} for i in doc.items]
-    hint = f"\n\nGEOMETRY_HINT:\n{json.dumps(getattr(doc, 'geometry_hint', None), ensure_ascii=False)}" \
-        if getattr(doc, "geometry_hint", None) else ""
-    meta_line = f"HAS_DIAGRAM: {str(has_diagram).lower()}"
-    text = f"{meta_line}\nIMAGE_PATH: {doc.image_path or 'N/A'}\n\nOCR_JSON:\n{json.dumps(ocr_dump, ensure_ascii=False)}{hint}"
+def _static_prefix(responses_api: bool) -> tuple:
+    """캐시 가능한 정적 prefix 메시지 (문제와 무관, 호출마다 바이트 동일)."""
+    text = _sys_text(with_image=False)
+    if responses_api:
+        return ({"role": "system", "content": [{"type": "input_text", "text": text}]},)
+    return ({"role": "system", "content": text},)
 
-    parts: List[Dict[str, Any]] = [{"type": "text", "text": text}]
-    if doc.image_path:
+def _prepared_images(doc: ProblemDoc) -> List[PreparedImage]:
+    """
+    업로드 버퍼(doc.image_bytes)가 있으면 그대로, 없으면 image_path에서 읽어
+    [image] 설정대로 전처리 (실제 MIME, 긴 변 상한, 선택적으로 Picture/Formula 크롭 + 썸네일).
+    """
+    img_bytes = getattr(doc, "image_bytes", None)
+    if img_bytes is None:
+        if not doc.image_path:
+            return []
         try:
             img_bytes = Path(doc.image_path).read_bytes()
-            img_b64 = base64.b64encode(img_bytes).decode("utf-8")
-            parts.insert(0, {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{img_b64}"}})
         except OSError:
-            pass
+            return []
+    with span("codegen.imageprep", cat="codegen") as args:
+        images = prepare_images(img_bytes, doc.items, _cfg().get("image", {}))
+        args.update(bytes_in=len(img_bytes), bytes_out=sum(len(im.data) for im in images), images=len(images))
+    return images
+
+def _user_text(doc: ProblemDoc, has_diagram: bool) -> str:
+    """
+    문제별 텍스트 (HAS_DIAGRAM / IMAGE_PATH / OCR / GEOMETRY_HINT).
+    [prompt] compact = true 면 OCR_TABLE + 표 형식 GEOMETRY_HINT (libs/compact.py), 아니면 원본 JSON.
+    """
+    ocr_dump = [{"bbox": i.bbox, "category": i.category, "text": i.text} for i in doc.items]
+    geometry_hint = getattr(doc, "geometry_hint", None)
+    meta_line = f"HAS_DIAGRAM: {str(has_diagram).lower()}\nIMAGE_PATH: {doc.image_path or 'N/A'}"
+    prompt_cfg = _cfg().get("prompt", {})
+    if not prompt_cfg.get("compact", False):
+        hint = f"\n\nGEOMETRY_HINT:\n{json.dumps(geometry_hint, ensure_ascii=False)}" if geometry_hint else ""
+        return f"{meta_line}\n\nOCR_JSON:\n{json.dumps(ocr_dump, ensure_ascii=False)}{hint}"
+
+    with span("codegen.compact", cat="codegen") as args:
+        ocr_block, hint_block, report = compact_payload(ocr_dump, geometry_hint, prompt_cfg)
+        args.update(report)
+    for part in ("ocr", "hint"):
+        if f"{part}_raw" in report:
+            PROMPT_TOKENS_EST.inc(report[f"{part}_raw"], part=part, form="raw")
+            PROMPT_TOKENS_EST.inc(report[f"{part}_compact"], part=part, form="compact")
+    logging.info("prompt compaction (est. tokens): %s", report)
+    return f"{meta_line}\n\n{ocr_block}" + (f"\n\n{hint_block}" if hint_block else "")
+
+def _build_user_parts_for_chat(doc: ProblemDoc, with_image: bool, has_diagram: bool) -> List[Dict[str, Any]]:
+    text = _user_text(doc, has_diagram)
+
+    parts: List[Dict[str, Any]] = []
+    for im in _prepared_images(doc):
+        if im.label != "page":
+            parts.append({"type": "text", "text": f"IMAGE: {im.label}"})
+        parts.append({"type": "image_url", "image_url": {"url": im.data_url()}})
+    parts.append({"type": "text", "text": text})
     return parts
 
 def _build_messages_for_chat(doc: ProblemDoc, with_image: bool, has_diagram: bool) -> List[Dict[str, Any]]:
     return [
-        {"role": "system", "content": _sys_text(with_image)},
+        *_static_prefix(False),
         {"role": "user", "content": _build_user_parts_for_chat(doc, with_image, has_diagram)},
     ]
 
 def _build_messages_for_responses(doc: ProblemDoc, with_image: bool, has_diagram: bool) -> List[Dict[str, Any]]:
-    ocr_dump = [{"bbox": i.bbox, "category": i.category, "text": i.text} for i in doc.items]
-    hint = f"\n\nGEOMETRY_HINT:\n{json.dumps(getattr(doc, 'geometry_hint', None), ensure_ascii=False)}" \
-        if getattr(doc, "geometry_hint", None) else ""
-    meta_line = f"HAS_DIAGRAM: {str(has_diagram).lower()}"
-    user_text = f"{meta_line}\nIMAGE_PATH: {doc.image_path or 'N/A'}\n\nOCR_JSON:\n{json.dumps(ocr_dump, ensure_ascii=False)}{hint}"
+    user_text = _user_text(doc, has_diagram)
 
     user_parts: List[Dict[str, Any]] = []
-    if doc.image_path:
-        try:
-            img_bytes = Path(doc.image_path).read_bytes()
-            img_b64 = base64.b64encode(img_bytes).decode("utf-8")
-            user_parts.append({"type": "input_image", "image_url": f"data:image/jpeg;base64,{img_b64}"})
-        except OSError:
-            pass
+    for im in _prepared_images(doc):
+        if im.label != "page":
+            user_parts.append({"type": "input_text", "text": f"IMAGE: {im.label}"})
+        user_parts.append({"type": "input_image", "image_url": im.data_url()})
     user_parts.append({"type": "input_text", "text": user_text})
 
     return [
-        {"role": "system", "content": [{"type": "input_text", "text": _sys_text(with_image)}]},
+        *_static_prefix(True),
         {"role": "user", "content": user_parts},
     ]
 
@@ -101,6 +157,38 @@ def _build_messages_for_responses(doc: ProblemDoc, with_image: bool, has_diagram
 # OpenAI 호출 (재시도 포함)
 # -------------------------------
 
+# SDK 가 responses.create(response_format=...) 를 받는지: TypeError(요청 전 로컬 시그니처 오류)로 프로세스당 한 번 판정
+_RESPONSE_FORMAT_OK: Optional[bool] = None
+
+def _retry_policy() -> retry.RetryPolicy:
+    return retry.RetryPolicy.from_config(_cfg().get("retry", {}))
+
+def _breaker(model: str) -> retry.CircuitBreaker:
+    return retry.breaker_for(model, _cfg().get("breaker", {}))
+
+def _responses_kwargs(
+    model: str, messages: List[Dict[str, Any]], max_tokens: int, temperature: Optional[float], text_format: bool
+) -> Dict[str, Any]:
+    if text_format:
+        kwargs = {
+            "model": model,
+            "input": messages,
+            "text": {"format": {"type": "text"}},
+            "max_output_tokens": max_tokens,
+            "extra_body": {"prompt_cache_key": PROMPT_CACHE_KEY},
+        }
+    else:
+        kwargs = {
+            "model": model,
+            "input": messages,
+            "response_format": {"type": "text"},
+            "max_output_tokens": max_tokens,
+            "extra_body": {"prompt_cache_key": PROMPT_CACHE_KEY},
+        }
+    if temperature is not None:
+        kwargs["temperature"] = temperature
+    return kwargs
+
 def _responses_create_with_retry(
     client,
     *,
@@ -109,44 +197,133 @@ def _responses_create_with_retry(
     max_tokens: int,
     temperature: Optional[float] = None,
 ):
-    for i in range(3):
-        try:
-            kwargs = {
-                "model": model,
-                "input": messages,
-                "response_format": {"type": "text"},
-                "max_output_tokens": max_tokens,
-            }
-            if temperature is not None:
-                kwargs["temperature"] = temperature
-            return client.responses.create(**kwargs)
-        except TypeError:
+    """재시도/브레이커는 libs.retry (동기 경로: CLI/배치 워커)."""
+    def attempt(i: int):
+        global _RESPONSE_FORMAT_OK
+        if _RESPONSE_FORMAT_OK is not False:
+            kwargs = _responses_kwargs(model, messages, max_tokens, temperature, text_format=False)
             try:
-                kwargs = {
-                    "model": model,
-                    "input": messages,
-                    "text": {"format": {"type": "text"}},
-                }
-                if temperature is not None:
-                    kwargs["temperature"] = temperature
-                return client.responses.create(**kwargs)
-            except (RateLimitError, APIError):
-                if i == 2:
-                    raise
-                time.sleep(2 ** i)
-        except (RateLimitError, APIError):
-            if i == 2:
-                raise
-            time.sleep(2 ** i)
+                with span("llm.attempt", cat="llm", model=model, attempt=i):
+                    resp = client.responses.create(**kwargs)
+            except TypeError:
+                _RESPONSE_FORMAT_OK = False
+            else:
+                _RESPONSE_FORMAT_OK = True
+                return resp
+        kwargs = _responses_kwargs(model, messages, max_tokens, temperature, text_format=True)
+        with span("llm.attempt", cat="llm", model=model, attempt=i, api="responses.text"):
+            return client.responses.create(**kwargs)
+
+    return retry.call(attempt, _retry_policy(), _breaker(model))
 
 def _chat_completion_with_retry(client, **kwargs):
-    for i in range(3):
-        try:
+    def attempt(i: int):
+        with span("llm.attempt", cat="llm", model=kwargs.get("model"), attempt=i):
             return client.chat.completions.create(**kwargs)
-        except (RateLimitError, APIError):
-            if i == 2:
-                raise
-            time.sleep(2 ** i)
+
+    return retry.call(attempt, _retry_policy(), _breaker(kwargs["model"]))
+
+async def _aresponses_create_with_retry(
+    client,
+    *,
+    model: str,
+    messages: List[Dict[str, Any]],
+    max_tokens: int,
+    temperature: Optional[float] = None,
+):
+    """``_responses_create_with_retry``의 AsyncOpenAI 버전 (대기는 asyncio.sleep, event loop를 막지 않음)."""
+    async def attempt(i: int):
+        global _RESPONSE_FORMAT_OK
+        if _RESPONSE_FORMAT_OK is not False:
+            kwargs = _responses_kwargs(model, messages, max_tokens, temperature, text_format=False)
+            try:
+                with span("llm.attempt", cat="llm", model=model, attempt=i):
+                    resp = await client.responses.create(**kwargs)
+            except TypeError:
+                _RESPONSE_FORMAT_OK = False
+            else:
+                _RESPONSE_FORMAT_OK = True
+                return resp
+        kwargs = _responses_kwargs(model, messages, max_tokens, temperature, text_format=True)
+        with span("llm.attempt", cat="llm", model=model, attempt=i, api="responses.text"):
+            return await client.responses.create(**kwargs)
+
+    return await retry.acall(attempt, _retry_policy(), _breaker(model))
+
+async def _achat_completion_with_retry(client, **kwargs):
+    async def attempt(i: int):
+        with span("llm.attempt", cat="llm", model=kwargs.get("model"), attempt=i):
+            return await client.chat.completions.create(**kwargs)
+
+    return await retry.acall(attempt, _retry_policy(), _breaker(kwargs["model"]))
+
+async def _aresponses_stream_with_retry(
+    client,
+    *,
+    model: str,
+    messages: List[Dict[str, Any]],
+    max_tokens: int,
+    temperature: Optional[float] = None,
+    on_delta: Callable[[str], None],
+):
+    """
+    Responses API 스트리밍: 텍스트 조각마다 on_delta 호출, 완료 응답(usage 포함)을 반환.
+    재시도는 첫 조각 전에 실패한 경우만 (이미 소비한 조각을 되돌릴 수 없으므로).
+    kwargs 는 실제로 쓰이는 non-stream 폴백 경로(text.format)와 동일하게 맞춘다.
+    """
+    received = False
+
+    async def attempt(i: int):
+        nonlocal received
+        kwargs = {**_responses_kwargs(model, messages, max_tokens, temperature, text_format=True), "stream": True}
+        with span("llm.attempt", cat="llm", model=model, attempt=i, stream=True):
+            stream = await client.responses.create(**kwargs)
+            final = None
+            try:
+                async for ev in stream:
+                    etype = getattr(ev, "type", "")
+                    if etype == "response.output_text.delta":
+                        received = True
+                        on_delta(ev.delta)
+                    elif etype == "response.completed":
+                        final = getattr(ev, "response", None)
+            finally:
+                close = getattr(stream, "close", None)
+                if close is not None:
+                    await close()
+            return final
+
+    return await retry.acall(attempt, _retry_policy(), _breaker(model), should_retry=lambda e: not received)
+
+def _fallback_model(model: str) -> Optional[str]:
+    """[models] fallback: 같은 API 계열(Responses/Chat)일 때만 (messages 형식이 같아야 함)."""
+    fb = _cfg().get("models", {}).get("fallback") or None
+    if not fb or fb == model or _uses_responses_api(fb) != _uses_responses_api(model):
+        return None
+    return fb
+
+def _with_fallback(model: str, fn: Callable[[str], Any]) -> Any:
+    """fn(model) 호출; 모델 브레이커가 열려 있으면(CircuitOpen) 폴백 모델로 한 번 더, 폴백이 없으면 즉시 실패."""
+    try:
+        return fn(model)
+    except retry.CircuitOpen:
+        fb = _fallback_model(model)
+        if fb is None:
+            raise
+        LLM_FALLBACKS.inc(model=model, fallback=fb)
+        logging.warning("circuit open for %s; using fallback model %s", model, fb)
+        return fn(fb)
+
+async def _awith_fallback(model: str, fn: Callable[[str], Any]) -> Any:
+    try:
+        return await fn(model)
+    except retry.CircuitOpen:
+        fb = _fallback_model(model)
+        if fb is None:
+            raise
+        LLM_FALLBACKS.inc(model=model, fallback=fb)
+        logging.warning("circuit open for %s; using fallback model %s", model, fb)
+        return await fn(fb)
 
 def _extract_text_from_responses(resp) -> str:
     text = getattr(resp, "output_text", None)
@@ -237,54 +414,560 @@ def _geojobs_sanity(constraint_spec: Optional[dict], draft_code: str) -> Optiona
 # 본체
 # -------------------------------
 
-def generate_manim(doc: ProblemDoc) -> CodegenJob:
+class _Budget:
+    """
+    generate_manim/agenerate_manim 1회의 LLM 지출 상한. 후보·hedge·재시도, 스트림 재요청, 부분 수리,
+    에스컬레이션이 모두 같은 예산을 쓴다 (escalated prep 도 같은 객체를 공유).
+    calls: 네트워크 호출 수 (cassette/캐시 적중 제외), tokens: 완료된 호출의 usage 합 (max_tokens 0 = 무제한).
+    """
+    def __init__(self, max_calls: int, max_tokens: int):
+        self.max_calls = max_calls
+        self.max_tokens = max_tokens
+        self.calls = 0
+        self.tokens = 0
+
+    def available(self) -> bool:
+        if self.calls >= self.max_calls:
+            return False
+        return self.max_tokens <= 0 or self.tokens < self.max_tokens
+
+    def take_call(self) -> None:
+        self.calls += 1
+
+    def add_tokens(self, n: int) -> None:
+        self.tokens += n
+
+def _prepare_codegen(doc: ProblemDoc) -> Dict[str, Any]:
+    """읽기 순서 정렬 + 모델/생성 파라미터 결정 (sync/async 공용)."""
     cfg = _cfg()
-    client = get_openai_client()
 
     # 읽기 순서 정렬 및 geometry_hint 인계
     sorted_items = reading_order(list(doc.items))
-    doc = ProblemDoc(items=sorted_items, image_path=doc.image_path, geometry_hint=getattr(doc, "geometry_hint", None))
-    with_image = bool(doc.image_path) or any(i.category in IMAGE_CATS for i in doc.items)
+    doc = ProblemDoc(
+        items=sorted_items,
+        image_path=doc.image_path,
+        geometry_hint=getattr(doc, "geometry_hint", None),
+        image_bytes=getattr(doc, "image_bytes", None),
+    )
+    with_image = bool(doc.image_path or doc.image_bytes) or any(i.category in IMAGE_CATS for i in doc.items)
     has_diagram = any(i.category in PICTURE_CATS for i in doc.items)
 
-    model = cfg["models"]["codegen"]
     gen_cfg = cfg.get("gen", {})
-    temperature = gen_cfg.get("temperature")
-    max_tokens = gen_cfg.get("max_tokens", 4096)
+    route = route_problem(doc)
+    model, escalate_to = _select_model(route, cfg["models"])
 
     # 문제 이름(디버그 저장용)
     problem_name = Path(doc.image_path).stem if doc.image_path else "unknown"
-    dd = _debug_dir(problem_name) if _is_debug() else None
-
-    # --- LLM 호출
-    if "gpt-5" in model.lower():
-        # Responses API
-        messages = _build_messages_for_responses(doc, with_image, has_diagram)
-        resp = _responses_create_with_retry(
-            client,
-            model=model,
-            messages=messages,
-            max_tokens=max_tokens,
-            temperature=temperature,
-        )
-        text = _extract_text_from_responses(resp)
-    else:
-        # Chat Completions
-        messages = _build_messages_for_chat(doc, with_image, has_diagram)
-        kwargs = {"model": model, "messages": messages, "max_tokens": max_tokens}
+
+    return {
+        "doc": doc,
+        "with_image": with_image,
+        "has_diagram": has_diagram,
+        "model": model,
+        "escalate_to": escalate_to,
+        "route": route,
+        "temperature": gen_cfg.get("temperature"),
+        "max_tokens": gen_cfg.get("max_tokens", 4096),
+        "dd": _debug_dir(problem_name) if _is_debug() else None,
+        "stream": bool(gen_cfg.get("stream", False)),
+        "contract_retries": int(gen_cfg.get("contract_retries", 1)),
+        "repair_rounds": int(gen_cfg.get("repair_rounds", 1)),
+        "repair_max_tokens": gen_cfg.get("repair_max_tokens", 1024),
+        "candidates": max(1, int(gen_cfg.get("candidates", 1))),
+        "hedge_after_s": float(gen_cfg.get("hedge_after_s", 0.0)),
+        "hedge_percentile": float(gen_cfg.get("hedge_percentile", 95)),
+        "budget": _Budget(
+            max(1, int(gen_cfg.get("max_calls_per_request", 4))), int(gen_cfg.get("max_spend_tokens", 0))
+        ),
+    }
+
+def _select_model(route: Dict[str, Any], models_cfg: Dict[str, Any]) -> tuple:
+    """
+    [[models.tiers]]: 위에서부터 when 의 키(route_problem 출력)가 모두 일치하는 첫 티어의 모델.
+    반환 (model, escalate_to): 티어 모델이면 escalate_to = models.codegen (검증 실패 시 재생성), 아니면 None.
+    """
+    big = models_cfg["codegen"]
+    for tier in models_cfg.get("tiers", []) or []:
+        when = tier.get("when", {}) or {}
+        if all(route.get(k) == v for k, v in when.items()):
+            model = tier.get("model") or big
+            if model == big or not tier.get("escalate", True):
+                return model, None
+            return model, big
+    return big, None
+
+def _escalated(prep: Dict[str, Any], error: Exception) -> Optional[Dict[str, Any]]:
+    """티어 모델 출력이 검증에 실패했을 때 큰 모델로 다시 돌릴 prep (에스컬레이션 대상이 없으면 None)."""
+    big = prep["escalate_to"]
+    if not big:
+        return None
+    if not prep["budget"].available():
+        logging.warning("codegen with %s failed validation (%s); spend limit reached, not escalating", prep["model"], error)
+        return None
+    LLM_ESCALATIONS.inc(from_model=prep["model"], to_model=big)
+    logging.warning("codegen with %s failed validation (%s); escalating to %s", prep["model"], error, big)
+    return {**prep, "model": big, "escalate_to": None}
+
+def _check_tier_output(prep: Dict[str, Any], cj: CodegenJob) -> None:
+    """티어(저가) 모델 출력은 서버 validate 단계 기준까지 미리 확인 → 실패면 에스컬레이션."""
+    if prep["escalate_to"]:
+        problem = validate_placeholders(cj, prep["has_diagram"])
+        if problem:
+            raise ValueError(problem)
+
+def _uses_responses_api(model: str) -> bool:
+    return "gpt-5" in model.lower()
+
+class ContractViolation(ValueError):
+    """MANIM_CODE 만으로 입증된 계약 위반 (스트리밍이면 생성을 중단하고 재시도)."""
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason   # "no_geo" | "dynamic_cas" | "numeric_coord"
+
+def _scan_manim_lines(code: str, has_diagram: bool) -> None:
+    """완결된 MANIM_CODE 줄들에서 나머지 출력과 무관하게 확정되는 위반을 찾는다."""
+    offenders = detect_invalid_cas_token_patterns(code)
+    if offenders:
+        raise ContractViolation("dynamic_cas", f"Malformed CAS token(s): {offenders[:3]}")
+    if has_diagram:
+        offenders = detect_numeric_point_literals(code)
+        if offenders:
+            raise ContractViolation(
+                "numeric_coord", f"Numeric coordinate literal(s) where [[GEO:point:*]] is required: {offenders[:3]}"
+            )
+
+class _StreamDispatcher:
+    """
+    ContractStreamParser 이벤트 → 조기 가드 검사 + 호출자 콜백.
+      - MANIM_CODE 줄이 끝날 때마다: 동적 CAS 토큰 / 수치 좌표 리터럴 검사 → 위반이면 즉시 중단(ContractViolation)
+      - manim_done: 하드가드(도형인데 GEO 토큰 없음)를 즉시 검사
+      - constraint_spec: 최종 파서와 같은 sanity/정규화를 거쳐 전달 (선행 GeoCAS 입력과 최종값 비교용)
+      - cas_job: 그대로 전달 (선행 CAS)
+    위반은 모두 MANIM_CODE 안에서 판정되므로 중단된 시도는 선행 작업 이벤트를 남기지 않는다.
+    """
+    def __init__(self, has_diagram: bool, on_event: Optional[Callable[[StreamEvent], None]]):
+        self.parser = ContractStreamParser()
+        self.has_diagram = has_diagram
+        self.on_event = on_event
+        self.draft: Optional[str] = None
+        self._scanned = 0   # MANIM_CODE 중 검사를 마친 위치
+
+    def feed(self, delta: str) -> None:
+        self._step(self.parser.feed(delta))
+
+    def close(self) -> str:
+        self._step(self.parser.close())
+        return self.parser.text.strip()
+
+    def _step(self, events: List[StreamEvent]) -> None:
+        if self.draft is None:
+            done = next((ev for ev in events if ev.kind == "manim_done"), None)
+            end = len(done.data) if done is not None else self.parser.text.rfind("\n") + 1
+            if end > self._scanned:
+                _scan_manim_lines(self.parser.text[self._scanned:end], self.has_diagram)
+                self._scanned = end
+        self._handle(events)
+
+    def _handle(self, events: List[StreamEvent]) -> None:
+        for ev in events:
+            if ev.kind == "manim_done":
+                self.draft = _cas_surface(_strip_code_fence(ev.data))
+                _check_manim_guards(self.draft, self.has_diagram)
+            elif ev.kind == "constraint_spec":
+                spec = _geojobs_sanity(ev.data, self.draft or "")
+                ev = StreamEvent(ev.kind, ConstraintSpec.model_validate(spec).model_dump())
+            if self.on_event is not None and ev.kind != "manim_done":
+                self.on_event(ev)
+
+def _contract_retry_messages(messages: List[Dict[str, Any]], violation: ContractViolation) -> List[Dict[str, Any]]:
+    note = (
+        f"이전 출력은 계약 위반으로 중단되었습니다: {violation}\n"
+        "규칙(좌표는 [[GEO:*]] 토큰, 계산값은 리터럴 [[CAS:ID]])을 지켜 처음부터 다시 작성하세요."
+    )
+    return messages + [{"role": "user", "content": [{"type": "input_text", "text": note}]}]
+
+async def _astream_codegen(
+    client,
+    prep: Dict[str, Any],
+    messages: List[Dict[str, Any]],
+    on_event: Optional[Callable[[StreamEvent], None]],
+) -> tuple:
+    """
+    스트리밍 생성 + 조기 중단: 위반이 입증되는 즉시 스트림을 닫고(남은 출력 토큰 미지불)
+    위반 내용을 덧붙여 재요청. [gen] contract_retries 회 초과 시 마지막 위반을 그대로 올린다.
+    """
+    model, budget = prep["model"], prep["budget"]
+    attempt_messages = messages
+    for attempt in range(prep["contract_retries"] + 1):
+        d = _StreamDispatcher(prep["has_diagram"], on_event)
+        budget.take_call()
+        try:
+            resp = await _awith_fallback(model, lambda m: _aresponses_stream_with_retry(
+                client,
+                model=m,
+                messages=attempt_messages,
+                max_tokens=prep["max_tokens"],
+                temperature=prep["temperature"],
+                on_delta=d.feed,
+            ))
+            return resp, d.close()
+        except ContractViolation as e:
+            LLM_STREAM_ABORTS.inc(reason=e.reason, model=model)
+            record_llm_usage(None, model)   # 중단된 시도: 요청 수만 (usage 없음)
+            logging.warning("codegen stream aborted (attempt %d, %s): %s", attempt + 1, e.reason, e)
+            if attempt == prep["contract_retries"] or not budget.available():
+                raise
+            attempt_messages = _contract_retry_messages(messages, e)
+
+def _build_messages(doc: ProblemDoc, model: str, with_image: bool, has_diagram: bool) -> List[Dict[str, Any]]:
+    if _uses_responses_api(model):
+        return _build_messages_for_responses(doc, with_image, has_diagram)
+    return _build_messages_for_chat(doc, with_image, has_diagram)
+
+def _call_llm(client, model: str, messages: List[Dict[str, Any]], max_tokens: int, temperature: Optional[float]):
+    """단발 호출 → (resp, text). Responses/Chat 분기 공용, 브레이커가 열려 있으면 [models] fallback."""
+    def once(m: str):
+        if _uses_responses_api(m):
+            resp = _responses_create_with_retry(
+                client,
+                model=m,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+            )
+            return resp, _extract_text_from_responses(resp)
+        kwargs = {"model": m, "messages": messages, "max_tokens": max_tokens}
         if temperature is not None:
             kwargs["temperature"] = temperature
         resp = _chat_completion_with_retry(client, **kwargs)
-        text = resp.choices[0].message.content.strip()
+        return resp, resp.choices[0].message.content.strip()
 
-    if _is_debug() and dd:
-        (dd / "01_llm_raw.txt").write_text(text, encoding="utf-8")
+    return _with_fallback(model, once)
 
-    # --- 파싱 (계약: <MANIM_CODE> [---GEO-JOBS---] [---CAS-JOBS---])
+async def _acall_llm(client, model: str, messages: List[Dict[str, Any]], max_tokens: int, temperature: Optional[float]):
+    async def once(m: str):
+        if _uses_responses_api(m):
+            resp = await _aresponses_create_with_retry(
+                client,
+                model=m,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+            )
+            return resp, _extract_text_from_responses(resp)
+        kwargs = {"model": m, "messages": messages, "max_tokens": max_tokens}
+        if temperature is not None:
+            kwargs["temperature"] = temperature
+        resp = await _achat_completion_with_retry(client, **kwargs)
+        return resp, resp.choices[0].message.content.strip()
+
+    return await _awith_fallback(model, once)
+
+class _ResponseSlot:
+    """
+    저장된 응답 조회와 새 응답 저장을 한 곳에서:
+      조회: cassette replay → LLM 응답 캐시([llm_cache], MANION_LLM_CACHE) → (없으면 호출자가 네트워크)
+      저장: cassette record + 캐시 put
+    lookup/save 는 파일 I/O 라 async 경로에서는 asyncio.to_thread 로 부른다 (alookup/asave).
+    """
+    def __init__(self, model: str, messages: List[Dict[str, Any]], max_tokens: int, temperature: Optional[float]):
+        self.model = model
+        self.cassette_key = cassette.key_for(model, messages)
+        self.cache_key = llm_cache.LLMResponseCache.key_for(
+            model, {"max_tokens": max_tokens, "temperature": temperature}, messages
+        )
+        self.cache: Optional[llm_cache.LLMResponseCache] = None
+
+    def lookup(self) -> Optional[str]:
+        text = cassette.replay(self.cassette_key)
+        cache_cfg = _cfg().get("llm_cache", {})
+        cache_mode = llm_cache.mode(cache_cfg)
+        self.cache = llm_cache.from_config(cache_cfg) if cache_mode != llm_cache.OFF else None
+        if text is None and cache_mode == llm_cache.ON:
+            text = self.cache.get(self.cache_key)
+            CACHE_REQUESTS.inc(cache="llm", result="hit" if text is not None else "miss")
+            if text is not None:
+                cassette.record(self.cassette_key, self.model, text)
+        return text
+
+    async def alookup(self) -> Optional[str]:
+        return await asyncio.to_thread(self.lookup)
+
+    async def asave(self, text: str) -> None:
+        await asyncio.to_thread(self.save, text)
+
+    def save(self, text: str) -> None:
+        cassette.record(self.cassette_key, self.model, text)
+        if self.cache is not None:
+            self.cache.put(self.cache_key, self.model, text)
+
+def generate_manim(doc: ProblemDoc) -> CodegenJob:
+    prep = _prepare_codegen(doc)
+    try:
+        return _generate(prep)
+    except ValueError as e:
+        big = _escalated(prep, e)
+        if big is None:
+            raise
+        return _generate(big)
+
+def _generate(prep: Dict[str, Any]) -> CodegenJob:
+    doc, model = prep["doc"], prep["model"]
+    with_image, has_diagram = prep["with_image"], prep["has_diagram"]
+    messages = _build_messages(doc, model, with_image, has_diagram)
+
+    # cassette replay / LLM 응답 캐시 적중이면 클라이언트 생성·네트워크 없음
+    slot = _ResponseSlot(model, messages, prep["max_tokens"], prep["temperature"])
+    text = slot.lookup()
+    if text is None:
+        # --- LLM 호출
+        prep["budget"].take_call()
+        resp, text = _call_llm(get_openai_client(), model, messages, prep["max_tokens"], prep["temperature"])
+        prep["budget"].add_tokens(record_llm_usage(resp, model))
+        slot.save(text)
+
+    cj = _split_codegen_output(text, has_diagram=has_diagram, dd=prep["dd"])
+    for _ in range(prep["repair_rounds"]):
+        targets = _find_repair_targets(cj)
+        if not targets:
+            break
+        messages = _build_repair_messages(model, cj, targets, doc)
+        repair_slot = _ResponseSlot(model, messages, prep["repair_max_tokens"], prep["temperature"])
+        reply = repair_slot.lookup()
+        if reply is None:
+            if not _take_repair_call(prep):
+                break
+            with span("codegen.repair", cat="llm", sections=",".join(targets)):
+                resp, reply = _call_llm(get_openai_client(), model, messages, prep["repair_max_tokens"], prep["temperature"])
+            prep["budget"].add_tokens(record_llm_usage(resp, model))
+            repair_slot.save(reply)
+        cj = _apply_repair(cj, reply, targets, dd=prep["dd"])
+    _check_geo_guards(cj, has_diagram)
+    _check_tier_output(prep, cj)
+    return cj
+
+def _take_repair_call(prep: Dict[str, Any]) -> bool:
+    """부분 수리 호출도 요청 예산에서 차감. 예산이 없으면 수리 없이 진행(이후 가드/검증이 실패를 올림)."""
+    if not prep["budget"].available():
+        logging.warning("codegen repair skipped: spend limit reached")
+        return False
+    prep["budget"].take_call()
+    return True
+
+async def _afinish_codegen(prep: Dict[str, Any], text: str) -> CodegenJob:
+    """LLM 출력 → 파싱/하드가드 → 부분 수리 → GEO 가드 (async 경로 공용)."""
+    doc, model, has_diagram = prep["doc"], prep["model"], prep["has_diagram"]
+    cj = _split_codegen_output(text, has_diagram=has_diagram, dd=prep["dd"])
+    for _ in range(prep["repair_rounds"]):
+        targets = _find_repair_targets(cj)
+        if not targets:
+            break
+        messages = _build_repair_messages(model, cj, targets, doc)
+        repair_slot = _ResponseSlot(model, messages, prep["repair_max_tokens"], prep["temperature"])
+        reply = await repair_slot.alookup()
+        if reply is None:
+            if not _take_repair_call(prep):
+                break
+            with span("codegen.repair", cat="llm", sections=",".join(targets)):
+                resp, reply = await _acall_llm(
+                    get_async_openai_client(), model, messages, prep["repair_max_tokens"], prep["temperature"]
+                )
+            prep["budget"].add_tokens(record_llm_usage(resp, model))
+            await repair_slot.asave(reply)
+        cj = _apply_repair(cj, reply, targets, dd=prep["dd"])
+    _check_geo_guards(cj, has_diagram)
+    _check_tier_output(prep, cj)
+    return cj
+
+# -------------------------------
+# 다중 후보 / hedge (async 전용)
+# -------------------------------
+
+# 최근 codegen 호출 지연(초): hedge 시점을 분위수로 정할 때 사용 (프로세스 전역)
+_LATENCIES: Deque[float] = deque(maxlen=256)
+HEDGE_MIN_SAMPLES = 20
+
+def _hedge_delay(prep: Dict[str, Any]) -> Optional[float]:
+    """
+    hedge 요청을 보낼 시점(초). hedge_after_s <= 0 이면 끔.
+    최근 표본이 HEDGE_MIN_SAMPLES 이상이면 그 hedge_percentile 분위수, 아니면 hedge_after_s.
+    """
+    base = prep["hedge_after_s"]
+    if base <= 0:
+        return None
+    pct = prep["hedge_percentile"]
+    if pct > 0 and len(_LATENCIES) >= HEDGE_MIN_SAMPLES:
+        ordered = sorted(_LATENCIES)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+    return base
+
+async def _arace_candidates(prep: Dict[str, Any], messages: List[Dict[str, Any]]) -> tuple:
+    """
+    [gen] candidates 개를 동시에 생성하고(+ hedge_after 시점까지 끝나지 않으면 중복 요청 1개),
+    파싱/수리/가드/플레이스홀더 검증을 통과한 첫 후보를 채택, 나머지는 취소한다 → (text, CodegenJob).
+    모든 후보가 실패하면 예산 안에서 하나씩 더 시도하고, 그래도 실패하면 첫 실패를 올린다.
+    지출 상한: prep["budget"] (수리·에스컬레이션과 공유하는 요청 예산, _Budget).
+    """
+    model, has_diagram, budget = prep["model"], prep["has_diagram"], prep["budget"]
+    client = get_async_openai_client()
+    kinds: Dict[asyncio.Task, str] = {}
+    errors: List[Exception] = []
+
+    async def candidate() -> tuple:
+        t0 = time.perf_counter()
+        resp, text = await _acall_llm(client, model, messages, prep["max_tokens"], prep["temperature"])
+        _LATENCIES.append(time.perf_counter() - t0)
+        budget.add_tokens(record_llm_usage(resp, model))
+        cj = await _afinish_codegen(prep, text)
+        problem = validate_placeholders(cj, has_diagram)
+        if problem:
+            raise ValueError(problem)
+        return text, cj
+
+    def launch(kind: str) -> None:
+        budget.take_call()
+        kinds[asyncio.create_task(candidate())] = kind
+
+    for _ in range(prep["candidates"]):
+        if not budget.available():
+            break
+        launch("primary")
+    delay = _hedge_delay(prep)
+    hedge_at = time.perf_counter() + delay if delay is not None else None
+
+    winner: Optional[tuple] = None
+    try:
+        while kinds and winner is None:
+            timeout = max(0.0, hedge_at - time.perf_counter()) if hedge_at is not None else None
+            done, _ = await asyncio.wait(set(kinds), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                hedge_at = None
+                if budget.available():
+                    launch("hedge")
+                continue
+            for task in done:
+                kind = kinds.pop(task)
+                try:
+                    result = task.result()
+                except Exception as e:
+                    LLM_CANDIDATES.inc(kind=kind, result="rejected" if isinstance(e, ValueError) else "error")
+                    logging.warning("codegen candidate (%s) failed: %s", kind, e)
+                    errors.append(e)
+                    continue
+                LLM_CANDIDATES.inc(kind=kind, result="won" if winner is None else "lost")
+                winner = winner or result
+            if winner is None and not kinds and budget.available():
+                launch("retry")
+    finally:
+        for task, kind in kinds.items():
+            task.cancel()
+            LLM_CANDIDATES.inc(kind=kind, result="cancelled")
+        if kinds:
+            await asyncio.gather(*kinds, return_exceptions=True)
+    if winner is None:
+        raise errors[0]
+    return winner
+
+async def agenerate_manim(
+    doc: ProblemDoc,
+    on_event: Optional[Callable[[StreamEvent], None]] = None,
+) -> CodegenJob:
+    """
+    ``generate_manim``의 async 버전: AsyncOpenAI 호출을 await 한다.
+    [gen] stream = true (Responses API) 이면 스트리밍으로 받으며 증분 파싱:
+    ConstraintSpec/CAS 줄이 완성되는 즉시 on_event 로 알려 호출자가 GeoCAS/CAS 를 먼저 시작할 수 있다.
+    [gen] candidates > 1 또는 hedge_after_s > 0 이면 후보 경주(_arace_candidates)로 생성한다
+    (어느 후보가 채택될지 모르므로 이 경우 스트리밍/선행 이벤트는 쓰지 않음).
+    [[models.tiers]] 로 고른 저가 모델의 출력이 검증에 실패하면 models.codegen 으로 한 번 재생성한다.
+    티어 시도는 버려질 수 있으므로 on_event 를 보내지 않고, 채택된 뒤에 최종 출력의 이벤트만 보낸다.
+    """
+    prep = _prepare_codegen(doc)
+    if not prep["escalate_to"]:
+        return await _agenerate(prep, on_event)
+    try:
+        cj = await _agenerate(prep, None)
+    except ValueError as e:
+        big = _escalated(prep, e)
+        if big is None:
+            raise
+        return await _agenerate(big, on_event)
+    _emit_accepted(cj, on_event)
+    return cj
+
+def _emit_accepted(cj: CodegenJob, on_event: Optional[Callable[[StreamEvent], None]]) -> None:
+    """검증을 통과한 최종 출력의 선행 작업 이벤트 (저장 출력 재생, 채택된 티어 시도)."""
+    if on_event is None:
+        return
+    cs = cj.constraint_spec
+    if cs is not None:
+        on_event(StreamEvent("constraint_spec", cs.model_dump() if isinstance(cs, ConstraintSpec) else cs))
+    for job in cj.cas_jobs:
+        on_event(StreamEvent("cas_job", {"id": job["id"], "expr": job["expr"]}))
+
+async def _agenerate(prep: Dict[str, Any], on_event: Optional[Callable[[StreamEvent], None]]) -> CodegenJob:
+    doc, model = prep["doc"], prep["model"]
+    with_image, has_diagram = prep["with_image"], prep["has_diagram"]
+    messages = _build_messages(doc, model, with_image, has_diagram)
+
+    slot = _ResponseSlot(model, messages, prep["max_tokens"], prep["temperature"])
+    text = await slot.alookup()
+    if text is None and (prep["candidates"] > 1 or _hedge_delay(prep) is not None):
+        text, cj = await _arace_candidates(prep, messages)
+        await slot.asave(text)
+        return cj
+
+    if text is not None:
+        # 저장된 출력: 신규 출력과 같은 검증(_afinish_codegen)을 먼저 통과한 뒤 이벤트만 보냄
+        cj = await _afinish_codegen(prep, text)
+        _emit_accepted(cj, on_event)
+        return cj
+
+    client = get_async_openai_client()
+    t0 = time.perf_counter()
+    if prep["stream"] and _uses_responses_api(model):
+        resp, text = await _astream_codegen(client, prep, messages, on_event)
+    else:
+        prep["budget"].take_call()
+        resp, text = await _acall_llm(client, model, messages, prep["max_tokens"], prep["temperature"])
+    _LATENCIES.append(time.perf_counter() - t0)
+    prep["budget"].add_tokens(record_llm_usage(resp, model))
+    await slot.asave(text)
+
+    return await _afinish_codegen(prep, text)
+
+def _strip_code_fence(manim_part: str) -> str:
+    """MANIM_CODE 섹션의 ```python 코드펜스 제거."""
+    manim_code = manim_part.strip()
+    if manim_code.startswith("```python"):
+        manim_code = manim_code[9:]
+    elif manim_code.startswith("```"):
+        manim_code = manim_code[3:]
+    lines = manim_code.splitlines()
+    if lines and lines[-1].strip() in {"```", "'''"}:
+        lines = lines[:-1]
+    return "\n".join(lines).strip()
+
+def _cas_surface(manim_code: str) -> str:
+    """코드 내 [[CAS:id:expr]] → [[CAS:id]] 표면 정리."""
+    def _strip_expr(match):
+        return f"[[CAS:{match.group('id')}]]"
+    return re.sub(r"\[\[CAS:(?P<id>[A-Za-z0-9_]+):(?P<expr>.*?)\]\]", _strip_expr, manim_code)
+
+def _check_manim_guards(draft: str, has_diagram: bool) -> Set[str]:
+    """
+    MANIM_CODE 만으로 판정 가능한 하드가드 (스트리밍 시 섹션이 닫히는 즉시, 그 외 경로는 파싱 시).
+    줄 단위 검사(_scan_manim_lines)는 스트림 조기 중단 신호일 뿐 최종 검증에는 넣지 않는다.
+    """
+    geo_keys: Set[str] = collect_geo_placeholders(draft)
+    if has_diagram and not geo_keys:
+        raise ContractViolation("no_geo", "Diagram detected but no GEO placeholders in MANIM_CODE.")
+    return geo_keys
+
+def _split_sections(text: str) -> tuple:
+    """계약 텍스트 → (MANIM 부분, GEO-JOBS JSON 문자열, CAS-JOBS 블록). 없는 섹션은 ""."""
     manim_part = text
     geo_json_s = ""
     cas_block = ""
-
     if "---GEO-JOBS---" in text:
         manim_part, rest = text.split("---GEO-JOBS---", 1)
         if "---CAS-JOBS---" in rest:
@@ -293,21 +976,29 @@ def generate_manim(doc: ProblemDoc) -> CodegenJob:
             geo_json_s = rest
     elif "---CAS-JOBS---" in text:
         manim_part, cas_block = text.split("---CAS-JOBS---", 1)
+    return manim_part, geo_json_s, cas_block
+
+def _parse_cas_block(cas_block: str) -> List[Dict[str, Any]]:
+    jobs: List[Dict[str, Any]] = []
+    for line in cas_block.strip().splitlines():
+        m = CAS_JOB_RE.match(line.strip())
+        if m:
+            jobs.append({"id": m["id"], "expr": m["expr"]})
+    return jobs
+
+def _split_codegen_output(text: str, *, has_diagram: bool, dd: Optional[Path] = None) -> CodegenJob:
+    """파싱 + MANIM_CODE 하드가드까지. GEO 라벨 선언 검사는 부분 수리 후 _check_geo_guards 에서."""
+    if _is_debug() and dd:
+        (dd / "01_llm_raw.txt").write_text(text, encoding="utf-8")
+
+    # --- 파싱 (계약: <MANIM_CODE> [---GEO-JOBS---] [---CAS-JOBS---])
+    manim_part, geo_json_s, cas_block = _split_sections(text)
     if "---GEO-JOBS---" not in text:
         logging.warning("GEO-JOBS section missing")
     if "---CAS-JOBS---" not in text:
         logging.warning("CAS-JOBS section missing")
 
-    # 코드펜스 제거
-    manim_code = manim_part.strip()
-    if manim_code.startswith("```python"):
-        manim_code = manim_code[9:]
-    elif manim_code.startswith("```"):
-        manim_code = manim_code[3:]
-    lines = manim_code.splitlines()
-    if lines and lines[-1].strip() in {"```", "'''"}:
-        lines = lines[:-1]
-    manim_code = "\n".join(lines).strip()
+    manim_code = _strip_code_fence(manim_part)
 
     if _is_debug() and dd:
         (dd / "02_manim_code_draft.py").write_text(manim_code, encoding="utf-8")
@@ -325,16 +1016,9 @@ def generate_manim(doc: ProblemDoc) -> CodegenJob:
         constraint_spec = None  # GeoCAS가 힌트/기본값으로 시도
 
     # CAS jobs
-    jobs: List[Dict[str, Any]] = []
-    for line in cas_block.strip().splitlines():
-        m = re.match(r"\[\[CAS:(?P<id>[A-Za-z0-9_]+):(?P<expr>.+)\]\]$", line.strip())
-        if m:
-            jobs.append({"id": m["id"], "expr": m["expr"]})
+    jobs = _parse_cas_block(cas_block)
 
-    # 코드 내 [[CAS:id:expr]] → [[CAS:id]] 표면 정리
-    def _strip_expr(match):
-        return f"[[CAS:{match.group('id')}]]"
-    draft = re.sub(r"\[\[CAS:(?P<id>[A-Za-z0-9_]+):(?P<expr>.*?)\]\]", _strip_expr, manim_code)
+    draft = _cas_surface(manim_code)
 
     # Sanity pass for GEO-JOBS (auto guards)
     constraint_spec = _geojobs_sanity(constraint_spec, draft)
@@ -342,28 +1026,160 @@ def generate_manim(doc: ProblemDoc) -> CodegenJob:
     # -------------------------------
     # HARD GUARD (codegen-level)
     # -------------------------------
-    geo_keys: Set[str] = collect_geo_placeholders(draft)
-    if has_diagram and not geo_keys:
-        raise ValueError("Diagram detected but no GEO placeholders in MANIM_CODE.")
-    if has_diagram and constraint_spec is None:
-        raise ValueError("GEO placeholders present but ---GEO-JOBS--- (ConstraintSpec) is missing.")
-    if has_diagram and constraint_spec is not None:
-        used_labels: Set[str] = extract_geo_labels(geo_keys)  # {"A","B","C",...}
-        try:
-            points_list = constraint_spec.get("entities", {}).get("points", [])
-            declared: Set[str] = {str(x) for x in points_list}
-        except Exception:
-            declared = set()
-        missing = sorted(list(used_labels - declared))
-        if missing:
-            raise ValueError(
-                f"GEO labels missing in ConstraintSpec.entities.points: {missing}. "
-                "All labels referenced in [[GEO:*]] must be declared."
-            )
+    _check_manim_guards(draft, has_diagram)
 
-    # 최종 결과 반환
     return CodegenJob(
         manim_code_draft=draft,
         cas_jobs=jobs,
         constraint_spec=constraint_spec
     )
+
+def _check_geo_guards(cj: CodegenJob, has_diagram: bool) -> None:
+    """도형 문제: ConstraintSpec 존재 + [[GEO:*]] 가 참조하는 모든 라벨이 entities.points 에 선언."""
+    if not has_diagram:
+        return
+    if cj.constraint_spec is None:
+        raise ValueError("GEO placeholders present but ---GEO-JOBS--- (ConstraintSpec) is missing.")
+    missing = _undeclared_geo_labels(cj)
+    if missing:
+        raise ValueError(
+            f"GEO labels missing in ConstraintSpec.entities.points: {missing}. "
+            "All labels referenced in [[GEO:*]] must be declared."
+        )
+
+def _undeclared_geo_labels(cj: CodegenJob) -> List[str]:
+    used_labels: Set[str] = extract_geo_labels(collect_geo_placeholders(cj.manim_code_draft))  # {"A","B","C",...}
+    try:
+        points_list = (cj.constraint_spec.entities if cj.constraint_spec else {}).get("points", []) or []
+        declared: Set[str] = {str(x) for x in points_list}
+    except Exception:
+        declared = set()
+    return sorted(used_labels - declared)
+
+def validate_placeholders(cj: CodegenJob, has_diagram: bool) -> Optional[str]:
+    """
+    치환 전 사전 검증 (서버 validate 단계와 후보 채택 기준 공용). 문제가 있으면 첫 사유, 없으면 None.
+    """
+    geo_needed: Set[str] = collect_geo_placeholders(cj.manim_code_draft)
+    if has_diagram and not geo_needed:
+        return "Diagram detected but no GEO placeholders."
+    spec = cj.constraint_spec.model_dump() if cj.constraint_spec is not None else {}
+    if geo_needed and not spec:
+        return "GEO placeholders present but ---GEO-JOBS--- (ConstraintSpec) is missing."
+    if spec:
+        declared = set((spec.get("entities", {}) or {}).get("points", []) or [])
+        missing = sorted(extract_geo_labels(geo_needed) - declared)
+        if missing:
+            return f"ConstraintSpec.entities.points missing labels used in GEO tokens: {missing}"
+
+    offenders = detect_invalid_cas_token_patterns(cj.manim_code_draft)
+    if offenders:
+        return f"Malformed CAS token(s): {offenders[:3]}"
+
+    cas_needed: Set[str] = collect_cas_placeholders(cj.manim_code_draft)
+    job_ids = {j.get("id") for j in (cj.cas_jobs or [])}
+    if cas_needed and not job_ids:
+        return "CAS placeholders present but ---CAS-JOBS--- is missing."
+    missing_cas = sorted(cas_needed - job_ids)
+    if missing_cas:
+        return f"CAS placeholders without matching jobs: {missing_cas}"
+    return None
+
+# -------------------------------
+# 부분 수리 (검증 실패 섹션만 재요청)
+# -------------------------------
+
+REPAIR_SYSTEM_TEXT = (
+    "너는 Manim 초안의 작업 섹션만 보완한다. MANIM_CODE 는 다시 쓰지 말고, 요청된 섹션만 아래 형식으로 출력한다.\n"
+    "---GEO-JOBS---\n<수정된 ConstraintSpec JSON 전체 (template/entities/constraints), 수치 좌표 금지>\n"
+    "---CAS-JOBS---\n[[CAS:ID:sympy_expr]]  (요청된 ID만, 한 줄에 하나)\n"
+    "설명/코드펜스 없이 섹션만 출력."
+)
+
+def _find_repair_targets(cj: CodegenJob) -> Dict[str, List[str]]:
+    """
+    섹션 하나만 다시 받으면 고칠 수 있는 검증 실패:
+      geo: [[GEO:*]] 가 참조하는데 entities.points 에 없는 라벨 (GEO-JOBS 자체가 없으면 전부)
+      cas: [[CAS:ID]] 는 있는데 CAS-JOBS 에 없는 ID
+    """
+    targets: Dict[str, List[str]] = {}
+    if collect_geo_placeholders(cj.manim_code_draft):
+        missing = _undeclared_geo_labels(cj)
+        if missing or cj.constraint_spec is None:
+            targets["geo"] = missing
+    job_ids = {j.get("id") for j in cj.cas_jobs}
+    missing_cas = sorted(collect_cas_placeholders(cj.manim_code_draft) - job_ids)
+    if missing_cas:
+        targets["cas"] = missing_cas
+    return targets
+
+def _build_repair_messages(
+    model: str, cj: CodegenJob, targets: Dict[str, List[str]], doc: ProblemDoc
+) -> List[Dict[str, Any]]:
+    ocr_text = "\n".join(i.text for i in doc.items if i.text)
+    parts = [f"OCR_TEXT:\n{ocr_text}"]
+    if "geo" in targets:
+        spec = cj.constraint_spec.model_dump() if cj.constraint_spec is not None else None
+        hint = getattr(doc, "geometry_hint", None)
+        parts.append(
+            "[GEO-JOBS 보완]\n"
+            f"entities.points 에 선언되지 않은 라벨: {targets['geo']}\n"
+            f"MANIM_CODE 의 GEO 토큰: {sorted(collect_geo_placeholders(cj.manim_code_draft))}\n"
+            f"현재 ConstraintSpec:\n{json.dumps(spec, ensure_ascii=False) if spec else '(없음)'}"
+            + (f"\nGEOMETRY_HINT:\n{json.dumps(hint, ensure_ascii=False)}" if hint else "")
+        )
+    if "cas" in targets:
+        ids = set(targets["cas"])
+        usages = [
+            line.strip() for line in cj.manim_code_draft.splitlines()
+            if collect_cas_placeholders(line) & ids
+        ]
+        existing = "\n".join(f"[[CAS:{j['id']}:{j['expr']}]]" for j in cj.cas_jobs) or "(없음)"
+        parts.append(
+            "[CAS-JOBS 보완]\n"
+            f"작업이 없는 CAS ID: {targets['cas']}\n"
+            "사용 위치:\n" + "\n".join(usages) + f"\n기존 CAS 작업:\n{existing}"
+        )
+    user_text = "\n\n".join(parts)
+    if _uses_responses_api(model):
+        return [
+            {"role": "system", "content": [{"type": "input_text", "text": REPAIR_SYSTEM_TEXT}]},
+            {"role": "user", "content": [{"type": "input_text", "text": user_text}]},
+        ]
+    return [
+        {"role": "system", "content": REPAIR_SYSTEM_TEXT},
+        {"role": "user", "content": user_text},
+    ]
+
+def _apply_repair(
+    cj: CodegenJob, reply: str, targets: Dict[str, List[str]], dd: Optional[Path] = None
+) -> CodegenJob:
+    """수리 응답을 기존 CodegenJob 에 병합: GEO 는 ConstraintSpec 교체, CAS 는 누락 ID 작업만 추가."""
+    if _is_debug() and dd:
+        n = len(list(dd.glob("05_repair_*.txt"))) + 1
+        (dd / f"05_repair_{n}.txt").write_text(reply, encoding="utf-8")
+
+    _, geo_json_s, cas_block = _split_sections(reply)
+    update: Dict[str, Any] = {}
+    if "geo" in targets and geo_json_s.strip():
+        try:
+            spec = json.loads(_strip_code_fence(geo_json_s))
+        except ValueError:
+            spec = None
+        if isinstance(spec, dict):
+            update["constraint_spec"] = ConstraintSpec.model_validate(_geojobs_sanity(spec, cj.manim_code_draft))
+    if "cas" in targets:
+        want, seen = set(targets["cas"]), {j.get("id") for j in cj.cas_jobs}
+        added = []
+        for job in _parse_cas_block(cas_block):
+            if job["id"] in want and job["id"] not in seen:
+                added.append(job)
+                seen.add(job["id"])
+        if added:
+            update["cas_jobs"] = list(cj.cas_jobs) + added
+
+    repaired = cj.model_copy(update=update)
+    left = _find_repair_targets(repaired)
+    for section in targets:
+        LLM_REPAIRS.inc(section=section, result="unfixed" if section in left else "fixed")
+    return repaired
@@ -0,0 +1,130 @@
+"""
+스트리밍 codegen 출력용 증분 파서.
+
+계약: <MANIM_CODE> [---GEO-JOBS---] <ConstraintSpec JSON> [---CAS-JOBS---] <[[CAS:id:expr]] 줄들>
+
+조각(delta)이 도착할 때마다 feed() 하면, 확정된 부분만 이벤트로 돌려준다.
+  - manim_done      : MANIM_CODE 섹션 원문 (첫 구분자를 본 순간)
+  - constraint_spec : GEO-JOBS 의 JSON 객체가 괄호 균형으로 닫힌 순간 (dict)
+  - cas_job         : CAS-JOBS 의 한 줄이 개행으로 끝난 순간 ({"id","expr"})
+최종 CodegenJob 은 여전히 전체 텍스트를 _split_codegen_output 으로 만든다(이벤트는 선행 실행용).
+"""
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass
+from typing import Any, List, Optional
+
+GEO_MARKER = "---GEO-JOBS---"
+CAS_MARKER = "---CAS-JOBS---"
+CAS_JOB_RE = re.compile(r"\[\[CAS:(?P<id>[A-Za-z0-9_]+):(?P<expr>.+)\]\]$")
+
+MANIM, GEO, CAS = "manim", "geo", "cas"
+
+
+@dataclass
+class StreamEvent:
+    kind: str   # "manim_done" | "constraint_spec" | "cas_job"
+    data: Any
+
+
+class ContractStreamParser:
+    def __init__(self) -> None:
+        self.text = ""
+        self.section = MANIM
+        self._pos = 0               # 현재 섹션에서 아직 확정되지 않은 첫 위치
+        self._section_start = 0
+        # GEO JSON 괄호 추적 상태
+        self._json_start: Optional[int] = None
+        self._depth = 0
+        self._in_str = False
+        self._esc = False
+        self._spec_done = False
+
+    # ------------------------------------------------------------------
+    def feed(self, delta: str) -> List[StreamEvent]:
+        self.text += delta
+        events: List[StreamEvent] = []
+        while True:
+            before = (self.section, self._pos)
+            if self.section == MANIM:
+                self._scan_manim(events)
+            elif self.section == GEO:
+                self._scan_geo(events)
+            else:
+                self._scan_cas(events, final=False)
+            if (self.section, self._pos) == before:
+                return events
+
+    def close(self) -> List[StreamEvent]:
+        """스트림 종료: 개행 없이 끝난 마지막 CAS 줄 / 구분자 없는 MANIM_CODE 를 확정."""
+        events = self.feed("")
+        if self.section == MANIM:
+            events.append(StreamEvent("manim_done", self.text[self._pos:]))
+            self._pos = len(self.text)
+        elif self.section == CAS:
+            self._scan_cas(events, final=True)
+        return events
+
+    # ------------------------------------------------------------------
+    def _next_marker(self, markers: List[str], start: int) -> Optional[tuple]:
+        hits = [(self.text.find(m, start), m) for m in markers]
+        hits = [(i, m) for i, m in hits if i >= 0]
+        return min(hits) if hits else None
+
+    def _scan_manim(self, events: List[StreamEvent]) -> None:
+        hit = self._next_marker([GEO_MARKER, CAS_MARKER], 0)
+        if hit is None:
+            return
+        idx, marker = hit
+        events.append(StreamEvent("manim_done", self.text[:idx]))
+        self.section = GEO if marker == GEO_MARKER else CAS
+        self._pos = self._section_start = idx + len(marker)
+
+    def _scan_geo(self, events: List[StreamEvent]) -> None:
+        # JSON 은 CAS 구분자 전까지만 유효 (구분자가 JSON 문자열 안에 있을 일은 없다고 가정)
+        # 조각 경계에 걸친 구분자도 찾도록 이미 지나간 위치를 구분자 길이만큼 되짚어 검색
+        hit = self._next_marker([CAS_MARKER], max(self._section_start, self._pos - len(CAS_MARKER) + 1))
+        limit = hit[0] if hit else len(self.text)
+        i = self._pos
+        while i < limit and not self._spec_done:
+            ch = self.text[i]
+            if self._json_start is None:
+                if ch == "{":
+                    self._json_start, self._depth = i, 1
+            elif self._in_str:
+                if self._esc:
+                    self._esc = False
+                elif ch == "\\":
+                    self._esc = True
+                elif ch == '"':
+                    self._in_str = False
+            elif ch == '"':
+                self._in_str = True
+            elif ch == "{":
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._spec_done = True
+                    try:
+                        events.append(StreamEvent("constraint_spec", json.loads(self.text[self._json_start:i + 1])))
+                    except ValueError:
+                        pass  # 최종 파서가 판단
+            i += 1
+        if hit is not None:
+            self.section = CAS
+            self._pos = hit[0] + len(CAS_MARKER)
+        else:
+            self._pos = limit if not self._spec_done else len(self.text)
+
+    def _scan_cas(self, events: List[StreamEvent], final: bool) -> None:
+        end = len(self.text) if final else self.text.rfind("\n") + 1
+        if end <= self._pos:
+            return
+        for line in self.text[self._pos:end].splitlines():
+            m = CAS_JOB_RE.match(line.strip())
+            if m:
+                events.append(StreamEvent("cas_job", {"id": m["id"], "expr": m["expr"]}))
+        self._pos = end
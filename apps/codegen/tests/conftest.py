@@ -0,0 +1,64 @@
+import pathlib, sys, types, asyncio
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[3]))
+
+import pytest
+from apps.codegen import codegen
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    """
+    codegen 테스트 공용 셋업 팩토리: fake_llm(replies, models={...}, client=None, **gen).
+    - _cfg 는 configs/openai.toml 복사본으로 고정, 넘긴 [models]/[gen] 키만 덮어씀 (다시 부르면 원본 기준으로 새로)
+    - sync/async create·stream 을 가짜로: replies[i] 는 i 번째 호출 출력 (str 또는 (지연 초, str)), usage 100/50
+    - client 를 넘기면 create 는 실제 함수 그대로, 클라이언트만 교체 (SDK 인자 경로 검사용)
+    반환 namespace: calls(호출별 kwargs), cancelled(취소된 호출 번호), models(호출 모델 순서)
+    """
+    base = codegen._cfg()
+    monkeypatch.setattr(codegen, "_LATENCIES", codegen.deque(maxlen=256))
+
+    def setup(replies=(), models=None, client=None, **gen):
+        cfg = dict(base)
+        cfg["models"] = {**base["models"], **(models or {})}
+        cfg["gen"] = {**base.get("gen", {}), **gen}
+        monkeypatch.setattr(codegen, "_cfg", lambda: cfg)
+        llm = types.SimpleNamespace(calls=[], cancelled=[], models=[])
+
+        if client is not None:
+            monkeypatch.setattr(codegen, "get_openai_client", lambda: client)
+            monkeypatch.setattr(codegen, "get_async_openai_client", lambda: client)
+            return llm
+
+        def take(k):
+            i = len(llm.calls)
+            llm.calls.append(k)
+            llm.models.append(k["model"])
+            reply = replies[i]
+            return (i, *reply) if isinstance(reply, tuple) else (i, 0, reply)
+
+        def fake_create(client, **k):
+            _, _, text = take(k)
+            return types.SimpleNamespace(output_text=text, usage={"input_tokens": 100, "output_tokens": 50})
+
+        async def afake_create(client, **k):
+            i, delay, text = take(k)
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                llm.cancelled.append(i)
+                raise
+            return types.SimpleNamespace(output_text=text, usage={"input_tokens": 100, "output_tokens": 50})
+
+        async def afake_stream(client, *, on_delta, **k):
+            resp = await afake_create(client, **k)
+            on_delta(resp.output_text)
+            return None
+
+        monkeypatch.setattr(codegen, "get_openai_client", lambda: object())
+        monkeypatch.setattr(codegen, "get_async_openai_client", lambda: object())
+        monkeypatch.setattr(codegen, "_responses_create_with_retry", fake_create)
+        monkeypatch.setattr(codegen, "_aresponses_create_with_retry", afake_create)
+        monkeypatch.setattr(codegen, "_aresponses_stream_with_retry", afake_stream)
+        return llm
+
+    return setup
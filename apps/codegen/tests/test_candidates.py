@@ -0,0 +1,72 @@
+import pathlib, sys, asyncio
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[3]))
+
+import pytest
+from apps.codegen import codegen
+from libs.schemas import ProblemDoc, OCRItem
+
+GOOD = "print([[CAS:a]])\n---CAS-JOBS---\n[[CAS:a:1+1]]"
+BAD = "print([[CAS:a]], [[CAS:b]])\n---CAS-JOBS---\n[[CAS:a:1+1]]"   # b 작업 없음 → 검증 실패
+TIERED = {"codegen": "gpt-5", "tiers": [{"when": {"has_diagram": False}, "model": "gpt-5-mini"}]}
+
+
+def _doc():
+    return ProblemDoc(items=[OCRItem(bbox=[0, 0, 10, 10], category="Text", text="1+1")], image_path=None)
+
+
+def _setup(fake_llm, replies, models=None, **gen):
+    """replies: 호출 순서대로 (지연 초, 출력). 티어·수리 없이 후보 경합만."""
+    return fake_llm(replies, models={"tiers": [], **(models or {})}, **{"repair_rounds": 0, **gen})
+
+
+def test_first_valid_candidate_wins_and_rest_cancelled(fake_llm):
+    llm = _setup(fake_llm, [(0.01, BAD), (0.02, GOOD), (5, GOOD)], candidates=3)
+    cj = asyncio.run(codegen.agenerate_manim(_doc()))
+    assert cj.cas_jobs == [{"id": "a", "expr": "1+1"}]
+    assert len(llm.calls) == 3 and llm.cancelled == [2]
+
+
+def test_hedge_fires_after_threshold(fake_llm):
+    llm = _setup(fake_llm, [(5, GOOD), (0.01, GOOD)], hedge_after_s=0.05)
+    cj = asyncio.run(codegen.agenerate_manim(_doc()))
+    assert cj.cas_jobs == [{"id": "a", "expr": "1+1"}]
+    assert len(llm.calls) == 2 and llm.cancelled == [0]
+
+
+def test_spend_limit_bounds_retries(fake_llm):
+    llm = _setup(fake_llm, [(0, BAD)] * 5, candidates=2, max_calls_per_request=3)
+    with pytest.raises(ValueError, match="without matching jobs"):
+        asyncio.run(codegen.agenerate_manim(_doc()))
+    assert len(llm.calls) == 3
+
+    llm = _setup(fake_llm, [(0, BAD)] * 5, candidates=1, hedge_after_s=1, max_spend_tokens=100)
+    with pytest.raises(ValueError):
+        asyncio.run(codegen.agenerate_manim(_doc()))
+    assert len(llm.calls) == 1   # 첫 호출 usage(150) 가 상한 초과 → 재시도 없음
+
+
+def test_hedge_delay_uses_recent_percentile(monkeypatch):
+    monkeypatch.setattr(codegen, "_LATENCIES", codegen.deque([float(i) for i in range(1, 101)], maxlen=256))
+    prep = {"hedge_after_s": 30.0, "hedge_percentile": 95}
+    assert codegen._hedge_delay(prep) == 96.0
+    assert codegen._hedge_delay({**prep, "hedge_after_s": 0}) is None
+    codegen._LATENCIES.clear()
+    assert codegen._hedge_delay(prep) == 30.0
+
+
+def test_budget_shared_by_hedge_repair_and_escalation(fake_llm):
+    # 티어 주 호출(느림) → hedge → hedge 후보의 부분 수리 = 3회로 예산 소진:
+    # 주 호출 후보의 수리, 재시도, 큰 모델 에스컬레이션 모두 없음
+    llm = _setup(
+        fake_llm, [(0.2, BAD), (0, BAD), (0, "---CAS-JOBS---\n")] + [(0, GOOD)] * 3,
+        models=TIERED, hedge_after_s=0.05, repair_rounds=1, max_calls_per_request=3,
+    )
+    with pytest.raises(ValueError, match="without matching jobs"):
+        asyncio.run(codegen.agenerate_manim(_doc()))
+    assert len(llm.calls) == 3
+
+    # 토큰 상한도 요청 전체 기준: 티어 호출 usage(150) 가 상한을 넘으면 수리·에스컬레이션 없음
+    llm = _setup(fake_llm, [(0, BAD)] + [(0, GOOD)] * 3, models=TIERED, repair_rounds=1, max_spend_tokens=100)
+    with pytest.raises(ValueError):
+        asyncio.run(codegen.agenerate_manim(_doc()))
+    assert len(llm.calls) == 1
@@ -0,0 +1,88 @@
+import pathlib, sys, types, asyncio
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[3]))
+
+import pytest
+from apps.codegen import codegen
+from libs import retry
+from libs.schemas import ProblemDoc, OCRItem
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(retry, "_breakers", {})
+    monkeypatch.setattr(codegen, "_RESPONSE_FORMAT_OK", None)
+
+
+def test_response_format_type_error_detected_once():
+    sent = []
+
+    class Client:
+        class responses:
+            @staticmethod
+            def create(**kwargs):
+                sent.append(sorted(kwargs))
+                if "response_format" in kwargs:
+                    raise TypeError("unexpected keyword argument 'response_format'")
+                return types.SimpleNamespace()
+
+    for _ in range(2):
+        codegen._responses_create_with_retry(Client, model="gpt-5", messages=[], max_tokens=1)
+    assert ["response_format" in k for k in sent] == [True, False, False]
+    assert codegen._RESPONSE_FORMAT_OK is False
+
+
+def test_open_circuit_switches_to_fallback_model(fake_llm):
+    b = codegen._breaker("gpt-5")
+    b.state, b.opened_at = retry.OPEN, b.clock()
+
+    models = []
+
+    class Client:
+        class responses:
+            @staticmethod
+            def create(**kwargs):
+                models.append(kwargs["model"])
+                return types.SimpleNamespace(output_text="print(1)")
+
+    fake_llm(models={"fallback": "gpt-5-mini", "tiers": []}, client=Client)
+    doc = ProblemDoc(items=[OCRItem(bbox=[0, 0, 10, 10], category="Text", text="1")], image_path=None)
+    codegen.generate_manim(doc)
+    assert models == ["gpt-5-mini"]
+
+    codegen._cfg()["models"]["fallback"] = ""
+    with pytest.raises(retry.CircuitOpen):
+        codegen.generate_manim(doc)
+
+
+def test_output_token_cap_sent_in_both_request_forms():
+    sent = []
+
+    class Client:
+        class responses:
+            @staticmethod
+            def create(**kwargs):
+                sent.append(kwargs)
+                if "response_format" in kwargs:
+                    raise TypeError("unexpected keyword argument 'response_format'")
+                return types.SimpleNamespace()
+
+    codegen._responses_create_with_retry(Client, model="gpt-5", messages=[], max_tokens=321)
+    assert [k["max_output_tokens"] for k in sent] == [321, 321]
+    assert "text" in sent[-1]
+
+    streamed = []
+
+    class AsyncClient:
+        class responses:
+            @staticmethod
+            async def create(**kwargs):
+                streamed.append(kwargs)
+
+                async def events():
+                    yield types.SimpleNamespace(type="response.output_text.delta", delta="x")
+                return events()
+
+    asyncio.run(codegen._aresponses_stream_with_retry(
+        AsyncClient, model="gpt-5", messages=[], max_tokens=777, on_delta=lambda d: None
+    ))
+    assert streamed[0]["max_output_tokens"] == 777 and streamed[0]["stream"] is True
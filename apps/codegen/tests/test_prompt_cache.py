@@ -0,0 +1,38 @@
+import pathlib, sys, json, types
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[3]))
+
+from apps.codegen import codegen
+from libs.schemas import ProblemDoc, OCRItem
+
+
+def _doc(text, category="Text", image_bytes=None):
+    return ProblemDoc(
+        items=[OCRItem(bbox=[0, 0, 10, 10], category=category, text=text)], image_path=None, image_bytes=image_bytes
+    )
+
+
+def test_static_prefix_is_byte_identical_across_problems():
+    a = codegen._build_messages(_doc("1+1"), "gpt-5", with_image=False, has_diagram=False)
+    b = codegen._build_messages(_doc("삼각형", "Picture", b"\xff\xd8jpeg"), "gpt-5", with_image=True, has_diagram=True)
+    assert json.dumps(a[0], ensure_ascii=False) == json.dumps(b[0], ensure_ascii=False)
+    assert a[0]["role"] == "system" and a[0]["content"][0]["text"] == codegen.SYSTEM_PROMPT_TEXT
+    # 문제별 부분(OCR/이미지)은 prefix 뒤에만
+    assert "HAS_DIAGRAM" in a[1]["content"][-1]["text"] and all(m["role"] == "user" for m in a[1:])
+    chat = codegen._build_messages(_doc("1+1"), "gpt-4o", with_image=False, has_diagram=False)
+    assert chat[0] == {"role": "system", "content": codegen.SYSTEM_PROMPT_TEXT}
+
+
+def test_prompt_cache_key_sent_and_stable():
+    sent = []
+
+    class Client:
+        class responses:
+            @staticmethod
+            def create(**kwargs):
+                sent.append(kwargs)
+                return types.SimpleNamespace()
+
+    for _ in range(2):
+        codegen._responses_create_with_retry(Client, model="gpt-5", messages=[], max_tokens=1)
+    keys = {k["extra_body"]["prompt_cache_key"] for k in sent}
+    assert keys == {codegen.PROMPT_CACHE_KEY}
@@ -0,0 +1,74 @@
+import pathlib, sys, types, json
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[3]))
+
+import pytest
+from apps.codegen import codegen
+from libs.schemas import ProblemDoc, OCRItem
+
+
+def _doc(category="Text", text="1+1"):
+    return ProblemDoc(items=[OCRItem(bbox=[0, 0, 10, 10], category=category, text=text)], image_path=None)
+
+
+def test_missing_cas_job_repaired_with_section_only(fake_llm):
+    draft = "print([[CAS:a:1+1]], [[CAS:b]])\n---CAS-JOBS---\n[[CAS:a:1+1]]"
+    calls = fake_llm([draft, "---CAS-JOBS---\n[[CAS:a:9]]\n[[CAS:b:2*3]]"]).calls
+
+    cj = codegen.generate_manim(_doc())
+    # 기존 작업은 유지, 누락된 b 만 병합
+    assert cj.cas_jobs == [{"id": "a", "expr": "1+1"}, {"id": "b", "expr": "2*3"}]
+    assert len(calls) == 2
+    system, user = calls[1]["messages"]
+    assert system["content"][0]["text"] == codegen.REPAIR_SYSTEM_TEXT
+    text = user["content"][0]["text"]
+    assert "작업이 없는 CAS ID: ['b']" in text and "print([[CAS:a]], [[CAS:b]])" in text
+    assert "OCR_JSON" not in text
+
+
+def test_missing_geo_labels_repaired_by_spec_replacement(fake_llm):
+    draft = (
+        "a = Angle([[GEO:angle:B-A-C]])\nd = Dot([[GEO:point:A]])\n"
+        '---GEO-JOBS---\n{"entities": {"points": ["A"]}, "constraints": []}'
+    )
+    spec = {"entities": {"points": ["A", "B", "C"]}, "constraints": [{"type": "polygon_order", "points": ["A", "B", "C"]}]}
+    calls = fake_llm([draft, "---GEO-JOBS---\n" + json.dumps(spec)]).calls
+
+    cj = codegen.generate_manim(_doc(category="Picture", text=""))
+    assert cj.constraint_spec.entities["points"] == ["A", "B", "C"]
+    assert "선언되지 않은 라벨: ['B', 'C']" in calls[1]["messages"][1]["content"][0]["text"]
+
+
+def test_unfixed_geo_labels_still_fail(fake_llm):
+    draft = (
+        "a = Angle([[GEO:angle:B-A-C]])\n"
+        '---GEO-JOBS---\n{"entities": {"points": ["A"]}, "constraints": []}'
+    )
+    fake_llm([draft, "sorry"])
+    with pytest.raises(ValueError, match="GEO labels missing"):
+        codegen.generate_manim(_doc(category="Picture", text=""))
+
+
+def test_repair_disabled(fake_llm):
+    # 모델 고정 (티어 에스컬레이션 없음)
+    calls = fake_llm(["print([[CAS:b]])"], models={"tiers": []}, repair_rounds=0).calls
+    assert codegen.generate_manim(_doc()).cas_jobs == []
+    assert len(calls) == 1
+
+
+def test_repair_call_uses_smaller_output_budget(monkeypatch, fake_llm):
+    monkeypatch.setattr(codegen, "_RESPONSE_FORMAT_OK", None)
+    replies = iter(["print([[CAS:b]])\n---CAS-JOBS---\n", "---CAS-JOBS---\n[[CAS:b:2*3]]"])
+    sent = []
+
+    class Client:
+        class responses:
+            @staticmethod
+            def create(**kwargs):
+                if "response_format" in kwargs:   # 고정된 SDK 처럼 text.format 경로로
+                    raise TypeError("unexpected keyword argument 'response_format'")
+                sent.append(kwargs["max_output_tokens"])
+                return types.SimpleNamespace(output_text=next(replies))
+
+    fake_llm(models={"tiers": []}, client=Client, max_tokens=4096, repair_max_tokens=512)
+    assert codegen.generate_manim(_doc()).cas_jobs == [{"id": "b", "expr": "2*3"}]
+    assert sent == [4096, 512]
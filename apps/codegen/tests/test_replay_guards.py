@@ -0,0 +1,49 @@
+import pathlib, sys, asyncio
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[3]))
+
+import pytest
+from apps.codegen import codegen
+from libs.schemas import ProblemDoc, OCRItem
+
+SPEC = '---GEO-JOBS---\n{"entities": {"points": ["A", "B"]}, "constraints": []}'
+
+
+def _doc():
+    return ProblemDoc(items=[OCRItem(bbox=[0, 0, 10, 10], category="Picture", text="")], image_path=None)
+
+
+def _live_and_replay(monkeypatch, fake_llm, tmp_path, text):
+    """같은 출력으로 live(record) 와 cassette replay 를 돌려 (결과 또는 예외 타입) 쌍을 반환."""
+    fake_llm([text], models={"tiers": []}, stream=False)
+    monkeypatch.setenv("MANION_CASSETTE_DIR", str(tmp_path))
+    events = []
+
+    def run(mode):
+        monkeypatch.setenv("MANION_CASSETTE", mode)
+        try:
+            return asyncio.run(codegen.agenerate_manim(_doc(), on_event=events.append))
+        except ValueError as e:
+            return type(e)
+
+    return run("record"), run("replay"), events
+
+
+def test_replay_accepts_what_live_accepts(monkeypatch, fake_llm, tmp_path):
+    text = "o = Dot([0, 0, 0], color=GRAY)\nA = Dot([[GEO:point:A]])\nB = Dot([[GEO:point:B]])\n" + SPEC
+    live, replay, events = _live_and_replay(monkeypatch, fake_llm, tmp_path, text)
+    assert live == replay and live.constraint_spec.entities["points"] == ["A", "B"]
+    assert [ev.kind for ev in events] == ["constraint_spec"]   # 재생은 검증 후 이벤트만
+
+
+def test_replay_rejects_what_live_rejects(monkeypatch, fake_llm, tmp_path):
+    text = "A = Dot([1.5, 2, 0])\nB = Dot([0, 1, 0])\n" + SPEC   # 도형 문제인데 GEO 토큰 없음
+    live, replay, events = _live_and_replay(monkeypatch, fake_llm, tmp_path, text)
+    assert live is replay is codegen.ContractViolation
+    assert events == []
+
+
+def test_stream_abort_heuristics_do_not_reject_final_output(monkeypatch, fake_llm, tmp_path):
+    # 수치 좌표 검사는 스트림 조기 중단 신호 → 비스트림/재생 최종 검증은 기존처럼 통과
+    text = "A = Dot([1.5, 2, 0])\nB = Dot([[GEO:point:B]])\n" + SPEC
+    live, replay, _ = _live_and_replay(monkeypatch, fake_llm, tmp_path, text)
+    assert live == replay and live.constraint_spec.entities["points"] == ["A", "B"]
@@ -0,0 +1,61 @@
+import pathlib, sys, types, asyncio, threading
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[3]))
+
+from apps.codegen import codegen
+from libs import llm_cache
+from libs.schemas import ProblemDoc, OCRItem
+
+
+def _doc():
+    return ProblemDoc(items=[OCRItem(bbox=[0, 0, 10, 10], category="Text", text="1+1")], image_path=None)
+
+
+def test_cache_hit_skips_network_and_refresh_resamples(monkeypatch, fake_llm, tmp_path):
+    outputs = ["print([[CAS:a:1+1]])\n---CAS-JOBS---\n[[CAS:a:1+1]]", "print([[CAS:a:2+2]])\n---CAS-JOBS---\n[[CAS:a:2+2]]"]
+    calls = fake_llm(outputs).calls
+    monkeypatch.setenv("MANION_LLM_CACHE_DIR", str(tmp_path))
+    monkeypatch.setenv("MANION_LLM_CACHE", "on")
+
+    first = codegen.generate_manim(_doc())
+    assert codegen.generate_manim(_doc()) == first
+    assert len(calls) == 1
+
+    monkeypatch.setenv("MANION_LLM_CACHE", "refresh")
+    fresh = codegen.generate_manim(_doc())
+    assert fresh.cas_jobs == [{"id": "a", "expr": "2+2"}] and len(calls) == 2
+
+    # refresh 결과가 캐시를 덮어씀
+    def no_network():
+        raise AssertionError("cache hit must not create a client")
+
+    monkeypatch.setenv("MANION_LLM_CACHE", "on")
+    monkeypatch.setattr(codegen, "get_openai_client", no_network)
+    assert codegen.generate_manim(_doc()) == fresh
+
+
+def test_async_cache_io_runs_off_event_loop(monkeypatch, fake_llm, tmp_path):
+    fake_llm(models={"tiers": []})
+    io_threads, loop_threads = [], set()
+    real_get, real_put = llm_cache.LLMResponseCache.get, llm_cache.LLMResponseCache.put
+
+    def get(self, key):
+        io_threads.append(threading.get_ident())
+        return real_get(self, key)
+
+    def put(self, key, model, text):
+        io_threads.append(threading.get_ident())
+        real_put(self, key, model, text)
+
+    async def fake_create(client, **k):
+        loop_threads.add(threading.get_ident())
+        return types.SimpleNamespace(output_text="print([[CAS:a:1+1]])\n---CAS-JOBS---\n[[CAS:a:1+1]]")
+
+    monkeypatch.setattr(llm_cache.LLMResponseCache, "get", get)
+    monkeypatch.setattr(llm_cache.LLMResponseCache, "put", put)
+    monkeypatch.setattr(codegen, "_aresponses_create_with_retry", fake_create)
+    monkeypatch.setenv("MANION_LLM_CACHE_DIR", str(tmp_path))
+    monkeypatch.setenv("MANION_LLM_CACHE", "on")
+
+    first = asyncio.run(codegen.agenerate_manim(_doc()))
+    assert asyncio.run(codegen.agenerate_manim(_doc())) == first   # 두 번째는 캐시 적중
+    assert len(io_threads) == 3 and not set(io_threads) & loop_threads   # miss get, put, hit get
@@ -0,0 +1,106 @@
+import pathlib, sys, random, asyncio, types
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[3]))
+
+import pytest
+from apps.codegen import codegen
+from apps.codegen.stream import ContractStreamParser
+from libs.schemas import ProblemDoc, OCRItem
+
+TEXT = (
+    "```python\nclass S(Scene):\n    p = [[GEO:A]]\n    t = MathTex('[[CAS:s1]]')\n```\n"
+    "---GEO-JOBS---\n"
+    '{"points": [{"name": "A", "coord": [0, 0]}], "note": "brace } in \\"string\\" {"}\n'
+    "---CAS-JOBS---\n"
+    "[[CAS:s1:sqrt(4)]]\n"
+    "[[CAS:s2:1+1]]"
+)
+
+
+def _events(chunks):
+    p = ContractStreamParser()
+    out = []
+    for c in chunks:
+        out += p.feed(c)
+    out += p.close()
+    return out
+
+
+def test_whole_text_events():
+    evs = _events([TEXT])
+    assert [e.kind for e in evs] == ["manim_done", "constraint_spec", "cas_job", "cas_job"]
+    assert evs[0].data.strip().endswith("```")
+    assert evs[1].data["note"] == 'brace } in "string" {'
+    assert evs[2].data == {"id": "s1", "expr": "sqrt(4)"}
+    assert evs[3].data == {"id": "s2", "expr": "1+1"}
+
+
+def test_random_chunking_matches_whole_text():
+    expected = [(e.kind, e.data) for e in _events([TEXT])]
+    rng = random.Random(0)
+    for _ in range(100):
+        cuts = sorted(rng.sample(range(1, len(TEXT)), rng.randint(1, 40)))
+        chunks = [TEXT[a:b] for a, b in zip([0] + cuts, cuts + [len(TEXT)])]
+        assert [(e.kind, e.data) for e in _events(chunks)] == expected
+
+
+def test_events_fire_before_stream_ends():
+    p = ContractStreamParser()
+    head, tail = TEXT.split("[[CAS:s2", 1)
+    kinds = [e.kind for e in p.feed(head)]
+    assert kinds == ["manim_done", "constraint_spec", "cas_job"]
+    assert [e.data["id"] for e in p.feed("[[CAS:s2" + tail) + p.close()] == ["s2"]
+
+
+def test_cas_only_contract():
+    evs = _events(["print([[CAS:a]])\n---CAS", "-JOBS---\n[[CAS:a:1+1]]\n"])
+    assert [e.kind for e in evs] == ["manim_done", "cas_job"]
+
+
+def _stream_client(outputs, consumed, inputs):
+    class FakeStream:
+        def __init__(self, chunks):
+            self._it = iter(chunks)
+
+        def __aiter__(self):
+            return self
+
+        async def __anext__(self):
+            try:
+                delta = next(self._it)
+            except StopIteration:
+                raise StopAsyncIteration
+            consumed.append(delta)
+            return types.SimpleNamespace(type="response.output_text.delta", delta=delta)
+
+    class FakeResponses:
+        async def create(self, **kwargs):
+            inputs.append(kwargs["input"])
+            return FakeStream(outputs[len(inputs) - 1])
+
+    return types.SimpleNamespace(responses=FakeResponses())
+
+
+def test_stream_aborts_on_dynamic_cas_and_retries(fake_llm):
+    bad = ['t = f"[[CAS:{i}]]"\n'] + ["x = 1\n"] * 50
+    good = ["print([[CAS:a]])\n---CAS-JOBS---\n", "[[CAS:a:1+1]]"]
+    consumed, inputs = [], []
+    fake_llm(client=_stream_client([bad, good], consumed, inputs), stream=True, contract_retries=1)
+
+    doc = ProblemDoc(items=[OCRItem(bbox=[0, 0, 10, 10], category="Text", text="1+1")], image_path=None)
+    cj = asyncio.run(codegen.agenerate_manim(doc))
+    assert cj.cas_jobs == [{"id": "a", "expr": "1+1"}]
+    # 위반 줄 직후 중단: 나머지 50 조각은 받지 않음
+    assert consumed == bad[:1] + good
+    assert len(inputs) == 2 and "Malformed CAS token" in inputs[1][-1]["content"][0]["text"]
+
+
+def test_stream_numeric_coordinate_abort_exhausts_retries(fake_llm):
+    bad = ["A = Dot([1.5, 2, 0])\n", "b = 2\n"]
+    consumed, inputs = [], []
+    fake_llm(client=_stream_client([bad, bad], consumed, inputs), stream=True, contract_retries=1)
+
+    doc = ProblemDoc(items=[OCRItem(bbox=[0, 0, 10, 10], category="Picture", text="")], image_path=None)
+    with pytest.raises(codegen.ContractViolation) as ei:
+        asyncio.run(codegen.agenerate_manim(doc))
+    assert ei.value.reason == "numeric_coord"
+    assert len(inputs) == 2 and consumed == bad[:1] * 2
@@ -0,0 +1,71 @@
+import pathlib, sys, asyncio
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[3]))
+
+import pytest
+from apps.codegen import codegen
+from libs.schemas import ProblemDoc, OCRItem
+
+GOOD = "print([[CAS:a]])\n---CAS-JOBS---\n[[CAS:a:1+1]]"
+BAD = "print([[CAS:a]], [[CAS:b]])\n---CAS-JOBS---\n[[CAS:a:1+1]]"   # b 작업 없음
+
+TIERS = [
+    {"when": {"has_diagram": False, "has_list": True}, "model": "gpt-5-nano", "escalate": False},
+    {"when": {"has_diagram": False}, "model": "gpt-5-mini"},
+]
+
+
+def _doc(category="Text"):
+    return ProblemDoc(items=[OCRItem(bbox=[0, 0, 10, 10], category=category, text="1+1")], image_path=None)
+
+
+def _setup(fake_llm, replies, **gen):
+    """호출된 모델 순서 리스트를 반환 (티어 → codegen 에스컬레이션 확인용)."""
+    return fake_llm(replies, models={"codegen": "gpt-5", "tiers": TIERS}, **{"repair_rounds": 0, "stream": False, **gen}).models
+
+
+def test_select_model_first_matching_tier():
+    models_cfg = {"codegen": "gpt-5", "tiers": TIERS}
+    route = {"mode": "vision", "has_formula": True, "has_diagram": False, "has_list": False}
+    assert codegen._select_model(route, models_cfg) == ("gpt-5-mini", "gpt-5")
+    assert codegen._select_model({**route, "has_list": True}, models_cfg) == ("gpt-5-nano", None)
+    assert codegen._select_model({**route, "has_diagram": True}, models_cfg) == ("gpt-5", None)
+    assert codegen._select_model(route, {"codegen": "gpt-5"}) == ("gpt-5", None)
+
+
+def test_text_only_uses_tier_model(fake_llm):
+    models = _setup(fake_llm, [GOOD])
+    assert codegen.generate_manim(_doc()).cas_jobs == [{"id": "a", "expr": "1+1"}]
+    assert models == ["gpt-5-mini"]
+
+
+def test_failed_validation_escalates_to_codegen_model(fake_llm):
+    models = _setup(fake_llm, [BAD, GOOD])
+    assert codegen.generate_manim(_doc()).cas_jobs == [{"id": "a", "expr": "1+1"}]
+    assert models == ["gpt-5-mini", "gpt-5"]
+
+    models = _setup(fake_llm, [BAD, GOOD])
+    cj = asyncio.run(codegen.agenerate_manim(_doc()))
+    assert cj.cas_jobs == [{"id": "a", "expr": "1+1"}] and models == ["gpt-5-mini", "gpt-5"]
+
+
+def test_codegen_model_failure_is_not_escalated(fake_llm):
+    # 도형 문제 → 티어 없음 → 기존과 같이 가드 실패가 그대로 올라감
+    models = _setup(fake_llm, ["print(1)"])
+    with pytest.raises(ValueError, match="no GEO placeholders"):
+        codegen.generate_manim(_doc("Picture"))
+    assert models == ["gpt-5"]
+
+
+def test_only_accepted_output_emits_events(fake_llm):
+    stale = "print([[CAS:a]], [[CAS:b]])\n---CAS-JOBS---\n[[CAS:a:2+2]]"   # 티어 출력: 선행 CAS 이벤트가 될 줄 포함
+    models = _setup(fake_llm, [stale, GOOD], stream=True)
+    events = []
+    cj = asyncio.run(codegen.agenerate_manim(_doc(), on_event=events.append))
+    assert models == ["gpt-5-mini", "gpt-5"] and cj.cas_jobs == [{"id": "a", "expr": "1+1"}]
+    assert [(ev.kind, ev.data) for ev in events] == [("cas_job", {"id": "a", "expr": "1+1"})]
+
+    # 채택된 티어 시도: 검증 후 같은 이벤트
+    models = _setup(fake_llm, [GOOD], stream=True)
+    events.clear()
+    asyncio.run(codegen.agenerate_manim(_doc(), on_event=events.append))
+    assert models == ["gpt-5-mini"] and [ev.data for ev in events] == [{"id": "a", "expr": "1+1"}]
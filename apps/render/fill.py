@@ -114,6 +114,94 @@ def detect_invalid_cas_token_patterns(draft: str) -> List[str]:
     return offenders
 
 
+_POINT_CTOR_RE = re.compile(r"\b(?P<ctor>Dot|Line|DashedLine|Arrow|Polygon|Polyline|ArcBetweenPoints)\(")
+_NUMERIC_POINT_RE = re.compile(
+    r"[\[(]\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)(?:\s*,\s*(-?\d+(?:\.\d+)?))?\s*[\])]"
+)
+_KWARG_RE = re.compile(r"^\s*(?P<name>[A-Za-z_]\w*)\s*=(?!=)")
+# 라벨 점 변수: A = Dot(...), B1 = ..., dot_A = ..., A_dot = ...
+_LABEL_VAR_RE = re.compile(r"^\s*(?:[Dd]ot_?)?[A-Z]\d?(?:_?[Dd]ot)?\s*=\s*$")
+
+
+def _non_origin(m: "re.Match[str]") -> bool:
+    return any(v is not None and float(v) != 0.0 for v in m.groups())
+
+
+def _call_args(line: str, start: int) -> List[str]:
+    """line[start:] 가 여는 괄호 바로 뒤일 때, 짝이 맞는 닫는 괄호까지의 최상위 인자들 (줄 끝에서 끊기면 거기까지)."""
+    args: List[str] = []
+    depth, quote, cur = 0, None, start
+    for i in range(start, len(line)):
+        ch = line[i]
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in "'\"":
+            quote = ch
+        elif ch in "([{":
+            depth += 1
+        elif ch in ")]}":
+            if depth == 0:
+                args.append(line[cur:i])
+                return [a for a in args if a.strip()]
+            depth -= 1
+        elif ch == "," and depth == 0:
+            args.append(line[cur:i])
+            cur = i + 1
+    args.append(line[cur:])
+    return [a for a in args if a.strip()]
+
+
+def _point_args(args: List[str]) -> List[str]:
+    """위치 인자 + point= 인자 (color=, stroke_width= 같은 키워드 인자 제외)."""
+    out = []
+    for a in args:
+        kw = _KWARG_RE.match(a)
+        if kw is None:
+            out.append(a.strip())
+        elif kw["name"] == "point":
+            out.append(a[kw.end():].strip())
+    return out
+
+
+def _is_numeric_point(arg: str) -> bool:
+    if arg.startswith("np.array(") and arg.endswith(")"):
+        arg = arg[len("np.array("):-1].strip()
+    m = _NUMERIC_POINT_RE.fullmatch(arg)
+    return m is not None and _non_origin(m)
+
+
+def detect_numeric_point_literals(draft: str) -> List[str]:
+    """
+    Detect numeric point literals where a [[GEO:point:*]] token is required:
+      - a labeled vertex:   A = Dot([1.5, 2, 0])
+      - a figure polygon:   Polygon([0, 0, 0], [3, 0, 0], [0, 4, 0])
+      - mixed with GEO:     Line([[GEO:point:A]], [2, 1, 0])
+    Only the constructor's own (balanced-paren) point arguments are checked, so the origin,
+    purely decorative calls (Dot([0, 0, 0], color=GRAY), Line([-7, -3, 0], [7, -3, 0])),
+    chained .shift([0, 0.2, 0]) / .move_to(...) and offsets like [[GEO:point:A]] + np.array([1, 0, 0])
+    are allowed. Line-based, so it gives the same answer for a streamed line and the full draft.
+    Returns offending snippets.
+    """
+    offenders: List[str] = []
+    for line in draft.splitlines():
+        for m in _POINT_CTOR_RE.finditer(line):
+            args = _call_args(line, m.end())
+            points = _point_args(args)
+            numeric = [p for p in points if _is_numeric_point(p)]
+            if not numeric:
+                continue
+            labeled = (
+                m["ctor"] == "Dot"
+                and _LABEL_VAR_RE.match(line[:m.start()]) is not None
+                and _is_numeric_point(points[0])
+            )
+            if labeled or m["ctor"] in {"Polygon", "Polyline"} or any("[[GEO:" in p for p in points):
+                offenders.append(line[m.start():m.end() + 20])
+                break
+    return offenders
+
+
 def extract_geo_labels(keys: Set[str]) -> Set[str]:
     """
     From GEO placeholder keys like "point:A", "angle:B-A-C", "tangent_dir:D",
@@ -36,3 +36,23 @@ def test_geo_on_missing_fail():
     draft = "print([[GEO:point:A]])"
     with pytest.raises(ValueError):
         fill_placeholders(draft, [], on_missing="fail_build")
+
+
+def test_numeric_point_literals_only_where_geo_required():
+    from apps.render.fill import detect_numeric_point_literals as detect
+    # 원점 표시 / 장식용 Dot·Line 은 허용
+    assert detect("o = Dot([0, 0, 0], color=GRAY)") == []
+    assert detect("base = Line([-7, -3, 0], [7, -3, 0], color=GRAY)") == []
+    assert detect("d = Dot(np.array([1, 2, 0]))") == []
+    # 라벨 점 / 도형 다각형 / GEO 토큰과 섞인 수치 좌표는 위반
+    assert detect("A = Dot([1.5, 2, 0])")
+    assert detect("dot_B = Dot(point=np.array([3, 1, 0]))")
+    assert detect("tri = Polygon([0, 0, 0], [3, 0, 0], [0, 4, 0])")
+    assert detect("s = Line([[GEO:point:A]], [2, 1, 0])")
+    assert detect("A = Dot([[GEO:point:A]])") == []
+    # 생성자 인자 밖(체인 호출)과 GEO 점 기준 오프셋은 허용
+    assert detect("s = Line([[GEO:point:A]], [[GEO:point:B]]).shift([0, 0.2, 0])") == []
+    assert detect("t = Polygon([[GEO:point:A]], [[GEO:point:B]], [[GEO:point:C]]).shift((0.5, 0))") == []
+    assert detect("t = Polygon(A.get_center(), B.get_center(), C.get_center()).move_to([1, 0, 0])") == []
+    assert detect("v = Arrow([[GEO:point:A]], [[GEO:point:A]] + np.array([1, 0, 0]))") == []
+    assert detect("A = Dot([[GEO:point:A]]).shift([0.1, 0, 0])") == []
@@ -10,7 +10,8 @@ def route_problem(doc: ProblemDoc) -> Dict:
     has_formula = any(i.category == "Formula" for i in doc.items)
     has_diagram = any(i.category in PICTURE_CATS for i in doc.items)
     has_list = any(i.category in LIST_CATS for i in doc.items)
-    mode = "vision" if (bool(doc.image_path) or has_formula) else "text"
+    has_image = bool(doc.image_path) or getattr(doc, "image_bytes", None) is not None
+    mode = "vision" if (has_image or has_formula) else "text"
     return {
         "mode": mode,
         "has_formula": has_formula,
@@ -0,0 +1,125 @@
+# libs/admission.py
+"""
+Admission control / backpressure.
+
+- lane별(in-flight) 상한: "llm"(GPT 호출), "cpu"(GeometryHint/GeoCAS/CAS)
+- 진입 티켓: 요청(배치는 항목 수만큼)이 들어올 때 await 없이 원자적으로 예약, 끝날 때 반납.
+  실행 중 + 대기 중인 요청 수가 max_queue 를 넘으면 새 요청은 즉시 Overloaded → 429 Retry-After
+- Retry-After는 lane별 평균 처리시간(EWMA) × 대기열 길이 / 상한 으로 추정
+"""
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+
+class Overloaded(Exception):
+    def __init__(self, retry_after: int, depth: int):
+        super().__init__(f"server overloaded (queue depth {depth})")
+        self.retry_after = retry_after
+        self.depth = depth
+
+
+class Ticket:
+    """try_acquire 로 예약한 진입 티켓. release() 는 여러 번 불러도 한 번만 반납 (k 개씩 부분 반납 가능)."""
+    def __init__(self, ctl: "AdmissionController", n: int):
+        self._ctl = ctl
+        self.remaining = n
+
+    def release(self, k: Optional[int] = None) -> None:
+        k = self.remaining if k is None else min(k, self.remaining)
+        if k > 0:
+            self.remaining -= k
+            self._ctl.admitted -= k
+
+
+class _Lane:
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = max(1, int(limit))
+        self.sem = asyncio.Semaphore(self.limit)
+        self.in_flight = 0
+        self.waiting = 0
+        self.ewma_s = 0.0
+
+    def observe(self, seconds: float, alpha: float = 0.2) -> None:
+        self.ewma_s = seconds if self.ewma_s == 0.0 else (1 - alpha) * self.ewma_s + alpha * seconds
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        llm_max_in_flight: int = 16,
+        cpu_max_in_flight: int = 8,
+        max_queue: int = 64,
+        retry_after_min_s: int = 1,
+        retry_after_max_s: int = 60,
+    ):
+        self.lanes: Dict[str, _Lane] = {
+            "llm": _Lane("llm", llm_max_in_flight),
+            "cpu": _Lane("cpu", cpu_max_in_flight),
+        }
+        self.max_queue = int(max_queue)
+        self.retry_after_min_s = int(retry_after_min_s)
+        self.retry_after_max_s = int(retry_after_max_s)
+        self.rejected = 0
+        self.admitted = 0   # 티켓을 가진(실행 중 + 대기 중) 요청 수
+
+    @property
+    def depth(self) -> int:
+        return sum(l.waiting for l in self.lanes.values())
+
+    def retry_after(self) -> int:
+        est = max(
+            (l.ewma_s * (l.waiting + 1) / l.limit for l in self.lanes.values()),
+            default=0.0,
+        )
+        return int(min(self.retry_after_max_s, max(self.retry_after_min_s, math.ceil(est))))
+
+    def try_acquire(self, n: int = 1) -> Ticket:
+        """
+        요청 진입 시 호출 (await 없음 → 이벤트 루프 안에서 원자적): n 개 티켓을 예약하거나 바로 거절.
+        반환된 Ticket 은 요청이 끝날 때 finally 에서 release().
+        """
+        if self.admitted + n > self.max_queue:
+            self.rejected += 1
+            raise Overloaded(self.retry_after(), self.admitted)
+        self.admitted += n
+        return Ticket(self, n)
+
+    @asynccontextmanager
+    async def slot(self, lane: str) -> AsyncIterator[None]:
+        l = self.lanes[lane]
+        l.waiting += 1
+        try:
+            await l.sem.acquire()
+        finally:
+            l.waiting -= 1
+        l.in_flight += 1
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            l.in_flight -= 1
+            l.sem.release()
+            l.observe(time.perf_counter() - t0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self.depth,
+            "admitted": self.admitted,
+            "max_queue": self.max_queue,
+            "rejected_total": self.rejected,
+            "lanes": {
+                name: {
+                    "in_flight": l.in_flight,
+                    "waiting": l.waiting,
+                    "limit": l.limit,
+                    "ewma_s": round(l.ewma_s, 4),
+                }
+                for name, l in self.lanes.items()
+            },
+        }
@@ -0,0 +1,126 @@
+# libs/cache.py
+"""
+디스크 기반 JSON 캐시 (content-addressed, 크기 상한 LRU).
+
+- 키: 호출 측에서 만든 sha256 (libs.io_utils.content_key)
+- 값: JSON 직렬화 가능한 객체
+- 최근 사용 = 파일 mtime (get 시 갱신). max_bytes 초과 시 오래된 항목부터 max_bytes × EVICT_TO 까지 제거
+- 총 크기는 put/delete 때 증감으로 추적 → 디렉터리 전체 스캔은 추정치가 상한을 넘을 때와
+  rescan_every 번째 put 마다만 (다른 워커 프로세스의 쓰기는 이때 반영)
+- 쓰기는 임시파일 → os.replace 로 원자적 (여러 워커 프로세스가 같은 디렉터리 공유 가능)
+"""
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Optional
+
+EVICT_TO = 0.9   # 한 번 제거할 때 상한의 90% 까지 비워 경계 부근 put 마다 스캔하지 않도록
+
+
+class DiskCache:
+    def __init__(self, root: str | Path, max_bytes: int = 256 * 1024 * 1024, rescan_every: int = 256):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = int(max_bytes)
+        self.rescan_every = max(1, int(rescan_every))
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None   # 추정 총 크기 (None = 다음 put 에서 스캔)
+        self._puts = 0
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Any]:
+        path = self._path(key)
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            os.utime(path)  # LRU 갱신
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return data
+
+    def put(self, key: str, value: Any) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        old = _file_size(path)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(value, f, ensure_ascii=False)
+            new = os.stat(tmp).st_size
+            os.replace(tmp, path)
+        except Exception:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        self._account(new - old)
+
+    def delete(self, key: str) -> bool:
+        path = self._path(key)
+        size = _file_size(path)
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            return False
+        with self._lock:
+            if self._size is not None:
+                self._size = max(0, self._size - size)
+        return True
+
+    def clear(self) -> int:
+        n = 0
+        for path in self.root.glob("*/*.json"):
+            path.unlink(missing_ok=True)
+            n += 1
+        with self._lock:
+            self._size = 0
+        return n
+
+    def size_bytes(self) -> int:
+        return sum(e[2] for e in self._entries())
+
+    def _entries(self):
+        out = []
+        for path in self.root.glob("*/*.json"):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            out.append((st.st_mtime, path, st.st_size))
+        return out
+
+    def _account(self, delta: int) -> None:
+        with self._lock:
+            self._puts += 1
+            if self._size is not None and self._puts % self.rescan_every:
+                self._size += delta
+                if self._size <= self.max_bytes:
+                    return
+            self._evict()
+
+    def _evict(self) -> None:
+        """디렉터리를 스캔해 추정치를 실제 크기로 맞추고, 상한을 넘었으면 오래된 항목부터 제거 (lock 보유 상태)."""
+        entries = self._entries()
+        total = sum(e[2] for e in entries)
+        if total > self.max_bytes:
+            target = int(self.max_bytes * EVICT_TO)
+            for _mtime, path, size in sorted(entries, key=lambda e: e[0]):
+                path.unlink(missing_ok=True)
+                total -= size
+                if total <= target:
+                    break
+        self._size = total
+
+
+def _file_size(path: Path) -> int:
+    try:
+        return path.stat().st_size
+    except FileNotFoundError:
+        return 0
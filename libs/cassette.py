@@ -0,0 +1,70 @@
+# libs/cassette.py
+"""
+LLM 응답 record/replay (오프라인·재현 가능한 벤치마크용).
+
+    MANION_CASSETTE=record   실제 호출 후 응답 원문을 저장
+    MANION_CASSETTE=replay   저장본만 사용, 네트워크/API 키 불필요 (없으면 CassetteMiss)
+    MANION_CASSETTE_DIR      저장 위치 (기본 ManimcodeOutput/_cassettes)
+
+키 = sha256(model + 요청 messages 정규화 JSON) → 프롬프트/OCR/이미지가 같으면 같은 응답.
+"""
+from __future__ import annotations
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+from libs.io_utils import content_key
+
+RECORD, REPLAY = "record", "replay"
+DEFAULT_DIR = Path("ManimcodeOutput/_cassettes")
+
+
+class CassetteMiss(RuntimeError):
+    pass
+
+
+def mode() -> Optional[str]:
+    m = os.getenv("MANION_CASSETTE", "").strip().lower()
+    if m in {"", "off", "0"}:
+        return None
+    if m not in {RECORD, REPLAY}:
+        raise ValueError(f"MANION_CASSETTE must be 'record' or 'replay' (got {m!r})")
+    return m
+
+
+def cassette_dir() -> Path:
+    return Path(os.getenv("MANION_CASSETTE_DIR") or DEFAULT_DIR)
+
+
+def key_for(model: str, messages: Any) -> str:
+    return content_key({"model": model, "messages": messages})
+
+
+def _path(key: str) -> Path:
+    return cassette_dir() / key[:2] / f"{key}.json"
+
+
+def replay(key: str) -> Optional[str]:
+    """replay 모드면 저장된 응답 원문 반환(없으면 CassetteMiss), 그 외 모드는 None."""
+    if mode() != REPLAY:
+        return None
+    p = _path(key)
+    if not p.exists():
+        raise CassetteMiss(f"no recorded response for key {key[:12]}… in {cassette_dir()} (record it first)")
+    return json.loads(p.read_text(encoding="utf-8"))["text"]
+
+
+def record(key: str, model: str, text: str) -> None:
+    if mode() != RECORD:
+        return
+    p = _path(key)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    tmp = p.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text(
+        json.dumps({"key": key, "model": model, "text": text, "recorded_at": time.time()}, ensure_ascii=False),
+        encoding="utf-8",
+    )
+    os.replace(tmp, p)
@@ -0,0 +1,89 @@
+# libs/checkpoint.py
+"""
+단계별 체크포인트 (문제 단위 디렉터리, 단계당 JSON 하나).
+
+    ManimcodeOutput/_checkpoints/<problem>/
+        _inputs.json          입력 지문(OCR JSON + 이미지 바이트 sha256)
+        geometry_hint.json    GeometryHint
+        codegen.json          CodegenJob (LLM 초안)
+        geocas.json           ExactGeometry
+        cas.json              [CASResult, ...]
+
+--resume-from <stage> 는 그 이전 단계를 저장본에서 복원하고 이후 단계만 다시 실행.
+(GeoCAS/CAS/fill 수정 후 LLM 재호출 없이 저장된 초안으로 재검증)
+"""
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from libs.io_utils import content_key, sha256_bytes
+
+# 체크포인트 대상 단계 (route/validate 는 저렴하므로 항상 재실행)
+STAGES: List[str] = ["geometry_hint", "codegen", "geocas", "cas", "fill"]
+DEFAULT_ROOT = Path("ManimcodeOutput/_checkpoints")
+
+
+class CheckpointError(RuntimeError):
+    pass
+
+
+def input_fingerprint(ocr_items: List[Dict[str, Any]], image_bytes: Optional[bytes]) -> str:
+    return content_key({
+        "ocr": ocr_items,
+        "image": sha256_bytes(image_bytes) if image_bytes is not None else None,
+    })
+
+
+def stages_to_restore(resume_from: Optional[str]) -> List[str]:
+    """resume_from 이전 단계 목록 (None → 전부 재실행)."""
+    if resume_from is None:
+        return []
+    if resume_from not in STAGES:
+        raise CheckpointError(f"unknown stage {resume_from!r} (choose from {', '.join(STAGES)})")
+    return STAGES[:STAGES.index(resume_from)]
+
+
+class CheckpointStore:
+    def __init__(self, problem: str, root: str | Path = DEFAULT_ROOT):
+        self.problem = problem
+        self.dir = Path(root) / problem
+
+    def _path(self, stage: str) -> Path:
+        return self.dir / f"{stage}.json"
+
+    def has(self, stage: str) -> bool:
+        return self._path(stage).exists()
+
+    def save(self, stage: str, data: Any) -> None:
+        self.dir.mkdir(parents=True, exist_ok=True)
+        p = self._path(stage)
+        tmp = p.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp, p)
+
+    def load(self, stage: str) -> Any:
+        p = self._path(stage)
+        if not p.exists():
+            raise CheckpointError(f"no checkpoint for stage {stage!r} at {p} (run without --resume-from first)")
+        return json.loads(p.read_text(encoding="utf-8"))
+
+    # ------------------------------------------------------------------
+    # 입력 지문: 입력(OCR/이미지)이 바뀌었는데 예전 초안을 재사용하는 실수 방지
+    # ------------------------------------------------------------------
+    def bind_inputs(self, fingerprint: str, resume_from: Optional[str]) -> None:
+        """새 실행이면 지문을 기록, 재개 실행이면 저장된 지문과 일치하는지 확인."""
+        if stages_to_restore(resume_from):
+            saved = self.load("_inputs").get("fingerprint")
+            if saved != fingerprint:
+                raise CheckpointError(
+                    f"checkpoint for {self.problem!r} was recorded from different inputs; "
+                    "rerun without --resume-from"
+                )
+        else:
+            # 새 실행: 이전 실행의 후속 단계 저장본이 섞이지 않도록 비움
+            for stage in STAGES:
+                self._path(stage).unlink(missing_ok=True)
+            self.save("_inputs", {"fingerprint": fingerprint})
@@ -0,0 +1,167 @@
+# libs/compact.py
+"""
+프롬프트 페이로드 압축 (configs/openai.toml [prompt]).
+
+OCR_JSON / GEOMETRY_HINT 원본은 bbox·좌표 실수값과, 벡터화/HoughLinesP 가 만든
+수백 개의 P{n} 점·중복 선분 때문에 입력 토큰(=TTFT)을 크게 늘린다. 여기서는
+  - 좌표 양자화 (quantum px, 기본 1 → 정수)
+  - 라벨 없는 P{n} 점 제거, 짧은/거의 겹치는 선분·원 제거
+  - 목록 상한 + 토큰 예산 초과 시 상한을 절반씩 축소 (라벨 점은 항상 유지)
+  - 표 형식(한 줄 = 한 항목) 출력
+을 하고, 원본 대비 토큰 추정치를 리포트로 돌려준다.
+프롬프트 전용: doc.geometry_hint 자체(GEO 치환의 유사변환 입력)는 건드리지 않는다.
+"""
+from __future__ import annotations
+
+import json
+import math
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+UNLABELED_RE = re.compile(r"P\d+")
+
+
+def estimate_tokens(text: str) -> int:
+    """대략적 토큰 수: ASCII 는 4자당 1, 비ASCII(한글 등)는 1자당 1."""
+    ascii_n = sum(1 for ch in text if ord(ch) < 128)
+    return (ascii_n + 3) // 4 + (len(text) - ascii_n)
+
+
+def _q(v: float, quantum: float) -> Any:
+    x = round(float(v) / quantum) * quantum
+    return int(x) if quantum >= 1 else round(x, 3)
+
+
+def _fmt(*vals: Any) -> str:
+    return " ".join(str(v) for v in vals)
+
+# -------------------------------
+# OCR
+# -------------------------------
+
+def compact_ocr(ocr_items: Sequence[Dict[str, Any]], quantum: float = 1.0) -> str:
+    """한 줄 = category|x1,y1,x2,y2|text (text 는 마지막 열이라 '|' 가 있어도 모호하지 않음)."""
+    rows = ["OCR_TABLE (category|x1,y1,x2,y2|text):"]
+    for it in ocr_items:
+        bbox = ",".join(str(_q(v, quantum)) for v in (it.get("bbox") or [])[:4])
+        text = (it.get("text") or "").replace("\n", "\\n")
+        rows.append(f"{it.get('category')}|{bbox}|{text}")
+    return "\n".join(rows)
+
+# -------------------------------
+# GeometryHint
+# -------------------------------
+
+def _dedupe_lines(lines: List[Tuple], eps: float, min_len: float) -> List[Tuple]:
+    kept: List[Tuple] = []
+    for p1, p2 in lines:
+        if math.dist(p1, p2) < min_len:
+            continue
+        dup = any(
+            (math.dist(p1, a) <= eps and math.dist(p2, b) <= eps) or (math.dist(p1, b) <= eps and math.dist(p2, a) <= eps)
+            for a, b in kept
+        )
+        if not dup:
+            kept.append((p1, p2))
+    # 긴 선분 우선 (도형 외곽/주요 변)
+    return sorted(kept, key=lambda s: -math.dist(*s))
+
+
+def _dedupe_circles(circles: List[Dict[str, Any]], eps: float) -> List[Dict[str, Any]]:
+    kept: List[Dict[str, Any]] = []
+    for c in circles:
+        if not any(math.dist(c["center"], k["center"]) <= eps and abs(c["radius"] - k["radius"]) <= eps for k in kept):
+            kept.append(c)
+    return kept
+
+
+def _render_hint(points, lines, circles, arcs, omitted: Dict[str, int], quantum: float) -> str:
+    rows = ["GEOMETRY_HINT (compact; px, y축 아래 방향):"]
+    if points:
+        rows.append("points id x y: " + "; ".join(_fmt(pid, _q(x, quantum), _q(y, quantum)) for pid, (x, y) in points))
+    if lines:
+        rows.append("lines x1 y1 x2 y2: " + "; ".join(
+            _fmt(_q(a[0], quantum), _q(a[1], quantum), _q(b[0], quantum), _q(b[1], quantum)) for a, b in lines
+        ))
+    if circles:
+        rows.append("circles id cx cy r: " + "; ".join(
+            _fmt(c["id"], _q(c["center"][0], quantum), _q(c["center"][1], quantum), _q(c["radius"], quantum))
+            for c in circles
+        ))
+    if arcs:
+        rows.append("arcs circle theta_start theta_end sweep: " + "; ".join(
+            _fmt(a.get("circle"), round(float(a.get("theta_start", 0.0)), 2), round(float(a.get("theta_end", 0.0)), 2),
+                 a.get("sweep", "ccw"))
+            for a in arcs
+        ))
+    dropped = {k: v for k, v in omitted.items() if v}
+    if dropped:
+        rows.append("omitted: " + ", ".join(f"{k} {v}" for k, v in dropped.items()))
+    return "\n".join(rows)
+
+
+def compact_hint(hint: Dict[str, Any], cfg: Optional[Dict[str, Any]] = None) -> str:
+    cfg = cfg or {}
+    quantum = float(cfg.get("quantum", 1.0))
+    eps = float(cfg.get("dedupe_px", 3.0))
+    min_len = float(cfg.get("min_line_px", 4.0))
+    keep_unlabeled = bool(cfg.get("keep_unlabeled_points", False))
+    caps = {
+        "lines": int(cfg.get("max_lines", 60)),
+        "circles": int(cfg.get("max_circles", 20)),
+        "arcs": int(cfg.get("max_arcs", 20)),
+        "points": int(cfg.get("max_unlabeled_points", 40)),
+    }
+    budget = int(cfg.get("hint_token_budget", 1500))
+
+    raw_points = [(str(p.get("id")), tuple(p.get("xy") or (0, 0))) for p in hint.get("points_hint", []) or []]
+    labeled = [p for p in raw_points if not UNLABELED_RE.fullmatch(p[0])]
+    unlabeled = [p for p in raw_points if UNLABELED_RE.fullmatch(p[0])] if keep_unlabeled else []
+    lines = _dedupe_lines(
+        [(tuple(l["p1"]), tuple(l["p2"])) for l in hint.get("lines", []) or [] if "p1" in l and "p2" in l], eps, min_len
+    )
+    circles = _dedupe_circles(
+        [c for c in hint.get("circles", []) or [] if "center" in c and "radius" in c], eps
+    )
+    arcs_all = list(hint.get("arcs", []) or [])
+
+    while True:
+        kept_circles = circles[:caps["circles"]]
+        kept_ids = {c["id"] for c in kept_circles}
+        kept_arcs = [a for a in arcs_all if a.get("circle") in kept_ids][:caps["arcs"]]
+        points = labeled + unlabeled[:caps["points"]]
+        omitted = {
+            "points": len(raw_points) - len(points),
+            "lines": len(hint.get("lines", []) or []) - min(len(lines), caps["lines"]),
+            "circles": len(hint.get("circles", []) or []) - len(kept_circles),
+            "arcs": len(arcs_all) - len(kept_arcs),
+        }
+        text = _render_hint(points, lines[:caps["lines"]], kept_circles, kept_arcs, omitted, quantum)
+        if estimate_tokens(text) <= budget or not any(caps.values()):
+            return text
+        caps = {k: v // 2 for k, v in caps.items()}
+
+# -------------------------------
+# 요청 단위
+# -------------------------------
+
+def compact_payload(
+    ocr_items: Sequence[Dict[str, Any]],
+    hint: Optional[Dict[str, Any]],
+    cfg: Optional[Dict[str, Any]] = None,
+) -> Tuple[str, str, Dict[str, int]]:
+    """
+    (OCR 블록, GEOMETRY_HINT 블록(없으면 ""), 리포트) 반환.
+    리포트: 원본 JSON 대비 토큰 추정치 {ocr_raw, ocr_compact, hint_raw, hint_compact}
+    """
+    cfg = cfg or {}
+    quantum = float(cfg.get("quantum", 1.0))
+    ocr_raw = f"OCR_JSON:\n{json.dumps(list(ocr_items), ensure_ascii=False)}"
+    ocr_block = compact_ocr(ocr_items, quantum)
+    report = {"ocr_raw": estimate_tokens(ocr_raw), "ocr_compact": estimate_tokens(ocr_block)}
+    hint_block = ""
+    if hint:
+        hint_raw = f"GEOMETRY_HINT:\n{json.dumps(hint, ensure_ascii=False)}"
+        hint_block = compact_hint(hint, cfg)
+        report.update(hint_raw=estimate_tokens(hint_raw), hint_compact=estimate_tokens(hint_block))
+    return ocr_block, hint_block, report
@@ -0,0 +1,115 @@
+# libs/imageprep.py
+"""
+LLM 업로드 전 이미지 전처리 (configs/openai.toml [image]).
+
+    mode = "full"   원본 한 장: 실제 포맷 판별(MIME), 긴 변이 max_edge 초과일 때만 축소·재인코딩
+    mode = "crops"  Picture/Formula OCR bbox 크롭 + 저해상도 전체 썸네일 (도형 디테일 유지, 업로드/비전 토큰 감소)
+
+크롭할 bbox 가 없거나 디코딩할 수 없는 이미지는 full 과 같게 처리한다 (원본 바이트를 그대로 보냄).
+"""
+from __future__ import annotations
+
+import base64
+import io
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+from PIL import Image, UnidentifiedImageError
+
+FULL, CROPS = "full", "crops"
+SUPPORTED_MIME = {"image/jpeg", "image/png", "image/webp", "image/gif"}
+DEFAULT_CROP_CATS = ("Picture", "Formula")
+
+
+@dataclass
+class PreparedImage:
+    data: bytes
+    mime: str
+    label: str = "page"     # "page" | "thumbnail" | "Picture[x1,y1,x2,y2]"
+
+    def data_url(self) -> str:
+        return f"data:{self.mime};base64,{base64.b64encode(self.data).decode('utf-8')}"
+
+
+def sniff_mime(data: bytes) -> Optional[str]:
+    """매직 바이트로 실제 포맷 판별 (확장자/호출자 가정 대신)."""
+    if data[:3] == b"\xff\xd8\xff":
+        return "image/jpeg"
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return "image/png"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    return None
+
+
+def _encode(img: Image.Image, src_mime: Optional[str], quality: int) -> PreparedImage:
+    buf = io.BytesIO()
+    if src_mime == "image/png":
+        # 선 그림/스캔은 PNG 유지 (JPEG 링잉이 가는 선을 흐림)
+        img.save(buf, format="PNG", optimize=True)
+        return PreparedImage(buf.getvalue(), "image/png")
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    img.save(buf, format="JPEG", quality=quality, optimize=True)
+    return PreparedImage(buf.getvalue(), "image/jpeg")
+
+
+def _cap(img: Image.Image, max_edge: int) -> Image.Image:
+    if max(img.size) <= max_edge:
+        return img
+    scale = max_edge / max(img.size)
+    size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+    return img.resize(size, Image.LANCZOS)
+
+
+def _bbox(item: Any) -> Sequence[float]:
+    return item.bbox if hasattr(item, "bbox") else item["bbox"]
+
+
+def _category(item: Any) -> Optional[str]:
+    return item.category if hasattr(item, "category") else item.get("category")
+
+
+def prepare_images(
+    image_bytes: bytes,
+    items: Sequence[Any] = (),
+    cfg: Optional[Dict[str, Any]] = None,
+) -> List[PreparedImage]:
+    cfg = cfg or {}
+    mode = cfg.get("mode", FULL)
+    max_edge = int(cfg.get("max_edge", 2048))
+    quality = int(cfg.get("jpeg_quality", 90))
+    src_mime = sniff_mime(image_bytes)
+
+    try:
+        img = Image.open(io.BytesIO(image_bytes))
+        img.load()
+    except (UnidentifiedImageError, OSError):
+        # 디코딩 불가: 손대지 않고 전송 (API 가 판단)
+        return [PreparedImage(image_bytes, src_mime or "image/jpeg")]
+
+    if mode == CROPS:
+        crop_cats = set(cfg.get("crop_categories", DEFAULT_CROP_CATS))
+        pad = int(cfg.get("crop_pad", 12))
+        crops: List[PreparedImage] = []
+        for it in items:
+            if _category(it) not in crop_cats:
+                continue
+            x1, y1, x2, y2 = (int(round(v)) for v in _bbox(it)[:4])
+            box = (max(0, x1 - pad), max(0, y1 - pad), min(img.width, x2 + pad), min(img.height, y2 + pad))
+            if box[2] <= box[0] or box[3] <= box[1]:
+                continue
+            out = _encode(_cap(img.crop(box), max_edge), src_mime, quality)
+            out.label = f"{_category(it)}[{x1},{y1},{x2},{y2}]"
+            crops.append(out)
+        if crops:
+            thumb = _encode(_cap(img, int(cfg.get("thumb_edge", 512))), src_mime, quality)
+            thumb.label = "thumbnail"
+            return [thumb, *crops]
+
+    # full: 이미 작고 지원 포맷이면 원본 그대로 (재인코딩 손실/비용 없음)
+    if max(img.size) <= max_edge and src_mime in SUPPORTED_MIME:
+        return [PreparedImage(image_bytes, src_mime)]
+    return [_encode(_cap(img, max_edge), src_mime, quality)]
@@ -12,6 +12,13 @@ def validate_json_schema(data: Dict[str, Any], schema: Dict[str, Any]) -> None:
 def sha256_str(s: str) -> str:
     return hashlib.sha256(s.encode("utf-8")).hexdigest()
 
+def sha256_bytes(b: bytes) -> str:
+    return hashlib.sha256(b).hexdigest()
+
+def content_key(parts: Dict[str, Any]) -> str:
+    """여러 구성요소(문자열/다이제스트/설정 dict)를 정규화 JSON으로 묶어 sha256_str."""
+    return sha256_str(json.dumps(parts, sort_keys=True, ensure_ascii=False, separators=(",", ":")))
+
 # 매우 작은 JSON 스키마(필수 필드만) — 심화 스키마는 필요 시 확장
 CALC_MIN_SCHEMA = {
   "type": "object",
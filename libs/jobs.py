@@ -0,0 +1,142 @@
+# libs/jobs.py
+"""
+SQLite 기반 영속 작업 큐 (/jobs API 용).
+
+- 여러 uvicorn 워커가 같은 DB 파일을 공유 (WAL + BEGIN IMMEDIATE 로 원자적 claim)
+- 재시작 후에도 queued/running 작업이 남아 있으며, 하트비트가 끊긴 running 작업은 재큐잉
+"""
+from __future__ import annotations
+
+import json
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id          TEXT PRIMARY KEY,
+    status      TEXT NOT NULL,
+    stage       TEXT,
+    payload     TEXT NOT NULL,
+    manim_code  TEXT,
+    error       TEXT,
+    status_code INTEGER,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    worker      TEXT,
+    created_at  REAL NOT NULL,
+    updated_at  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs(status, created_at);
+"""
+
+
+class JobStore:
+    def __init__(self, path: str | Path, busy_timeout_ms: int = 5000):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.busy_timeout_ms = busy_timeout_ms
+        with self._session() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # 호출마다 짧은 연결: 스레드/프로세스 간 공유 문제 없음
+        conn = sqlite3.connect(str(self.path), timeout=self.busy_timeout_ms / 1000, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        return conn
+
+    @contextmanager
+    def _session(self) -> Iterator[sqlite3.Connection]:
+        conn = self._connect()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    # ------------------------------------------------------------------
+    # 제출 / 조회
+    # ------------------------------------------------------------------
+    def submit(self, payload: Dict[str, Any]) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._session() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, payload, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, QUEUED, json.dumps(payload, ensure_ascii=False), now, now),
+            )
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._session() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    # ------------------------------------------------------------------
+    # 워커 측
+    # ------------------------------------------------------------------
+    def claim(self, worker: str) -> Optional[Dict[str, Any]]:
+        """가장 오래된 queued 작업 하나를 원자적으로 running 으로 전환해 반환."""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, worker = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (RUNNING, worker, time.time(), row["id"]),
+            )
+            job = conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+            conn.execute("COMMIT")
+            return dict(job)
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def set_stage(self, job_id: str, stage: str) -> None:
+        with self._session() as conn:
+            conn.execute("UPDATE jobs SET stage = ?, updated_at = ? WHERE id = ?", (stage, time.time(), job_id))
+
+    def heartbeat(self, job_id: str) -> None:
+        with self._session() as conn:
+            conn.execute("UPDATE jobs SET updated_at = ? WHERE id = ? AND status = ?", (time.time(), job_id, RUNNING))
+
+    def finish(self, job_id: str, manim_code: str) -> None:
+        with self._session() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, stage = ?, manim_code = ?, status_code = 200, updated_at = ? WHERE id = ?",
+                (SUCCEEDED, "done", manim_code, time.time(), job_id),
+            )
+
+    def fail(self, job_id: str, error: str, status_code: int = 500) -> None:
+        with self._session() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, status_code = ?, updated_at = ? WHERE id = ?",
+                (FAILED, error, status_code, time.time(), job_id),
+            )
+
+    def requeue_stale(self, lease_s: float, max_attempts: int = 3) -> int:
+        """하트비트가 lease_s 이상 끊긴 running 작업을 재큐잉 (시도 초과 시 실패 처리)."""
+        cutoff = time.time() - lease_s
+        with self._session() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, status_code = 500, updated_at = ? "
+                "WHERE status = ? AND updated_at < ? AND attempts >= ?",
+                (FAILED, "worker lost (max attempts exceeded)", time.time(), RUNNING, cutoff, max_attempts),
+            )
+            cur = conn.execute(
+                "UPDATE jobs SET status = ?, worker = NULL, updated_at = ? WHERE status = ? AND updated_at < ?",
+                (QUEUED, time.time(), RUNNING, cutoff),
+            )
+            return cur.rowcount
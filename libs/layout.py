@@ -2,12 +2,15 @@
 from __future__ import annotations
 from typing import List, Sequence, Any, Dict, Optional, Tuple
 from pathlib import Path
+import functools
 import subprocess
 import tempfile
 import math
 import xml.etree.ElementTree as ET
 import logging
 
+from libs.tracing import span
+
 # ---------- Optional deps (graceful import) ----------
 def _try_import(mod):
     try:
@@ -105,7 +108,9 @@ def _round_xy(x: float, y: float, nd: int = ROUND_PT) -> Tuple[float, float]:
 # ============================================================
 # SVG 벡터화 → GeometryHint
 # ============================================================
+@functools.lru_cache(maxsize=None)
 def _has_bin(cmd: str) -> bool:
+    # 프로세스당 한 번만 실제 실행(--version) 후 결과 재사용
     try:
         subprocess.run([cmd, "--version"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
         return True
@@ -113,6 +118,10 @@ def _has_bin(cmd: str) -> bool:
         logger.warning("Binary '%s' not found; geometry hint extraction may be degraded.", cmd)
         return False
 
+def probe_binaries() -> Dict[str, bool]:
+    """벡터화 외부 바이너리 존재 여부 (워밍업용; 결과는 _has_bin 캐시에 남음)."""
+    return {cmd: _has_bin(cmd) for cmd in ("inkscape", "potrace")}
+
 def _bitmap_to_svg_via_inkscape(src: Path, dst_svg: Path) -> bool:
     try_cmds = [
         ["inkscape", str(src), f"--export-filename={dst_svg}",
@@ -204,14 +213,19 @@ def _parse_svg_paths(svg_path: Path) -> Dict:
     out["points_hint"] = [{"id": f"P{i+1}", "xy": [round(x, ROUND_PT), round(y, ROUND_PT)]} for i, (x, y) in enumerate(pts)]
     return out
 
-def _fallback_detect_with_opencv(src: Path) -> Dict:
+def _image_buffer(src: Optional[Path], data: Optional[bytes]):
+    """이미 메모리에 있는 바이트가 있으면 복사 없이 사용, 없으면 파일에서 읽음."""
+    if data is not None:
+        return np.frombuffer(data, dtype=np.uint8)
+    return np.fromfile(str(src), dtype=np.uint8)
+
+def _fallback_detect_with_opencv(src: Optional[Path], data: Optional[bytes] = None) -> Dict:
     out = {"circles": [], "lines": [], "arcs": [], "points_hint": []}
     if not (cv2 and np):
         logger.warning("OpenCV or numpy not available; geometry hint extraction will return empty hints.")
         return out
     try:
-        data = np.fromfile(str(src), dtype=np.uint8)
-        img = cv2.imdecode(data, cv2.IMREAD_GRAYSCALE)
+        img = cv2.imdecode(_image_buffer(src, data), cv2.IMREAD_GRAYSCALE)
     except Exception:
         img = None
     if img is None:
@@ -272,17 +286,18 @@ def _extract_label_boxes_from_ocr(
             out[txt] = (float(cx), float(cy))
     return out
 
-def _detect_quadrilateral_corners_raw(image_path: str) -> Optional[List[Tuple[float, float]]]:
+def _detect_quadrilateral_corners_raw(
+    image_path: Optional[str], data: Optional[bytes] = None
+) -> Optional[List[Tuple[float, float]]]:
     if cv2 is None or np is None:
         return None
     try:
-        # ✅ Windows 한글 경로 안전 읽기
-        data = np.fromfile(str(image_path), dtype=np.uint8)
-        img = cv2.imdecode(data, cv2.IMREAD_COLOR)
+        # ✅ Windows 한글 경로 안전 읽기 (np.fromfile) / 메모리 버퍼면 그대로 디코드
+        img = cv2.imdecode(_image_buffer(Path(image_path) if image_path else None, data), cv2.IMREAD_COLOR)
     except Exception:
         img = None
     if img is None:
-        logger.warning("OpenCV imdecode failed: %s", image_path)
+        logger.warning("OpenCV imdecode failed: %s", image_path or "<memory>")
         return None
 
     gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
@@ -317,6 +332,7 @@ def _order_quad_clockwise(pts: List[Tuple[float, float]]) -> List[Tuple[float, f
 def extract_primitives_from_image(
     image_path: Optional[str],
     ocr_json: Optional[List[Dict[str, Any]]] = None,
+    image_bytes: Optional[bytes] = None,
 ) -> Dict:
     """
     반환 GeometryHint:
@@ -326,27 +342,42 @@ def extract_primitives_from_image(
       2) (부가) 사각형 4꼭짓점 검출 → TL,BL,BR,TR
       3) OCR 라벨 A,B,C,D가 있으면 최근접 코너에 배정 (부분 라벨도 허용)
       4) 라벨이 없다면 TL,BL,BR,TR을 A,B,C,D로 자동 할당
+    image_bytes가 주어지면(업로드 경로) 디스크를 읽지 않고 그 버퍼 하나로 전체 단계를 처리.
     """
     empty = {"circles": [], "lines": [], "arcs": [], "points_hint": []}
-    if not image_path:
-        return empty
-
-    src = Path(image_path).expanduser().resolve()
-    if not src.exists():
-        return empty
+    src: Optional[Path] = None
+    if image_bytes is None:
+        if not image_path:
+            return empty
+        src = Path(image_path).expanduser().resolve()
+        if not src.exists():
+            return empty
+        image_bytes = src.read_bytes()  # 한 번만 읽고 아래 단계에서 공유
 
     # 0) 기본 힌트: 벡터화 → 파싱 / 실패 시 OpenCV 폴백
     with tempfile.TemporaryDirectory() as td:
         dst_svg = Path(td) / "trace.svg"
-        if _has_bin("inkscape") and _bitmap_to_svg_via_inkscape(src, dst_svg):
-            hint = _parse_svg_paths(dst_svg)
-        elif _has_bin("potrace") and _bitmap_to_svg_via_potrace(src, dst_svg):
-            hint = _parse_svg_paths(dst_svg)
-        else:
-            hint = _fallback_detect_with_opencv(src)
+
+        def _src_file() -> Path:
+            # inkscape/potrace는 파일 입력만 받으므로 메모리 버퍼는 필요할 때만 임시파일로 기록
+            return src if src is not None else _write_temp(Path(td) / "input.img", image_bytes)
+
+        hint: Optional[Dict] = None
+        if _has_bin("inkscape"):
+            with span("layout.inkscape", cat="layout"):
+                if _bitmap_to_svg_via_inkscape(_src_file(), dst_svg):
+                    hint = _parse_svg_paths(dst_svg)
+        if hint is None and _has_bin("potrace"):
+            with span("layout.potrace", cat="layout"):
+                if _bitmap_to_svg_via_potrace(_src_file(), dst_svg):
+                    hint = _parse_svg_paths(dst_svg)
+        if hint is None:
+            with span("layout.opencv", cat="layout"):
+                hint = _fallback_detect_with_opencv(src, data=image_bytes)
 
     # 1) 사각형 4꼭짓점 탐지
-    quad = _detect_quadrilateral_corners_raw(str(src))
+    with span("layout.quad", cat="layout"):
+        quad = _detect_quadrilateral_corners_raw(str(src) if src else None, data=image_bytes)
 
     # 2) OCR 라벨 추출
     label_boxes = _extract_label_boxes_from_ocr(ocr_json)
@@ -394,9 +425,13 @@ def _collect_point_pairs(exact_points: Dict[str, Sequence[float]], hint: Dict) -
     return exact_xy, hint_xy
 
 def compute_similarity_transform(exact_points: Dict[str, Sequence[float]], hint: Optional[Dict]):
+    """
+    GeoCAS 정확 좌표 → hint(points_hint) 좌표계 유사변환 (scale·회전·이동, Procrustes).
+    numpy 없음 / hint 없음 / 공통 라벨 2개 미만이면 항등 변환.
+    """
     if np is None or not hint:
         def identity(p): return (float(p[0]), float(p[1]))
-    return identity, {"scale": 1.0, "R": [[1.0, 0.0], [0.0, 1.0]], "t": [0.0, 0.0], "used_labels": []}
+        return identity, {"scale": 1.0, "R": [[1.0, 0.0], [0.0, 1.0]], "t": [0.0, 0.0], "used_labels": []}
 
     ex_xy, hint_xy = _collect_point_pairs(exact_points, hint)
     if len(ex_xy) < 2:
@@ -491,6 +526,11 @@ def build_geo_replacements(exact: Dict, hint: Optional[Dict] = None, decimals: i
     return repl
 
 # ---------- 내부 헬퍼 ----------
+def _write_temp(path: Path, data: bytes) -> Path:
+    if not path.exists():
+        path.write_bytes(data)
+    return path
+
 def _euclid_sq(a: Tuple[float, float], b: Tuple[float, float]) -> float:
     dx = a[0] - b[0]
     dy = a[1] - b[1]
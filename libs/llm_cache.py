@@ -0,0 +1,79 @@
+# libs/llm_cache.py
+"""
+LLM 응답 완전일치 캐시 (configs/openai.toml [llm_cache], 디스크 LRU = libs.cache.DiskCache).
+
+키 = sha256(model + 생성 파라미터 + 실제로 보낸 messages 정규화 JSON)
+     → 프롬프트/OCR/힌트/이미지/파라미터 중 하나라도 바뀌면 다른 키.
+값 = {"model", "text", "created_at"}; ttl_s 가 지난 항목은 miss 로 보고 삭제.
+
+    MANION_LLM_CACHE=on       설정과 무관하게 사용
+    MANION_LLM_CACHE=off      사용 안 함
+    MANION_LLM_CACHE=refresh  조회는 건너뛰고(새 샘플) 결과로 덮어씀
+
+cassette(record/replay)는 재현용 고정 녹화본, 이 캐시는 개발 반복용 단축 경로 — 조회 순서는 cassette → 캐시 → 네트워크.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from libs.cache import DiskCache
+from libs.io_utils import content_key
+
+ON, OFF, REFRESH = "on", "off", "refresh"
+DEFAULT_DIR = Path("ManimcodeOutput/_cache/llm")
+
+
+def mode(cfg: Optional[Dict[str, Any]] = None) -> str:
+    m = os.getenv("MANION_LLM_CACHE", "").strip().lower()
+    if not m:
+        return ON if (cfg or {}).get("enabled", False) else OFF
+    if m in {"1", "true", "yes"}:
+        return ON
+    if m in {"0", "false", "no"}:
+        return OFF
+    if m not in {ON, OFF, REFRESH}:
+        raise ValueError(f"MANION_LLM_CACHE must be 'on', 'off' or 'refresh' (got {m!r})")
+    return m
+
+
+class LLMResponseCache:
+    def __init__(self, root: str | Path = DEFAULT_DIR, max_bytes: int = 64 * 1024 * 1024, ttl_s: float = 7 * 86400):
+        self.store = DiskCache(root, max_bytes=max_bytes)
+        self.ttl_s = float(ttl_s)
+
+    @staticmethod
+    def key_for(model: str, params: Dict[str, Any], messages: Any) -> str:
+        return content_key({"model": model, "params": params, "messages": messages})
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self.store.get(key)
+        if not isinstance(entry, dict) or "text" not in entry:
+            return None
+        if self.ttl_s > 0 and time.time() - float(entry.get("created_at", 0)) > self.ttl_s:
+            self.store.delete(key)
+            return None
+        return entry["text"]
+
+    def put(self, key: str, model: str, text: str) -> None:
+        self.store.put(key, {"model": model, "text": text, "created_at": time.time()})
+
+
+_instances: Dict[tuple, LLMResponseCache] = {}
+_lock = threading.Lock()
+
+
+def from_config(cfg: Dict[str, Any]) -> LLMResponseCache:
+    """설정(디렉터리·상한·TTL)별 프로세스 전역 인스턴스: DiskCache 의 추정 크기를 호출마다 새로 스캔하지 않도록 재사용."""
+    root = os.getenv("MANION_LLM_CACHE_DIR") or cfg.get("dir", DEFAULT_DIR)
+    key = (str(root), int(cfg.get("max_bytes", 64 * 1024 * 1024)), float(cfg.get("ttl_s", 7 * 86400)))
+    cache = _instances.get(key)
+    if cache is None:
+        with _lock:
+            cache = _instances.get(key)
+            if cache is None:
+                cache = _instances[key] = LLMResponseCache(root=key[0], max_bytes=key[1], ttl_s=key[2])
+    return cache
@@ -0,0 +1,222 @@
+# libs/metrics.py
+"""
+경량 in-process 메트릭 (Prometheus text exposition 0.0.4).
+
+외부 의존성 없이 Counter / Gauge / Histogram 만 제공한다.
+값 갱신은 dict 조회 + lock 한 번이라 핫패스에서도 부담이 거의 없다.
+"""
+from __future__ import annotations
+
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+_REGISTRY: List["_Metric"] = []
+
+
+def _key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _fmt_value(v: float) -> str:
+    if math.isinf(v):
+        return "+Inf" if v > 0 else "-Inf"
+    return repr(float(v)) if not float(v).is_integer() else str(int(v))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._lock = threading.Lock()
+        _REGISTRY.append(self)
+
+    def _samples(self) -> Iterator[str]:  # pragma: no cover - 하위 클래스 구현
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str):
+        super().__init__(name, help)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        if amount < 0:
+            raise ValueError("counter can only increase")
+        k = _key(labels)
+        with self._lock:
+            self._values[k] = self._values.get(k, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(_key(labels), 0.0)
+
+    def _samples(self) -> Iterator[str]:
+        with self._lock:
+            items = list(self._values.items())
+        for k, v in items:
+            yield f"{self.name}{_fmt_labels(k)} {_fmt_value(v)}"
+
+
+class Gauge(_Metric):
+    """set() 으로 갱신하거나, set_function() 으로 scrape 시점에 값을 계산."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str):
+        super().__init__(name, help)
+        self._values: Dict[LabelKey, float] = {}
+        self._fn: Optional[Callable[[], Dict[LabelKey, float]]] = None
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[_key(labels)] = float(value)
+
+    def set_function(self, fn: Callable[[], Sequence[Tuple[Dict[str, str], float]]]) -> None:
+        self._fn = lambda: {_key(lbl): float(v) for lbl, v in fn()}
+
+    def _samples(self) -> Iterator[str]:
+        with self._lock:
+            values = dict(self._values)
+        if self._fn is not None:
+            try:
+                values.update(self._fn())
+            except Exception:
+                pass
+        for k, v in values.items():
+            yield f"{self.name}{_fmt_labels(k)} {_fmt_value(v)}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help)
+        self.buckets = tuple(sorted(buckets))
+        self._data: Dict[LabelKey, List[float]] = {}  # [bucket counts..., +Inf count, sum]
+
+    def observe(self, value: float, **labels: str) -> None:
+        k = _key(labels)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            d = self._data.get(k)
+            if d is None:
+                d = self._data[k] = [0.0] * (len(self.buckets) + 2)
+            d[idx] += 1  # idx == len(buckets) → +Inf 칸
+            d[-1] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def count(self, **labels: str) -> int:
+        d = self._data.get(_key(labels))
+        return int(sum(d[:-1])) if d else 0
+
+    def _samples(self) -> Iterator[str]:
+        with self._lock:
+            items = [(k, list(d)) for k, d in self._data.items()]
+        for k, d in items:
+            cum = 0.0
+            for ub, c in zip(self.buckets, d):
+                cum += c
+                yield f"{self.name}_bucket{_fmt_labels(k, ('le', _fmt_value(ub)))} {_fmt_value(cum)}"
+            cum += d[len(self.buckets)]
+            yield f"{self.name}_bucket{_fmt_labels(k, ('le', '+Inf'))} {_fmt_value(cum)}"
+            yield f"{self.name}_sum{_fmt_labels(k)} {_fmt_value(d[-1])}"
+            yield f"{self.name}_count{_fmt_labels(k)} {_fmt_value(cum)}"
+
+
+def render() -> str:
+    return "\n".join(m.render() for m in _REGISTRY) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# =========================
+# 파이프라인 공용 메트릭
+# =========================
+
+STAGE_SECONDS = Histogram("manion_stage_seconds", "Wall time per pipeline stage (pipeline=server|cli)")
+LLM_REQUESTS = Counter("manion_llm_requests_total", "LLM codegen requests by model")
+LLM_TOKENS = Counter(
+    "manion_llm_tokens_total", "LLM tokens from usage payloads (kind=input|output|cached|uncached; cached+uncached=input)"
+)
+PROMPT_TOKENS_EST = Counter(
+    "manion_prompt_tokens_estimated_total", "Estimated per-problem prompt tokens before/after compaction (part=ocr|hint, form=raw|compact)"
+)
+LLM_REPAIRS = Counter("manion_llm_repairs_total", "Targeted repair round-trips per section (section=geo|cas, result=fixed|unfixed)")
+LLM_STREAM_ABORTS = Counter("manion_llm_stream_aborts_total", "Codegen streams cancelled on a contract violation (reason=...)")
+LLM_RETRIES = Counter("manion_llm_retries_total", "Upstream call retries (hint=retry_after|jitter)")
+LLM_FALLBACKS = Counter("manion_llm_fallbacks_total", "Calls routed to the fallback model because the primary circuit was open")
+LLM_CIRCUIT_OPEN = Gauge("manion_llm_circuit_open", "1 while the per-model circuit breaker is open")
+LLM_ESCALATIONS = Counter("manion_llm_escalations_total", "Tier-model outputs that failed validation and were regenerated (from_model, to_model)")
+LLM_CANDIDATES = Counter(
+    "manion_llm_candidates_total", "Codegen candidates (kind=primary|hedge|retry, result=won|lost|rejected|error|cancelled)"
+)
+GEOCAS_SEEDS = Counter("manion_geocas_seed_attempts_total", "GeoCAS nsolve seed attempts")
+GEOCAS_SEED_FAILURES = Counter("manion_geocas_seed_failures_total", "GeoCAS nsolve seed attempts that raised")
+CAS_JOBS = Counter("manion_cas_jobs_total", "CAS jobs evaluated")
+CAS_SIMPLIFY_SECONDS = Counter("manion_cas_simplify_seconds_total", "Time spent in SymPy simplify for CAS jobs")
+CACHE_REQUESTS = Counter("manion_cache_requests_total", "Cache lookups (cache=..., result=hit|miss)")
+
+
+def record_geocas_stats(stats: Dict[str, float]) -> None:
+    GEOCAS_SEEDS.inc(stats.get("seed_attempts", 0))
+    GEOCAS_SEED_FAILURES.inc(stats.get("seed_failures", 0))
+
+
+def record_cas_stats(stats: Dict[str, float]) -> None:
+    CAS_JOBS.inc(stats.get("jobs", 0))
+    CAS_SIMPLIFY_SECONDS.inc(stats.get("simplify_s", 0.0))
+
+
+def record_llm_usage(resp, model: str) -> int:
+    """Responses API(input/output_tokens) 와 Chat(prompt/completion_tokens) usage 모두 지원. 반환: input+output 토큰."""
+    LLM_REQUESTS.inc(model=model)
+    usage = getattr(resp, "usage", None)
+    if usage is None:
+        return 0
+
+    def _get(obj, name):
+        return getattr(obj, name, None) if not isinstance(obj, dict) else obj.get(name)
+
+    inp = _get(usage, "input_tokens") or _get(usage, "prompt_tokens") or 0
+    out = _get(usage, "output_tokens") or _get(usage, "completion_tokens") or 0
+    details = _get(usage, "input_tokens_details") or _get(usage, "prompt_tokens_details")
+    cached = (_get(details, "cached_tokens") if details is not None else 0) or 0
+    LLM_TOKENS.inc(int(inp), kind="input", model=model)
+    LLM_TOKENS.inc(int(out), kind="output", model=model)
+    # 프롬프트 캐시 적중분(cached) / 미적중분(uncached): 적중률 = cached / input
+    LLM_TOKENS.inc(int(cached), kind="cached", model=model)
+    LLM_TOKENS.inc(max(0, int(inp) - int(cached)), kind="uncached", model=model)
+    return int(inp) + int(out)
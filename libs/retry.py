@@ -0,0 +1,279 @@
+# libs/retry.py
+"""
+업스트림(OpenAI) 호출 재시도 정책 + 서킷 브레이커 (configs/openai.toml [retry], [breaker]).
+
+- 대기: decorrelated jitter  sleep = min(cap_s, uniform(base_s, 이전 sleep × 3))
+- 서버 힌트: 429/503 의 Retry-After(-ms) 헤더가 있으면 그 값을 우선
+- 전체 deadline_s: 다음 대기 후 deadline 을 넘기게 되면 더 기다리지 않고 마지막 오류를 올림
+- 재시도 대상: 연결/타임아웃, HTTP 408/409/429/5xx. 나머지(400/401/404 …)는 즉시 실패
+- 브레이커: 모델별 최근 window 회 중 실패율이 failure_rate 이상이면 open → cooldown_s 동안 즉시 CircuitOpen
+  (호출자는 폴백 모델로 전환하거나 빠르게 실패), 이후 시험 호출 1개(half-open) 결과로 close/open
+
+acall() 은 asyncio.sleep 으로 대기(이벤트 루프를 막지 않음), call() 은 CLI/동기 경로용.
+"""
+from __future__ import annotations
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+from openai import APIConnectionError, APIStatusError
+
+from libs.metrics import LLM_CIRCUIT_OPEN, LLM_RETRIES
+
+T = TypeVar("T")
+RETRYABLE_STATUS = {408, 409, 429}
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpen(Exception):
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"circuit '{name}' is open (retry in {retry_in:.1f}s)")
+        self.name = name
+        self.retry_in = retry_in
+
+
+def is_retryable(e: BaseException) -> bool:
+    if isinstance(e, APIConnectionError):   # APITimeoutError 포함
+        return True
+    if isinstance(e, APIStatusError):
+        return e.status_code in RETRYABLE_STATUS or e.status_code >= 500
+    return False
+
+
+def retry_after_s(e: BaseException) -> Optional[float]:
+    """응답 헤더 retry-after-ms / retry-after(초 또는 HTTP 날짜) → 초. 없으면 None."""
+    headers = getattr(getattr(e, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        ms = headers.get("retry-after-ms")
+        if ms is not None:
+            return max(0.0, float(ms) / 1000)
+        ra = headers.get("retry-after")
+        if ra is None:
+            return None
+        try:
+            return max(0.0, float(ra))
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(ra).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class RetryPolicy:
+    max_attempts: int = 4
+    base_s: float = 0.5
+    cap_s: float = 20.0
+    deadline_s: float = 120.0
+
+    @classmethod
+    def from_config(cls, cfg: Dict[str, Any]) -> "RetryPolicy":
+        return cls(
+            max_attempts=max(1, int(cfg.get("max_attempts", 4))),
+            base_s=float(cfg.get("base_s", 0.5)),
+            cap_s=float(cfg.get("cap_s", 20.0)),
+            deadline_s=float(cfg.get("deadline_s", 120.0)),
+        )
+
+    def next_sleep(self, prev: float, rng: Optional[random.Random] = None) -> float:
+        return min(self.cap_s, (rng or random).uniform(self.base_s, max(self.base_s, prev * 3)))
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        window: int = 20,
+        min_calls: int = 10,
+        failure_rate: float = 0.5,
+        cooldown_s: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.outcomes: Deque[bool] = deque(maxlen=max(1, int(window)))
+        self.min_calls = int(min_calls)
+        self.failure_rate = float(failure_rate)
+        self.cooldown_s = float(cooldown_s)
+        self.clock = clock
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self._probe = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """호출해도 되는지. open 이 cooldown 을 지나면 half-open 으로 바꾸고 시험 호출 1개만 허용."""
+        with self._lock:
+            if self.state == OPEN and self.clock() - self.opened_at >= self.cooldown_s:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN:
+                if self._probe:
+                    return False
+                self._probe = True
+                return True
+            return self.state == CLOSED
+
+    def retry_in(self) -> float:
+        return max(0.0, self.cooldown_s - (self.clock() - self.opened_at))
+
+    def record(self, ok: Optional[bool]) -> None:
+        """ok=None: 결과 불명(취소 등) → half-open 시험 슬롯만 반납."""
+        with self._lock:
+            if ok is None:
+                self._probe = False
+                return
+            if self.state == HALF_OPEN:
+                self._probe = False
+                if ok:
+                    self.state = CLOSED
+                    self.outcomes.clear()
+                else:
+                    self.state, self.opened_at = OPEN, self.clock()
+            else:
+                self.outcomes.append(ok)
+                fails = self.outcomes.count(False)
+                if (
+                    self.state == CLOSED
+                    and len(self.outcomes) >= self.min_calls
+                    and fails / len(self.outcomes) >= self.failure_rate
+                ):
+                    self.state, self.opened_at = OPEN, self.clock()
+            state = self.state
+        LLM_CIRCUIT_OPEN.set(1.0 if state == OPEN else 0.0, circuit=self.name)
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker_for(name: str, cfg: Optional[Dict[str, Any]] = None) -> CircuitBreaker:
+    """프로세스 전역 브레이커 (이름 = 모델). cfg 는 처음 만들 때만 사용."""
+    with _breakers_lock:
+        b = _breakers.get(name)
+        if b is None:
+            cfg = cfg or {}
+            b = _breakers[name] = CircuitBreaker(
+                name,
+                window=int(cfg.get("window", 20)),
+                min_calls=int(cfg.get("min_calls", 10)),
+                failure_rate=float(cfg.get("failure_rate", 0.5)),
+                cooldown_s=float(cfg.get("cooldown_s", 30.0)),
+            )
+        return b
+
+
+def reset_breakers() -> None:
+    with _breakers_lock:
+        _breakers.clear()
+
+
+class _Attempts:
+    """call/acall 공용 상태: 시도 횟수, 다음 대기 계산, 브레이커 기록."""
+    def __init__(
+        self,
+        policy: RetryPolicy,
+        breaker: Optional[CircuitBreaker],
+        label: str,
+        should_retry: Optional[Callable[[BaseException], bool]],
+    ):
+        self.policy = policy
+        self.breaker = breaker
+        self.label = label
+        self.should_retry = should_retry
+        self.start = time.monotonic()
+        self.prev = policy.base_s
+        self.n = 0
+
+    def begin(self) -> int:
+        if self.breaker is not None and not self.breaker.allow():
+            raise CircuitOpen(self.breaker.name, self.breaker.retry_in())
+        self.n += 1
+        return self.n
+
+    def succeeded(self) -> None:
+        if self.breaker is not None:
+            self.breaker.record(True)
+
+    def failed(self, e: BaseException) -> Optional[float]:
+        """실패 기록 후 다음 대기(초). 재시도하지 않으면 None."""
+        retryable = is_retryable(e)
+        if self.breaker is not None:
+            # 재시도 불가 오류(400 등)는 업스트림은 응답한 것 → 브레이커에는 성공으로
+            self.breaker.record(not retryable)
+        if not retryable or self.n >= self.policy.max_attempts:
+            return None
+        if self.should_retry is not None and not self.should_retry(e):
+            return None
+        hint = retry_after_s(e)
+        self.prev = self.policy.next_sleep(self.prev)
+        wait = hint if hint is not None else self.prev
+        if time.monotonic() - self.start + wait > self.policy.deadline_s:
+            return None
+        LLM_RETRIES.inc(target=self.label, hint="retry_after" if hint is not None else "jitter")
+        return wait
+
+    def abandoned(self) -> None:
+        if self.breaker is not None:
+            self.breaker.record(None)
+
+
+async def acall(
+    fn: Callable[[int], Awaitable[T]],
+    policy: RetryPolicy,
+    breaker: Optional[CircuitBreaker] = None,
+    label: str = "llm",
+    should_retry: Optional[Callable[[BaseException], bool]] = None,
+) -> T:
+    """
+    fn(attempt) 를 정책대로 재시도. 대기는 asyncio.sleep (이벤트 루프 비차단).
+    should_retry: 재시도 가능한 오류라도 호출자 사정으로 재시도하면 안 될 때 False (예: 스트림 조각을 이미 소비).
+    """
+    st = _Attempts(policy, breaker, label, should_retry)
+    while True:
+        attempt = st.begin()
+        try:
+            result = await fn(attempt)
+        except Exception as e:
+            wait = st.failed(e)
+            if wait is None:
+                raise
+            await asyncio.sleep(wait)
+            continue
+        except BaseException:
+            st.abandoned()
+            raise
+        st.succeeded()
+        return result
+
+
+def call(
+    fn: Callable[[int], T],
+    policy: RetryPolicy,
+    breaker: Optional[CircuitBreaker] = None,
+    label: str = "llm",
+    should_retry: Optional[Callable[[BaseException], bool]] = None,
+) -> T:
+    """acall 의 동기 버전 (CLI/배치 워커 전용)."""
+    st = _Attempts(policy, breaker, label, should_retry)
+    while True:
+        attempt = st.begin()
+        try:
+            result = fn(attempt)
+        except Exception as e:
+            wait = st.failed(e)
+            if wait is None:
+                raise
+            time.sleep(wait)
+            continue
+        except BaseException:
+            st.abandoned()
+            raise
+        st.succeeded()
+        return result
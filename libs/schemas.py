@@ -23,6 +23,7 @@ class ProblemDoc(BaseModel):
     items: List[OCRItem]
     image_path: Optional[str] = None
     geometry_hint: Optional[Dict[str, Any]] = None  # NEW: SVG 벡터화/적합 결과 힌트
+    image_bytes: Optional[bytes] = Field(default=None, exclude=True, repr=False)  # 업로드 이미지(메모리 버퍼)
 
 
 # =========================
@@ -0,0 +1,77 @@
+import pathlib, sys, asyncio
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[2]))
+
+import pytest
+from libs.admission import AdmissionController, Overloaded
+
+
+def test_lane_limit_and_queue_depth():
+    async def scenario():
+        ctl = AdmissionController(llm_max_in_flight=1, cpu_max_in_flight=1, max_queue=2)
+        release = asyncio.Event()
+
+        async def hold():
+            ticket = ctl.try_acquire()
+            try:
+                async with ctl.slot("llm"):
+                    await release.wait()
+            finally:
+                ticket.release()
+
+        first = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        second = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        snap = ctl.snapshot()
+        assert snap["lanes"]["llm"]["in_flight"] == 1
+        assert snap["queue_depth"] == 1 and snap["admitted"] == 2
+        with pytest.raises(Overloaded) as e:
+            ctl.try_acquire()
+        assert e.value.retry_after >= 1
+        release.set()
+        await asyncio.gather(first, second)
+        assert ctl.depth == 0 and ctl.admitted == 0
+        ctl.try_acquire().release()
+        assert ctl.rejected == 1
+
+    asyncio.run(scenario())
+
+
+def test_burst_admits_exactly_max_queue():
+    async def scenario():
+        ctl = AdmissionController(llm_max_in_flight=2, max_queue=5)
+        gate = asyncio.Event()
+        admitted, rejected = [], []
+
+        async def request(i):
+            # 진입과 첫 slot() 사이에 await 가 있어도 예약은 진입 시점에 끝나 있어야 함
+            try:
+                ticket = ctl.try_acquire()
+            except Overloaded:
+                rejected.append(i)
+                return
+            admitted.append(i)
+            try:
+                await asyncio.sleep(0)
+                async with ctl.slot("llm"):
+                    await gate.wait()
+            finally:
+                ticket.release()
+
+        tasks = [asyncio.create_task(request(i)) for i in range(20)]
+        await asyncio.sleep(0.01)
+        assert len(admitted) == 5 and len(rejected) == 15
+        # 배치: 항목 수만큼 한 번에 예약, 부분 반납
+        with pytest.raises(Overloaded):
+            ctl.try_acquire(1)
+        gate.set()
+        await asyncio.gather(*tasks)
+        batch = ctl.try_acquire(5)
+        batch.release(2)
+        assert ctl.admitted == 3
+        batch.release()
+        batch.release()
+        assert ctl.admitted == 0
+
+    asyncio.run(scenario())
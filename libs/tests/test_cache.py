@@ -0,0 +1,54 @@
+import pathlib, sys, os, time
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[2]))
+
+from libs.cache import DiskCache
+from libs.io_utils import content_key
+
+
+def test_put_get_delete(tmp_path):
+    cache = DiskCache(tmp_path)
+    key = content_key({"image": "abc", "ocr": "def"})
+    assert cache.get(key) is None
+    cache.put(key, {"manim_code": "print(1)"})
+    assert cache.get(key) == {"manim_code": "print(1)"}
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.delete(key) is True
+    assert cache.get(key) is None
+
+
+def test_lru_eviction_keeps_recently_used(tmp_path):
+    cache = DiskCache(tmp_path, max_bytes=250)
+    keys = [content_key({"i": i}) for i in range(3)]
+    for i, key in enumerate(keys[:2]):
+        cache.put(key, {"v": "x" * 80})
+        old = time.time() - 100 + i
+        os.utime(cache._path(key), (old, old))
+    cache.get(keys[0])  # keys[0] becomes most recent
+    cache.put(keys[2], {"v": "x" * 80})
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[2]) is not None
+    assert cache.clear() == 2
+
+
+def test_puts_under_budget_do_not_rescan(tmp_path, monkeypatch):
+    cache = DiskCache(tmp_path, max_bytes=10_000, rescan_every=50)
+    scans = []
+    real = cache._entries
+    monkeypatch.setattr(cache, "_entries", lambda: scans.append(1) or real())
+    for i in range(40):
+        cache.put(content_key({"i": i}), {"v": "x" * 80})
+    assert len(scans) == 1   # 첫 put 의 초기 스캔만
+    assert cache._size == 40 * 89
+
+    cache.delete(content_key({"i": 0}))
+    assert cache._size == 39 * 89
+
+    # 다른 프로세스가 쓴 항목은 주기적 스캔에서 반영 → 상한 초과면 90% 까지 제거
+    other = DiskCache(tmp_path, max_bytes=10_000)
+    for i in range(100, 180):
+        other.put(content_key({"i": i}), {"v": "x" * 80})
+    for i in range(40, 50):
+        cache.put(content_key({"i": i}), {"v": "x" * 80})
+    assert len(scans) == 2 and cache._size == other.size_bytes() <= 9_000
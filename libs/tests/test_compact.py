@@ -0,0 +1,46 @@
+import pathlib, sys
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[2]))
+
+from libs.compact import compact_hint, compact_ocr, compact_payload, estimate_tokens
+
+
+def _noisy_hint(n=300):
+    lines = [{"id": f"l_{k}", "p1": [10.2 + (k % 3) * 0.4, 20.0], "p2": [200.1, 20.3 + (k % 2)]} for k in range(n)]
+    lines += [{"id": "l_x", "p1": [0, 0], "p2": [1, 1]}, {"id": "l_y", "p1": [50, 50], "p2": [50, 150]}]
+    points = [{"id": f"P{k}", "xy": [k * 1.5, k * 0.5]} for k in range(n)]
+    points += [{"id": "A", "xy": [10.4, 20.2]}, {"id": "B", "xy": [200.0, 20.6]}]
+    circles = [{"id": f"c_{k}", "center": [100 + k * 0.5, 100], "radius": 40.0} for k in range(5)]
+    arcs = [{"id": "a_1", "circle": "c_0", "theta_start": 0.0, "theta_end": 1.5708, "sweep": "ccw"}]
+    return {"lines": lines, "points_hint": points, "circles": circles, "arcs": arcs}
+
+
+def test_hint_drops_unlabeled_points_and_duplicates():
+    text = compact_hint(_noisy_hint())
+    assert "points id x y: A 10 20; B 200 21" in text
+    assert "P1 " not in text
+    # 300 개의 거의 같은 선분 → 1개, 너무 짧은 선분 제거, 세로 선분 유지
+    assert "lines x1 y1 x2 y2: 10 20 200 20; 50 50 50 150" in text
+    assert "circles id cx cy r: c_0 100 100 40" in text and "arcs circle" in text
+    assert "omitted: points 300, lines 300, circles 4" in text
+
+
+def test_hint_budget_shrinks_caps_but_keeps_labels():
+    hint = {
+        "lines": [{"p1": [k * 10, 0], "p2": [k * 10, 500]} for k in range(200)],
+        "points_hint": [{"id": "A", "xy": [1, 2]}],
+    }
+    text = compact_hint(hint, {"hint_token_budget": 120, "max_lines": 200})
+    assert estimate_tokens(text) <= 120
+    assert "A 1 2" in text
+
+
+def test_ocr_table_and_report():
+    items = [
+        {"bbox": [12.4, 7.6, 452, 58], "category": "Text", "text": "다음 | 그림\n은"},
+        {"bbox": [94, 81, 371, 181], "category": "Picture", "text": None},
+    ]
+    assert compact_ocr(items).splitlines()[1:] == ["Text|12,8,452,58|다음 | 그림\\n은", "Picture|94,81,371,181|"]
+    ocr, hint, report = compact_payload(items, _noisy_hint())
+    assert ocr.startswith("OCR_TABLE") and hint.startswith("GEOMETRY_HINT")
+    assert report["hint_compact"] < report["hint_raw"] / 10
+    assert compact_payload(items, None)[1] == ""
@@ -0,0 +1,51 @@
+import pathlib, sys, io
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[2]))
+
+from PIL import Image
+from libs.imageprep import prepare_images, sniff_mime
+from libs.schemas import OCRItem
+
+
+def _img_bytes(size, fmt):
+    buf = io.BytesIO()
+    Image.new("RGB", size, "white").save(buf, format=fmt)
+    return buf.getvalue()
+
+
+def test_sniff_mime():
+    assert sniff_mime(_img_bytes((4, 4), "PNG")) == "image/png"
+    assert sniff_mime(_img_bytes((4, 4), "JPEG")) == "image/jpeg"
+    assert sniff_mime(_img_bytes((4, 4), "WEBP")) == "image/webp"
+    assert sniff_mime(b"not an image") is None
+
+
+def test_full_keeps_small_original_with_real_mime():
+    png = _img_bytes((300, 200), "PNG")
+    [out] = prepare_images(png, cfg={"max_edge": 2048})
+    assert out.data == png and out.mime == "image/png"
+    assert out.data_url().startswith("data:image/png;base64,")
+
+
+def test_full_caps_long_edge():
+    big = _img_bytes((4000, 1000), "JPEG")
+    [out] = prepare_images(big, cfg={"max_edge": 1000})
+    assert out.mime == "image/jpeg"
+    assert Image.open(io.BytesIO(out.data)).size == (1000, 250)
+
+
+def test_crops_mode_sends_thumbnail_and_picture_crops():
+    page = _img_bytes((1200, 800), "PNG")
+    items = [
+        OCRItem(bbox=[0, 0, 1200, 50], category="Text", text="문제"),
+        OCRItem(bbox=[100, 100, 500, 400], category="Picture"),
+    ]
+    thumb, crop = prepare_images(page, items, {"mode": "crops", "thumb_edge": 300, "crop_pad": 10})
+    assert thumb.label == "thumbnail" and Image.open(io.BytesIO(thumb.data)).size == (300, 200)
+    assert crop.label == "Picture[100,100,500,400]"
+    assert Image.open(io.BytesIO(crop.data)).size == (420, 320)
+
+
+def test_crops_mode_without_picture_falls_back_to_full():
+    page = _img_bytes((200, 100), "JPEG")
+    [out] = prepare_images(page, [OCRItem(bbox=[0, 0, 10, 10], category="Text", text="x")], {"mode": "crops"})
+    assert out.data == page and out.label == "page"
@@ -0,0 +1,36 @@
+import pathlib, sys
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[2]))
+
+from libs.jobs import JobStore
+
+
+def test_submit_claim_finish(tmp_path):
+    store = JobStore(tmp_path / "jobs.sqlite3")
+    first = store.submit({"json_path": "a.json"})
+    second = store.submit({"json_path": "b.json"})
+
+    job = store.claim("w1")
+    assert job["id"] == first and job["status"] == "running" and job["attempts"] == 1
+    store.set_stage(first, "codegen")
+    assert store.get(first)["stage"] == "codegen"
+    store.finish(first, "print(1)")
+    assert store.get(first)["status"] == "succeeded"
+    assert store.get(first)["manim_code"] == "print(1)"
+
+    assert store.claim("w2")["id"] == second
+    assert store.claim("w3") is None
+
+
+def test_store_survives_reopen_and_requeues_stale(tmp_path):
+    path = tmp_path / "jobs.sqlite3"
+    job_id = JobStore(path).submit({"json_path": "a.json"})
+    JobStore(path).claim("dead-worker")
+
+    store = JobStore(path)
+    assert store.requeue_stale(lease_s=-1) == 1
+    assert store.get(job_id)["status"] == "queued"
+    store.claim("w1")
+    store.fail(job_id, "boom", 422)
+    job = store.get(job_id)
+    assert job["status"] == "failed" and job["status_code"] == 422 and job["attempts"] == 2
@@ -2,7 +2,7 @@ import pathlib, sys
 
 sys.path.append(str(pathlib.Path(__file__).resolve().parents[2]))
 
-from libs.layout import reading_order
+from libs.layout import compute_similarity_transform, reading_order
 
 
 class Obj:
@@ -32,3 +32,15 @@ def test_reading_order_tiebreakers():
     c = Obj([0, -2, 10, 8])
     ordered = reading_order([a, b, c])
     assert ordered == [c, b, a]
+
+
+def test_similarity_transform_fits_hint_points():
+    exact = {"A": (0.0, 0.0), "B": (1.0, 0.0), "C": (0.0, 1.0)}
+    # hint = exact 를 2배 확대 + (3, 4) 이동
+    hint = {"points_hint": [{"id": k, "xy": [2 * x + 3, 2 * y + 4]} for k, (x, y) in exact.items()]}
+    f, info = compute_similarity_transform(exact, hint)
+    assert abs(info["scale"] - 2.0) < 1e-9
+    assert all(abs(a - b) < 1e-9 for a, b in zip(f((1.0, 1.0)), (5.0, 6.0)))
+
+    f, info = compute_similarity_transform(exact, None)
+    assert f((1.0, 2.0)) == (1.0, 2.0) and info["scale"] == 1.0
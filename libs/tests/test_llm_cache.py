@@ -0,0 +1,45 @@
+import pathlib, sys, time
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[2]))
+
+import pytest
+from libs import llm_cache
+from libs.llm_cache import LLMResponseCache
+
+
+def test_key_covers_model_params_and_messages():
+    msgs = [{"role": "user", "content": "1+1"}]
+    k = LLMResponseCache.key_for("gpt-5", {"max_tokens": 10}, msgs)
+    assert k == LLMResponseCache.key_for("gpt-5", {"max_tokens": 10}, [dict(m) for m in msgs])
+    assert k != LLMResponseCache.key_for("gpt-5", {"max_tokens": 11}, msgs)
+    assert k != LLMResponseCache.key_for("gpt-4o", {"max_tokens": 10}, msgs)
+    assert k != LLMResponseCache.key_for("gpt-5", {"max_tokens": 10}, [{"role": "user", "content": "1+2"}])
+
+
+def test_ttl_expiry_deletes_entry(tmp_path, monkeypatch):
+    cache = LLMResponseCache(tmp_path, ttl_s=60)
+    cache.put("ab" * 32, "gpt-5", "text")
+    assert cache.get("ab" * 32) == "text"
+    monkeypatch.setattr(time, "time", lambda: 10 ** 12)
+    assert cache.get("ab" * 32) is None
+    assert not list(tmp_path.rglob("*.json"))
+
+
+def test_mode_env_overrides_config(monkeypatch):
+    monkeypatch.delenv("MANION_LLM_CACHE", raising=False)
+    assert llm_cache.mode({"enabled": False}) == "off"
+    assert llm_cache.mode({"enabled": True}) == "on"
+    monkeypatch.setenv("MANION_LLM_CACHE", "refresh")
+    assert llm_cache.mode({"enabled": False}) == "refresh"
+    monkeypatch.setenv("MANION_LLM_CACHE", "bogus")
+    with pytest.raises(ValueError):
+        llm_cache.mode({})
+
+
+def test_from_config_reuses_one_instance_per_config(tmp_path, monkeypatch):
+    monkeypatch.delenv("MANION_LLM_CACHE_DIR", raising=False)
+    cfg = {"dir": str(tmp_path / "a"), "max_bytes": 1000}
+    first = llm_cache.from_config(cfg)
+    assert llm_cache.from_config(dict(cfg)) is first
+    assert llm_cache.from_config({**cfg, "dir": str(tmp_path / "b")}) is not first
+    monkeypatch.setenv("MANION_LLM_CACHE_DIR", str(tmp_path / "c"))
+    assert llm_cache.from_config(cfg).store.root == tmp_path / "c"
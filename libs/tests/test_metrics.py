@@ -0,0 +1,50 @@
+import pathlib, sys
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[2]))
+
+from libs.metrics import Counter, Gauge, Histogram, record_llm_usage, LLM_TOKENS
+
+
+def test_counter_and_gauge_render():
+    c = Counter("t_requests_total", "test counter")
+    c.inc(model="a")
+    c.inc(2, model="a")
+    c.inc(model='b"x')
+    out = c.render()
+    assert "# TYPE t_requests_total counter" in out
+    assert 't_requests_total{model="a"} 3' in out
+    assert 't_requests_total{model="b\\"x"} 1' in out
+
+    g = Gauge("t_depth", "test gauge")
+    g.set_function(lambda: [({"lane": "llm"}, 4)])
+    assert 't_depth{lane="llm"} 4' in g.render()
+
+
+def test_histogram_buckets_are_cumulative():
+    h = Histogram("t_seconds", "test histogram", buckets=(0.1, 1.0))
+    h.observe(0.05, stage="x")
+    h.observe(0.1, stage="x")
+    h.observe(5.0, stage="x")
+    out = h.render()
+    assert 't_seconds_bucket{stage="x",le="0.1"} 2' in out
+    assert 't_seconds_bucket{stage="x",le="1"} 2' in out
+    assert 't_seconds_bucket{stage="x",le="+Inf"} 3' in out
+    assert 't_seconds_count{stage="x"} 3' in out
+    assert h.count(stage="x") == 3
+
+
+def test_record_llm_usage_reads_cached_tokens():
+    class Usage:
+        input_tokens = 100
+        output_tokens = 20
+        input_tokens_details = {"cached_tokens": 64}
+
+    class Resp:
+        usage = Usage()
+
+    before = LLM_TOKENS.value(kind="cached", model="m-test")
+    before_uncached = LLM_TOKENS.value(kind="uncached", model="m-test")
+    record_llm_usage(Resp(), "m-test")
+    assert LLM_TOKENS.value(kind="cached", model="m-test") - before == 64
+    assert LLM_TOKENS.value(kind="uncached", model="m-test") - before_uncached == 36
+    assert LLM_TOKENS.value(kind="input", model="m-test") >= 100
@@ -0,0 +1,97 @@
+import pathlib, sys, asyncio
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[2]))
+
+import httpx
+import openai
+import pytest
+from libs import retry
+
+
+def _status_error(code, headers=None):
+    resp = httpx.Response(code, headers=headers or {}, request=httpx.Request("POST", "https://api.test/v1/responses"))
+    return openai.APIStatusError(f"status {code}", response=resp, body=None)
+
+
+def _flaky(errors, result="ok"):
+    calls = []
+
+    async def fn(attempt):
+        calls.append(attempt)
+        if errors:
+            raise errors.pop(0)
+        return result
+    return fn, calls
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    waited = []
+
+    async def fake_sleep(s):
+        waited.append(s)
+    monkeypatch.setattr(retry.asyncio, "sleep", fake_sleep)
+    return waited
+
+
+def test_retry_after_header_preferred_over_jitter(sleeps):
+    fn, calls = _flaky([_status_error(429, {"retry-after": "3"}), _status_error(503, {"retry-after-ms": "250"})])
+    assert asyncio.run(retry.acall(fn, retry.RetryPolicy(base_s=0.1))) == "ok"
+    assert calls == [1, 2, 3] and sleeps == [3.0, 0.25]
+
+
+def test_decorrelated_jitter_bounded_by_cap(sleeps):
+    fn, _ = _flaky([_status_error(500) for _ in range(5)])
+    policy = retry.RetryPolicy(max_attempts=6, base_s=1.0, cap_s=2.0)
+    assert asyncio.run(retry.acall(fn, policy)) == "ok"
+    assert len(sleeps) == 5 and all(1.0 <= s <= 2.0 for s in sleeps)
+
+
+def test_non_retryable_and_deadline_fail_fast(sleeps):
+    fn, calls = _flaky([_status_error(400)])
+    with pytest.raises(openai.APIStatusError):
+        asyncio.run(retry.acall(fn, retry.RetryPolicy()))
+    assert calls == [1] and sleeps == []
+
+    # 서버 힌트가 deadline 을 넘기면 기다리지 않고 포기
+    fn, calls = _flaky([_status_error(429, {"retry-after": "60"})])
+    with pytest.raises(openai.APIStatusError):
+        asyncio.run(retry.acall(fn, retry.RetryPolicy(deadline_s=10)))
+    assert calls == [1] and sleeps == []
+
+
+def test_should_retry_veto(sleeps):
+    fn, calls = _flaky([_status_error(502)])
+    with pytest.raises(openai.APIStatusError):
+        asyncio.run(retry.acall(fn, retry.RetryPolicy(), should_retry=lambda e: False))
+    assert calls == [1]
+
+
+def test_breaker_opens_fails_fast_and_recovers():
+    now = [0.0]
+    b = retry.CircuitBreaker("m", window=4, min_calls=4, failure_rate=0.5, cooldown_s=10, clock=lambda: now[0])
+    for ok in (True, False, True, False):
+        assert b.allow()
+        b.record(ok)
+    assert b.state == retry.OPEN and not b.allow()
+
+    calls = []
+    with pytest.raises(retry.CircuitOpen):
+        retry.call(lambda i: calls.append(i), retry.RetryPolicy(), breaker=b)
+    assert calls == []
+
+    now[0] = 11.0
+    assert b.allow() and not b.allow()   # half-open: 시험 호출 1개만
+    b.record(True)
+    assert b.state == retry.CLOSED and b.allow()
+
+
+def test_sync_call_uses_time_sleep(monkeypatch):
+    waited = []
+    monkeypatch.setattr(retry.time, "sleep", waited.append)
+    errors = [_status_error(429, {"retry-after": "1"})]
+
+    def fn(attempt):
+        if errors:
+            raise errors.pop(0)
+        return attempt
+    assert retry.call(fn, retry.RetryPolicy()) == 2 and waited == [1.0]
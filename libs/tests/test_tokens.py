@@ -0,0 +1,42 @@
+import pathlib, sys, asyncio
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[2]))
+
+import pytest
+from libs import tokens
+
+
+@pytest.fixture
+def fresh_clients(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(tokens, "_client", None)
+    monkeypatch.setattr(tokens, "_async_client", None)
+    yield
+    asyncio.run(tokens.aclose_openai_clients())
+
+
+def test_http_cfg_maps_to_pool_and_timeouts():
+    kw = tokens._http_client_kwargs({
+        "max_connections": 8, "max_keepalive_connections": 4, "keepalive_expiry_s": 30,
+        "connect_timeout_s": 2, "read_timeout_s": 90,
+    })
+    assert kw["limits"].max_connections == 8
+    assert kw["limits"].max_keepalive_connections == 4
+    assert kw["limits"].keepalive_expiry == 30
+    assert kw["timeout"].connect == 2 and kw["timeout"].read == 90
+    assert kw["http2"] is False
+
+
+def test_http2_falls_back_without_h2(monkeypatch):
+    monkeypatch.setitem(sys.modules, "h2", None)  # import h2 → ImportError
+    assert tokens._http_client_kwargs({"http2": True})["http2"] is False
+
+
+def test_clients_are_process_wide_and_use_configured_pool(fresh_clients, monkeypatch):
+    monkeypatch.setattr(tokens, "_http_cfg", lambda: {"connect_timeout_s": 3, "read_timeout_s": 45})
+    c1, c2 = tokens.get_openai_client(), tokens.get_openai_client()
+    assert c1 is c2
+    assert c1.timeout.connect == 3 and c1.timeout.read == 45
+    assert c1.max_retries == 0   # 재시도는 libs/retry
+    a1 = tokens.get_async_openai_client()
+    assert a1 is tokens.get_async_openai_client()
+    assert a1.timeout.read == 45
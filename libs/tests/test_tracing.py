@@ -0,0 +1,60 @@
+import pathlib, sys, json
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[2]))
+
+from libs import tracing
+from apps.cas.compute import run_cas
+from libs.schemas import CASJob
+
+
+def test_span_is_noop_without_session(monkeypatch):
+    monkeypatch.delenv("MANION_DEBUG", raising=False)
+    with tracing.session("p") as tracer:
+        with tracing.span("x"):
+            pass
+    assert tracer is None and tracing.current() is None
+
+
+def test_session_writes_chrome_trace(monkeypatch, tmp_path):
+    monkeypatch.setenv("MANION_DEBUG", "1")
+    with tracing.session("prob", root=tmp_path):
+        with tracing.stage("cli", "cas"):
+            run_cas([CASJob(id="a", expr="1+1"), CASJob(id="b", expr="2*3")])
+        # 워커 실행 결과 병합 경로
+        _, events = tracing.run_traced(run_cas, [CASJob(id="c", expr="x+x")])
+        tracing.current().merge(events)
+
+    data = json.loads((tmp_path / "prob" / "trace.json").read_text(encoding="utf-8"))
+    spans = [e for e in data["traceEvents"] if e["ph"] == "X"]
+    names = [e["name"] for e in spans]
+    assert names.count("cas.job") == 3
+    assert "cas" in names and "prob" in names
+    assert all(e["dur"] >= 0 for e in spans)
+    cas_stage = next(e for e in spans if e["name"] == "cas")
+    first_job = next(e for e in spans if e["name"] == "cas.job")
+    assert cas_stage["ts"] <= first_job["ts"]
+
+
+def test_asession_writes_trace_off_event_loop(monkeypatch, tmp_path):
+    import asyncio, threading
+    monkeypatch.setenv("MANION_DEBUG", "1")
+    writers = []
+    real_write = tracing.write_trace
+
+    def spy_write(*a, **k):
+        writers.append(threading.get_ident())
+        return real_write(*a, **k)
+
+    monkeypatch.setattr(tracing, "write_trace", spy_write)
+
+    async def main():
+        async with tracing.asession("prob", root=tmp_path) as tracer:
+            with tracing.span("x"):
+                pass
+        return tracer, threading.get_ident()
+
+    tracer, loop_thread = asyncio.run(main())
+    assert tracer is not None and tracing.current() is None
+    assert writers and loop_thread not in writers
+    data = json.loads((tmp_path / "prob" / "trace.json").read_text(encoding="utf-8"))
+    assert {"x", "prob"} <= {e["name"] for e in data["traceEvents"] if e["ph"] == "X"}
@@ -1,12 +1,21 @@
+import logging
 import os
+import threading
+from pathlib import Path
+from tomllib import load
+from typing import Any, Dict
+
+import httpx
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
 
 
 load_dotenv()
 
+CONFIGS = Path(__file__).parents[1] / "configs"
 
-def get_openai_client():
+
+def _client_kwargs():
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         raise RuntimeError("OPENAI_API_KEY missing (.env)")
@@ -17,5 +26,78 @@ def get_openai_client():
     project = os.getenv("OPENAI_PROJECT")
     if project:
         kwargs["project"] = project
-    return OpenAI(**kwargs)
+    return kwargs
+
+
+def _http_cfg() -> Dict[str, Any]:
+    try:
+        with open(CONFIGS / "openai.toml", "rb") as f:
+            return load(f).get("http", {})
+    except FileNotFoundError:
+        return {}
+
+
+def _http_client_kwargs(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    """configs/openai.toml [http] → httpx 풀/keep-alive/타임아웃/HTTP2 설정 (sync/async 공용)."""
+    http2 = bool(cfg.get("http2", False))
+    if http2:
+        try:
+            import h2  # noqa: F401  (httpx[http2])
+        except ImportError:
+            logging.warning("[http] http2 = true but 'h2' is not installed; falling back to HTTP/1.1")
+            http2 = False
+    return {
+        "limits": httpx.Limits(
+            max_connections=int(cfg.get("max_connections", 100)),
+            max_keepalive_connections=int(cfg.get("max_keepalive_connections", 20)),
+            keepalive_expiry=float(cfg.get("keepalive_expiry_s", 60.0)),
+        ),
+        "timeout": httpx.Timeout(
+            float(cfg.get("read_timeout_s", 600.0)),
+            connect=float(cfg.get("connect_timeout_s", 5.0)),
+            pool=float(cfg.get("pool_timeout_s", 30.0)),
+        ),
+        "http2": http2,
+    }
+
+
+# 프로세스 전역 클라이언트 (커넥션 풀/TLS 세션 재사용)
+# 재시도는 libs/retry.py 가 담당 → SDK 내부 재시도는 끔 (두 겹으로 곱해지지 않도록)
+_client = None
+_async_client = None
+_lock = threading.Lock()
+
+
+def get_openai_client():
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                http = _http_client_kwargs(_http_cfg())
+                _client = OpenAI(
+                    **_client_kwargs(), timeout=http["timeout"], max_retries=0,
+                    http_client=DefaultHttpxClient(**http),
+                )
+    return _client
+
+
+def get_async_openai_client():
+    global _async_client
+    if _async_client is None:
+        with _lock:
+            if _async_client is None:
+                http = _http_client_kwargs(_http_cfg())
+                _async_client = AsyncOpenAI(
+                    **_client_kwargs(), timeout=http["timeout"], max_retries=0,
+                    http_client=DefaultAsyncHttpxClient(**http),
+                )
+    return _async_client
+
 
+async def aclose_openai_clients():
+    global _client, _async_client
+    if _async_client is not None:
+        await _async_client.close()
+    if _client is not None:
+        _client.close()
+    _client = _async_client = None
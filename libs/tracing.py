@@ -0,0 +1,186 @@
+# libs/tracing.py
+"""
+단계/하위 단계 span 프로파일러 → Chrome trace-event JSON (chrome://tracing, Perfetto).
+
+- MANION_DEBUG 설정 시 session(problem) 안에서만 활성, 그 외에는 span()이 거의 no-op
+- 결과: ManimcodeOutput/_debug/<problem>/trace.json (async 호출자는 asession: 파일 쓰기를 스레드에서)
+- 프로세스풀 경계: run_traced(fn, ...)가 워커에서 별도 트레이서로 실행 → 이벤트를 결과와 함께 반환 → merge()
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+from libs.metrics import STAGE_SECONDS
+
+DEBUG_ROOT = Path("ManimcodeOutput/_debug")
+
+
+def enabled() -> bool:
+    """MANION_DEBUG 가 켜져 있으면 session() 이 트레이스를 기록."""
+    return os.getenv("MANION_DEBUG", "").lower() in {"1", "true", "yes"}
+
+
+class Tracer:
+    def __init__(self) -> None:
+        # perf_counter 는 프로세스마다 기준이 달라서, 벽시계(µs)에 맞춘 오프셋으로 변환
+        self._origin_perf = time.perf_counter()
+        self._origin_us = time.time_ns() / 1000
+        self.pid = os.getpid()
+        self.events: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def _us(self, t_perf: float) -> float:
+        return self._origin_us + (t_perf - self._origin_perf) * 1e6
+
+    def record(self, name: str, t0: float, t1: float, cat: str = "span", **args: Any) -> None:
+        """perf_counter 구간 [t0, t1] 을 complete("X") 이벤트로 기록."""
+        ev = {
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": round(self._us(t0), 3),
+            "dur": round((t1 - t0) * 1e6, 3),
+            "pid": self.pid,
+            "tid": threading.get_ident(),
+        }
+        if args:
+            ev["args"] = {k: _jsonable(v) for k, v in args.items()}
+        with self._lock:
+            self.events.append(ev)
+
+    def merge(self, events: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            self.events.extend(events)
+
+    def to_chrome(self) -> Dict[str, Any]:
+        names = [
+            {"name": "process_name", "ph": "M", "pid": pid, "args": {"name": f"pid {pid}" + (" (main)" if pid == self.pid else "")}}
+            for pid in sorted({e["pid"] for e in self.events})
+        ]
+        return {"traceEvents": names + sorted(self.events, key=lambda e: e["ts"]), "displayTimeUnit": "ms"}
+
+
+def _jsonable(v: Any) -> Any:
+    if isinstance(v, (str, int, float, bool)) or v is None:
+        return v
+    return str(v)
+
+
+_current: ContextVar[Optional[Tracer]] = ContextVar("manion_tracer", default=None)
+
+
+def current() -> Optional[Tracer]:
+    return _current.get()
+
+
+@contextmanager
+def span(name: str, cat: str = "span", **args: Any) -> Iterator[Dict[str, Any]]:
+    tracer = _current.get()
+    if tracer is None:
+        yield args
+        return
+    t0 = time.perf_counter()
+    try:
+        yield args  # 본문에서 결과(바이트 수 등)를 args 에 추가 가능
+    except BaseException as e:
+        args["error"] = type(e).__name__
+        raise
+    finally:
+        tracer.record(name, t0, time.perf_counter(), cat=cat, **args)
+
+
+@contextmanager
+def stage(pipeline: str, name: str, **args: Any) -> Iterator[None]:
+    """파이프라인 단계: span + manion_stage_seconds 히스토그램을 한 번에."""
+    t0 = time.perf_counter()
+    try:
+        with span(name, cat="stage", **args):
+            yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - t0, pipeline=pipeline, stage=name)
+
+
+@contextmanager
+def session(problem_name: str, root: Path = DEBUG_ROOT) -> Iterator[Optional[Tracer]]:
+    """
+    MANION_DEBUG일 때 새 트레이스를 시작하고 종료 시 <root>/<problem>/trace.json 저장.
+    이미 트레이스가 활성이면(중첩 호출) 그것을 그대로 사용.
+    """
+    if _current.get() is not None or not enabled():
+        yield _current.get()
+        return
+    tracer = Tracer()
+    token = _current.set(tracer)
+    t0 = time.perf_counter()
+    try:
+        yield tracer
+    finally:
+        tracer.record(problem_name, t0, time.perf_counter(), cat="problem")
+        _current.reset(token)
+        write_trace(tracer, problem_name, root)
+
+
+@asynccontextmanager
+async def asession(problem_name: str, root: Path = DEBUG_ROOT) -> AsyncIterator[Optional[Tracer]]:
+    """session() 의 async 버전: trace.json 쓰기를 asyncio.to_thread 로 (이벤트 루프 비차단)."""
+    if _current.get() is not None or not enabled():
+        yield _current.get()
+        return
+    tracer = Tracer()
+    token = _current.set(tracer)
+    t0 = time.perf_counter()
+    try:
+        yield tracer
+    finally:
+        tracer.record(problem_name, t0, time.perf_counter(), cat="problem")
+        _current.reset(token)
+        await asyncio.to_thread(write_trace, tracer, problem_name, root)
+
+
+def write_trace(tracer: Tracer, problem_name: str, root: Path = DEBUG_ROOT) -> Optional[Path]:
+    try:
+        d = root / problem_name
+        d.mkdir(parents=True, exist_ok=True)
+        out = d / "trace.json"
+        out.write_text(json.dumps(tracer.to_chrome(), ensure_ascii=False), encoding="utf-8")
+        return out
+    except Exception:
+        # best-effort only
+        return None
+
+
+def stage_timings(events: List[Dict[str, Any]]) -> Dict[str, float]:
+    """cat=stage 이벤트 → {stage: 초} (같은 단계가 여러 번이면 합산)."""
+    out: Dict[str, float] = {}
+    for e in events:
+        if e.get("cat") == "stage":
+            out[e["name"]] = round(out.get(e["name"], 0.0) + e["dur"] / 1e6, 6)
+    return out
+
+
+@contextmanager
+def collect() -> Iterator[Tracer]:
+    """MANION_DEBUG와 무관하게 새 트레이서를 활성화 (워커 이벤트/배치 리포트 수집용)."""
+    tracer = Tracer()
+    token = _current.set(tracer)
+    try:
+        yield tracer
+    finally:
+        _current.reset(token)
+
+
+def run_traced(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Tuple[Any, List[Dict[str, Any]]]:
+    """
+    워커(스레드/프로세스)에서 fn 을 새 트레이서 아래 실행하고 (결과, 이벤트) 반환.
+    run_in_executor 는 contextvar 를 넘겨주지 않으므로 호출 측에서 merge() 해야 한다.
+    """
+    with collect() as tracer:
+        return fn(*args, **kwargs), tracer.events
@@ -0,0 +1,229 @@
+"""
+배치 재생성 CLI: 문제 폴더 전체에 run_pipeline 을 N개 프로세스로 병렬 실행.
+
+    python -m pipelines.batch Probleminput --workers 4 --timeout 600
+    python -m pipelines.e2e --batch Probleminput ...
+
+- 문제 하나당 프로세스 하나(spawn): 타임아웃 시 해당 프로세스만 terminate → 다른 문제에 영향 없음
+- 출력: ManimcodeOutput/<문제>/<문제>.py (단건 CLI와 동일)
+- 리포트: <out>/_batch/report.json, report.csv (상태, 단계별 소요시간, 에러 메시지)
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import functools
+import json
+import multiprocessing
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from multiprocessing.connection import wait
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from libs.checkpoint import STAGES as CHECKPOINT_STAGES
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".webp")
+STAGES = ("route", "geometry_hint", "codegen", "geocas", "cas", "fill")
+
+OK, ERROR, TIMEOUT = "ok", "error", "timeout"
+
+# -------------------------------
+# 문제 탐색
+# -------------------------------
+
+@dataclass
+class Problem:
+    name: str
+    json_path: str
+    image_path: Optional[str] = None
+
+
+def discover_problems(root: str | Path) -> List[Problem]:
+    """
+    root 아래 각 폴더에서 <폴더명>.json (없으면 첫 *.json) 과 같은 stem 의 이미지를 찾는다.
+    root 자체에 json 이 있으면 단일 문제 폴더로 취급.
+    """
+    root = Path(root)
+    dirs = [root] if any(root.glob("*.json")) else sorted(d for d in root.iterdir() if d.is_dir())
+    out: List[Problem] = []
+    for d in dirs:
+        ocr = d / f"{d.name}.json"
+        if not ocr.exists():
+            cands = sorted(d.glob("*.json"))
+            if not cands:
+                continue
+            ocr = cands[0]
+        img = next((ocr.with_suffix(ext) for ext in IMAGE_EXTS if ocr.with_suffix(ext).exists()), None)
+        out.append(Problem(name=ocr.stem, json_path=str(ocr), image_path=str(img) if img else None))
+    return out
+
+# -------------------------------
+# 워커
+# -------------------------------
+
+@dataclass
+class ProblemResult:
+    problem: str
+    status: str
+    elapsed_s: float = 0.0
+    stages: Dict[str, float] = field(default_factory=dict)
+    error: Optional[str] = None
+    output: Optional[str] = None
+
+
+def run_problem(problem: Problem, out_root: str, resume_from: Optional[str] = None) -> Dict[str, Any]:
+    """워커 프로세스에서 실행: 단건 CLI와 같은 경로(load_problem → run_pipeline → save_output)."""
+    from libs import tracing
+    from libs.checkpoint import CheckpointStore
+    from pipelines.e2e import load_problem, run_pipeline, save_output
+
+    ckpt = CheckpointStore(problem.name, Path(out_root) / "_checkpoints")
+    with tracing.collect() as tracer:
+        try:
+            code = run_pipeline(load_problem(problem.image_path, problem.json_path), ckpt, resume_from)
+        except Exception as e:
+            # 실패해도 거기까지의 단계 시간은 리포트에 남김
+            return {"stages": tracing.stage_timings(tracer.events), "error": f"{type(e).__name__}: {e}"}
+        finally:
+            if tracing.enabled():
+                tracing.write_trace(tracer, problem.name, Path(out_root) / "_debug")
+    out_py = save_output(code, problem.name, Path(out_root))
+    return {"stages": tracing.stage_timings(tracer.events), "output": str(out_py)}
+
+
+def _child(conn, target: Callable[[Problem, str], Dict[str, Any]], problem: Problem, out_root: str) -> None:
+    t0 = time.perf_counter()
+    try:
+        res = target(problem, out_root)
+        status = ERROR if res.get("error") else OK
+        conn.send(ProblemResult(problem.name, status, time.perf_counter() - t0, **res))
+    except BaseException as e:
+        conn.send(ProblemResult(problem.name, ERROR, time.perf_counter() - t0, error=f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+# -------------------------------
+# 스케줄러
+# -------------------------------
+
+def run_batch(
+    problems: Sequence[Problem],
+    workers: int = 4,
+    timeout_s: float = 600.0,
+    out_root: str | Path = "ManimcodeOutput",
+    target: Callable[[Problem, str], Dict[str, Any]] = run_problem,
+    on_result: Optional[Callable[[ProblemResult], None]] = None,
+) -> List[ProblemResult]:
+    ctx = multiprocessing.get_context("spawn")
+    pending = list(problems)
+    running: Dict[Any, tuple] = {}  # parent_conn -> (proc, problem, started_at)
+    results: Dict[str, ProblemResult] = {}
+
+    def _finish(res: ProblemResult) -> None:
+        res.elapsed_s = round(res.elapsed_s, 3)
+        results[res.problem] = res
+        if on_result is not None:
+            on_result(res)
+
+    while pending or running:
+        while pending and len(running) < max(1, workers):
+            prob = pending.pop(0)
+            parent, child = ctx.Pipe(duplex=False)
+            proc = ctx.Process(target=_child, args=(child, target, prob, str(out_root)), daemon=True)
+            proc.start()
+            child.close()
+            running[parent] = (proc, prob, time.monotonic())
+
+        # 결과 수신 (파이프가 읽을 수 있게 되면: 결과 도착 또는 자식 비정상 종료 → EOF)
+        for conn in wait(list(running), timeout=0.5):
+            proc, prob, started = running.pop(conn)
+            try:
+                res = conn.recv()
+            except EOFError:
+                proc.join()
+                res = ProblemResult(
+                    prob.name, ERROR, time.monotonic() - started, error=f"worker exited with code {proc.exitcode}"
+                )
+            conn.close()
+            proc.join()
+            _finish(res)
+
+        now = time.monotonic()
+        for conn, (proc, prob, started) in list(running.items()):
+            if now - started > timeout_s:
+                proc.terminate()
+                proc.join()
+                conn.close()
+                running.pop(conn)
+                _finish(ProblemResult(prob.name, TIMEOUT, now - started, error=f"timed out after {timeout_s:g}s"))
+
+    return [results[p.name] for p in problems]
+
+# -------------------------------
+# 리포트
+# -------------------------------
+
+def write_report(results: Sequence[ProblemResult], report_dir: str | Path) -> Dict[str, Path]:
+    report_dir = Path(report_dir)
+    report_dir.mkdir(parents=True, exist_ok=True)
+    summary = {
+        "total": len(results),
+        "ok": sum(r.status == OK for r in results),
+        "error": sum(r.status == ERROR for r in results),
+        "timeout": sum(r.status == TIMEOUT for r in results),
+        "elapsed_s": round(sum(r.elapsed_s for r in results), 3),
+    }
+    json_p = report_dir / "report.json"
+    json_p.write_text(
+        json.dumps({"summary": summary, "results": [asdict(r) for r in results]}, ensure_ascii=False, indent=2),
+        encoding="utf-8",
+    )
+
+    stage_cols = list(STAGES) + sorted({s for r in results for s in r.stages} - set(STAGES))
+    csv_p = report_dir / "report.csv"
+    with csv_p.open("w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["problem", "status", "elapsed_s", *[f"{s}_s" for s in stage_cols], "error"])
+        for r in results:
+            w.writerow([r.problem, r.status, r.elapsed_s, *[r.stages.get(s, "") for s in stage_cols], r.error or ""])
+    return {"json": json_p, "csv": csv_p}
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m pipelines.batch", description="Probleminput 일괄 재생성")
+    ap.add_argument("root", help="문제 폴더 루트 (예: Probleminput)")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    ap.add_argument("--timeout", type=float, default=600.0, help="문제당 타임아웃(초)")
+    ap.add_argument("--out", default="ManimcodeOutput")
+    ap.add_argument("--report-dir", default=None, help="기본: <out>/_batch")
+    ap.add_argument("--resume-from", choices=CHECKPOINT_STAGES, default=None,
+                    help="체크포인트(<out>/_checkpoints)에서 이전 단계 복원 (예: geocas → LLM 재호출 없음)")
+    ap.add_argument("--fresh", action="store_true", help="LLM 응답 캐시를 조회하지 않고 새로 생성 (결과로 캐시 갱신)")
+    args = ap.parse_args(argv)
+    if args.fresh:
+        os.environ["MANION_LLM_CACHE"] = "refresh"  # spawn 워커가 상속
+
+    problems = discover_problems(args.root)
+    if not problems:
+        print(f"[batch] no problems found under {args.root}")
+        return 1
+
+    def _log(r: ProblemResult) -> None:
+        tail = f" — {r.error.splitlines()[0]}" if r.error else ""
+        print(f"[batch] {r.status:7s} {r.elapsed_s:8.2f}s  {r.problem}{tail}", flush=True)
+
+    print(f"[batch] {len(problems)} problems, workers={args.workers}, timeout={args.timeout:g}s")
+    target = functools.partial(run_problem, resume_from=args.resume_from)
+    results = run_batch(
+        problems, workers=args.workers, timeout_s=args.timeout, out_root=args.out, target=target, on_result=_log
+    )
+    paths = write_report(results, args.report_dir or Path(args.out) / "_batch")
+    ok = sum(r.status == OK for r in results)
+    print(f"[batch] {ok}/{len(results)} ok → {paths['json']} / {paths['csv']}")
+    return 0 if ok == len(results) else 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
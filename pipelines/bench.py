@@ -0,0 +1,366 @@
+"""
+오프라인 벤치마크 (네트워크/LLM 없음).
+
+    python -m pipelines.bench run                       # 전체 → ManimcodeOutput/_bench/latest.json
+    python -m pipelines.bench run --only geocas,cas -r 10
+    python -m pipelines.bench run --save-baseline       # benchmarks/baseline.json 갱신
+    python -m pipelines.bench compare                   # latest vs baseline, 회귀 시 exit 1
+    python -m pipelines.bench run --compare --threshold 0.25
+
+대상: reading_order, extract_primitives_from_image(Probleminput 전체 이미지), run_geocas(ConstraintSpec 코퍼스),
+run_cas(대표 수식 세트), fill_placeholders(대형 초안), run_pipeline(LLM 스텁).
+중앙값(median_s) 기준으로 비교, threshold(상대) 와 min_delta_s(절대, 노이즈 하한)를 모두 넘어야 회귀.
+머신 차이를 빼기 위해 매 실행마다 고정 순수 파이썬 부하(calibration)를 재고, 각 median 을 그 배수(relative)로도 기록한다.
+저장소의 baseline 은 relative 만 담는다(벽시계 시간 없음) → 비교 시 현재 머신의 calibration 으로 환산.
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import statistics
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+ROOT = Path(__file__).resolve().parents[1]
+PROBLEM_ROOT = ROOT / "Probleminput"
+DEFAULT_BASELINE = ROOT / "benchmarks" / "baseline.json"
+DEFAULT_RESULTS = Path("ManimcodeOutput/_bench/latest.json")
+
+# -------------------------------
+# 코퍼스
+# -------------------------------
+
+GEOCAS_CORPUS: List[Dict[str, Any]] = [
+    {   # 원에 내접하는 삼각형, 각 하나
+        "entities": {"points": ["A", "B", "C"]},
+        "constraints": [
+            {"type": "concyclic", "points": ["A", "B", "C"]},
+            {"type": "angle_value", "angle": ["B", "A", "C"], "deg": 40},
+        ],
+    },
+    {   # 내접 사각형, 각 둘 + 호 방향
+        "entities": {"points": ["A", "B", "C", "D"]},
+        "constraints": [
+            {"type": "concyclic", "points": ["A", "B", "C", "D"]},
+            {"type": "angle_value", "angle": ["B", "A", "C"], "deg": 35},
+            {"type": "angle_value", "angle": ["C", "A", "D"], "deg": 50},
+            {"type": "arc_direction_hint", "arc": ["B", "D"], "sweep": "ccw"},
+        ],
+    },
+    {   # 둔각 선호 + 접선
+        "entities": {"points": ["A", "B", "C", "D"]},
+        "constraints": [
+            {"type": "concyclic", "points": ["A", "B", "C", "D"]},
+            {"type": "angle_value", "angle": ["B", "A", "C"], "deg": 110, "prefer": "obtuse"},
+            {"type": "tangent", "point": "D"},
+            {"type": "noncollinear", "points": ["A", "B", "C"]},
+        ],
+    },
+    {   # 5점, 각 셋
+        "entities": {"points": ["A", "B", "C", "D", "E"]},
+        "constraints": [
+            {"type": "concyclic", "points": ["A", "B", "C", "D", "E"]},
+            {"type": "angle_value", "angle": ["B", "A", "C"], "deg": 30},
+            {"type": "angle_value", "angle": ["C", "A", "D"], "deg": 25},
+            {"type": "angle_value", "angle": ["D", "A", "E"], "deg": 40},
+        ],
+    },
+]
+
+CAS_CORPUS: List[str] = [
+    "1+1",
+    "Rational(3, 4) + Rational(5, 6)",
+    "sqrt(72)",
+    "expand((x + 2)**3)",
+    "factor(x**2 - 5*x + 6)",
+    "simplify(sin(x)**2 + cos(x)**2)",
+    "simplify((x**2 - 1)/(x - 1))",
+    "2*pi*3",
+    "tan(pi/4) + sqrt(2)*sqrt(8)",
+    "expand((a - b)*(a + b)*(a**2 + b**2))",
+]
+
+# -------------------------------
+# 벤치마크 정의 (setup → 한 번 실행할 callable)
+# -------------------------------
+
+@dataclass
+class Benchmark:
+    name: str
+    setup: Callable[[], Callable[[], Any]]
+    items: Callable[[], int] = lambda: 1
+
+
+def _problems():
+    from pipelines.batch import discover_problems
+    return discover_problems(PROBLEM_ROOT)
+
+
+def _ocr_items(problem) -> List[Any]:
+    from libs.schemas import OCRItem
+    return [OCRItem(**it) for it in json.loads(Path(problem.json_path).read_text(encoding="utf-8"))]
+
+
+def _setup_reading_order():
+    from libs.layout import reading_order
+    docs = [_ocr_items(p) for p in _problems()]
+    return lambda: [reading_order(list(items)) for items in docs]
+
+
+def _setup_geometry_hint():
+    from libs.layout import extract_primitives_from_image
+    cases = [
+        (p.image_path, [it.model_dump() for it in _ocr_items(p)], Path(p.image_path).read_bytes())
+        for p in _problems() if p.image_path
+    ]
+    return lambda: [extract_primitives_from_image(path, ocr_json=ocr, image_bytes=data) for path, ocr, data in cases]
+
+
+def _setup_geocas():
+    from apps.cas.compute import run_geocas
+    return lambda: [run_geocas(constraint_spec=spec, hint=None) for spec in GEOCAS_CORPUS]
+
+
+def _setup_cas():
+    from apps.cas.compute import run_cas
+    from libs.schemas import CASJob
+    jobs = [CASJob(id=f"c{i}", expr=e) for i, e in enumerate(CAS_CORPUS)]
+    return lambda: run_cas(jobs)
+
+
+def _large_draft(n_cas: int = 400, n_geo: int = 200):
+    from libs.schemas import CASResult
+    labels = [chr(ord("A") + i % 26) + (str(i // 26) if i >= 26 else "") for i in range(n_geo)]
+    lines = ["from manim import *", "class S(Scene):", "    def construct(self):"]
+    for i in range(n_cas):
+        lines.append(f"        t{i} = MathTex(r\"[[CAS:c{i}]]\")")
+    for lab in labels:
+        lines.append(f"        p_{lab} = Dot([[GEO:point:{lab}]])")
+    repls = [CASResult(id=f"c{i}", result_tex=f"\\frac{{{i}}}{{7}}", result_py=f"{i}/7") for i in range(n_cas)]
+    geo = {f"point:{lab}": f"({i}.0, {-i}.0)" for i, lab in enumerate(labels)}
+    return "\n".join(lines), repls, geo
+
+
+def _setup_fill():
+    from apps.render.fill import fill_placeholders
+    draft, repls, geo = _large_draft()
+    return lambda: fill_placeholders(draft=draft, repls=repls, geo_replacements=geo, on_missing="fail_build")
+
+
+def stub_codegen(doc):
+    """LLM 스텁: 라우팅 결과에 맞는 고정 초안 (도형 → GEO+ConstraintSpec, 그 외 → CAS만)."""
+    from apps.router.router import route_problem
+    from libs.schemas import CodegenJob
+    if route_problem(doc)["has_diagram"]:
+        return CodegenJob(
+            manim_code_draft="A = Dot([[GEO:point:A]])\nB = Dot([[GEO:point:B]])\nC = Dot([[GEO:point:C]])\n"
+                             "t = MathTex(r\"[[CAS:s]]\")",
+            cas_jobs=[{"id": "s", "expr": "Rational(1, 2)*3*4"}],
+            constraint_spec=GEOCAS_CORPUS[0],
+        )
+    return CodegenJob(manim_code_draft="t = MathTex(r\"[[CAS:s]]\")", cas_jobs=[{"id": "s", "expr": "expand((x + 1)**2)"}])
+
+
+@contextlib.contextmanager
+def _patched(obj: Any, name: str, value: Any) -> Iterator[None]:
+    old = getattr(obj, name)
+    setattr(obj, name, value)
+    try:
+        yield
+    finally:
+        setattr(obj, name, old)
+
+
+def _setup_pipeline():
+    from pipelines import e2e
+    docs = [e2e.load_problem(p.image_path, p.json_path) for p in _problems()]
+
+    def run():
+        with _patched(e2e, "generate_manim", stub_codegen), contextlib.redirect_stdout(io.StringIO()):
+            return [e2e.run_pipeline(d.model_copy()) for d in docs]
+    return run
+
+
+BENCHMARKS: List[Benchmark] = [
+    Benchmark("reading_order", _setup_reading_order, lambda: len(_problems())),
+    Benchmark("geometry_hint", _setup_geometry_hint, lambda: sum(1 for p in _problems() if p.image_path)),
+    Benchmark("geocas", _setup_geocas, lambda: len(GEOCAS_CORPUS)),
+    Benchmark("cas", _setup_cas, lambda: len(CAS_CORPUS)),
+    Benchmark("fill", _setup_fill),
+    Benchmark("pipeline", _setup_pipeline, lambda: len(_problems())),
+]
+
+# -------------------------------
+# 실행 / 비교
+# -------------------------------
+
+def _calibration_work() -> int:
+    return sum(i * i % 7 for i in range(200_000))
+
+
+def _time(fn: Callable[[], Any], repeat: int, warmup: int) -> List[float]:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def run_benchmarks(only: Optional[Sequence[str]] = None, repeat: int = 5, warmup: int = 1) -> Dict[str, Any]:
+    selected = [b for b in BENCHMARKS if not only or b.name in only]
+    unknown = set(only or []) - {b.name for b in BENCHMARKS}
+    if unknown:
+        raise ValueError(f"unknown benchmarks: {sorted(unknown)}")
+
+    calibration = statistics.median(_time(_calibration_work, max(3, repeat), 1))
+    results: Dict[str, Any] = {}
+    for b in selected:
+        samples = _time(b.setup(), repeat, warmup)
+        median = statistics.median(samples)
+        results[b.name] = {
+            "items": b.items(),
+            "repeat": repeat,
+            "min_s": round(min(samples), 6),
+            "median_s": round(median, 6),
+            "mean_s": round(statistics.fmean(samples), 6),
+            "max_s": round(max(samples), 6),
+            "relative": round(median / calibration, 6),
+        }
+    return {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "calibration_s": round(calibration, 6),
+        },
+        "results": results,
+    }
+
+
+def portable_baseline(current: Dict[str, Any]) -> Dict[str, Any]:
+    """저장소에 넣을 baseline: calibration 배수(relative)만, 머신 고유의 벽시계 시간은 뺀다."""
+    return {
+        "meta": {"python": current["meta"]["python"], "unit": "calibration"},
+        "results": {n: {"items": r["items"], "relative": r["relative"]} for n, r in current["results"].items()},
+    }
+
+
+def _relative(r: Dict[str, Any], data: Dict[str, Any]) -> Optional[float]:
+    cal = data.get("meta", {}).get("calibration_s")
+    if "median_s" in r and cal:
+        return r["median_s"] / cal
+    return r.get("relative")
+
+
+def compare(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    threshold: float = 0.2,
+    min_delta_s: float = 0.001,
+) -> List[Dict[str, Any]]:
+    """
+    벤치마크별 median 비교 행 목록. regression=True 면 threshold·min_delta_s 를 모두 초과.
+    양쪽에 calibration 배수가 있으면 그것으로 비교하고, baseline_s 는 현재 머신 기준으로 환산한 값.
+    """
+    rows = []
+    base_r, cur_r = baseline.get("results", {}), current.get("results", {})
+    cal = current.get("meta", {}).get("calibration_s")
+    for name in sorted(set(base_r) | set(cur_r)):
+        b, c = base_r.get(name), cur_r.get(name)
+        if b is None or c is None:
+            rows.append({"name": name, "baseline_s": b and b.get("median_s"), "current_s": c and c["median_s"],
+                         "ratio": None, "regression": False})
+            continue
+        b_rel, c_rel = _relative(b, baseline), _relative(c, current)
+        if b_rel is not None and c_rel is not None and cal:
+            base_s = b_rel * cal
+        else:
+            base_s = b["median_s"]
+        ratio = c["median_s"] / base_s if base_s > 0 else float("inf")
+        delta = c["median_s"] - base_s
+        rows.append({
+            "name": name,
+            "baseline_s": round(base_s, 6),
+            "current_s": c["median_s"],
+            "ratio": round(ratio, 3),
+            "regression": ratio > 1 + threshold and delta > min_delta_s,
+        })
+    return rows
+
+
+def _print_rows(rows: List[Dict[str, Any]]) -> None:
+    print(f"{'benchmark':16s} {'baseline':>10s} {'current':>10s} {'ratio':>7s}")
+    for r in rows:
+        fmt = lambda v: f"{v * 1000:9.2f}ms" if isinstance(v, (int, float)) else f"{'-':>11s}"
+        ratio = f"{r['ratio']:6.2f}x" if r["ratio"] is not None else f"{'-':>7s}"
+        flag = "  REGRESSION" if r["regression"] else ""
+        print(f"{r['name']:16s}{fmt(r['baseline_s'])}{fmt(r['current_s'])} {ratio}{flag}")
+
+
+def _write(path: Path, data: Dict[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m pipelines.bench", description="오프라인 단계별 벤치마크")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    run_p = sub.add_parser("run")
+    run_p.add_argument("--only", default="", help=f"쉼표 구분: {','.join(b.name for b in BENCHMARKS)}")
+    run_p.add_argument("-r", "--repeat", type=int, default=5)
+    run_p.add_argument("--warmup", type=int, default=1)
+    run_p.add_argument("--out", type=Path, default=DEFAULT_RESULTS)
+    run_p.add_argument("--save-baseline", action="store_true")
+    run_p.add_argument("--compare", action="store_true", help="실행 후 baseline 과 비교")
+
+    cmp_p = sub.add_parser("compare")
+    cmp_p.add_argument("--current", type=Path, default=DEFAULT_RESULTS)
+
+    for p in (run_p, cmp_p):
+        p.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+        p.add_argument("--threshold", type=float, default=0.2, help="허용 상대 증가율 (0.2 = +20%%)")
+        p.add_argument("--min-delta", type=float, default=0.001, help="무시할 절대 증가량(초)")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "run":
+        only = [s for s in args.only.split(",") if s]
+        current = run_benchmarks(only, repeat=args.repeat, warmup=args.warmup)
+        _write(args.out, current)
+        for name, r in current["results"].items():
+            print(f"[bench] {name:16s} median {r['median_s'] * 1000:9.2f}ms  (items={r['items']}, n={r['repeat']})")
+        print(f"[bench] → {args.out}")
+        if args.save_baseline:
+            _write(args.baseline, portable_baseline(current))
+            print(f"[bench] baseline saved → {args.baseline}")
+        if not args.compare:
+            return 0
+    else:
+        if not args.current.exists():
+            print(f"[bench] no results at {args.current}; record them first: python -m pipelines.bench run")
+            return 2
+        current = json.loads(args.current.read_text(encoding="utf-8"))
+
+    if not args.baseline.exists():
+        print(
+            f"[bench] no baseline at {args.baseline}; record one first: "
+            "python -m pipelines.bench run --save-baseline"
+        )
+        return 2
+    rows = compare(json.loads(args.baseline.read_text(encoding="utf-8")), current, args.threshold, args.min_delta)
+    _print_rows(rows)
+    return 1 if any(r["regression"] for r in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
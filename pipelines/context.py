@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from apps.codegen.codegen import SYSTEM_PROMPT_TEXT, _cfg
+from apps.cas.compute import run_cas, run_geocas
+from libs.layout import probe_binaries
+from libs.schemas import CASJob
+from libs.tokens import get_openai_client, get_async_openai_client
+
+# -------------------------------
+# 워커(프로세스) 워밍업
+# -------------------------------
+
+def warm_worker() -> Dict[str, Any]:
+    """
+    CPU 워커 프로세스에서 실행: 무거운 모듈(SymPy, cv2, scipy, svgpathtools)은 import 시점에 로드되고,
+    SymPy 파서/nsolve 경로와 외부 바이너리 probe 결과를 미리 캐시해 둔다.
+    """
+    t0 = time.perf_counter()
+    run_cas([CASJob(id="warm", expr="simplify(sin(x)**2 + cos(x)**2)")])
+    run_geocas(
+        constraint_spec={
+            "entities": {"points": ["A", "B", "C"]},
+            "constraints": [{"type": "angle_value", "angle": ["B", "A", "C"], "deg": 40}],
+        },
+        hint=None,
+    )
+    return {"pid": os.getpid(), "binaries": probe_binaries(), "elapsed_s": round(time.perf_counter() - t0, 3)}
+
+# -------------------------------
+# 파이프라인 컨텍스트 (uvicorn 워커당 1개)
+# -------------------------------
+
+@dataclass
+class PipelineContext:
+    openai_cfg: Dict[str, Any] = field(default_factory=dict)
+    system_prompt: str = ""
+    binaries: Dict[str, bool] = field(default_factory=dict)
+    client: Any = None
+    async_client: Any = None
+    workers: List[Dict[str, Any]] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+    elapsed_s: float = 0.0
+    ready: bool = False
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "model": (self.openai_cfg.get("models") or {}).get("codegen"),
+            "prompt_chars": len(self.system_prompt),
+            "binaries": self.binaries,
+            "openai_client": self.async_client is not None,
+            "warm_workers": len({w["pid"] for w in self.workers}),
+            "elapsed_s": self.elapsed_s,
+            "errors": self.errors,
+        }
+
+async def build_context(executor: Optional[Executor], cpu_workers: int) -> PipelineContext:
+    """설정/프롬프트/클라이언트를 한 번 준비하고 CPU 워커를 미리 띄워 import·캐시를 데운다."""
+    t0 = time.perf_counter()
+    ctx = PipelineContext(openai_cfg=_cfg(), system_prompt=SYSTEM_PROMPT_TEXT)
+    try:
+        ctx.client = get_openai_client()
+        ctx.async_client = get_async_openai_client()
+    except RuntimeError as e:  # OPENAI_API_KEY 미설정 등
+        ctx.errors.append(str(e))
+
+    loop = asyncio.get_running_loop()
+    ctx.binaries = await asyncio.to_thread(probe_binaries)
+    n = max(1, cpu_workers) if executor is not None else 1
+    ctx.workers = list(await asyncio.gather(*(loop.run_in_executor(executor, warm_worker) for _ in range(n))))
+
+    ctx.elapsed_s = round(time.perf_counter() - t0, 3)
+    ctx.ready = not ctx.errors
+    return ctx
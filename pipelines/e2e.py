@@ -3,11 +3,13 @@ import os
 import json
 import math
 from pathlib import Path
-from typing import Dict, Any
+from typing import Callable, Dict, Any, Optional, Sequence
 
 from pydantic import BaseModel
 
-from libs.schemas import ProblemDoc, OCRItem, CASJob
+from libs.schemas import ProblemDoc, OCRItem, CASJob, CASResult, CodegenJob
+from libs.checkpoint import CheckpointStore, input_fingerprint, stages_to_restore
+from libs.tracing import session, stage
 from libs.layout import extract_primitives_from_image, build_geo_replacements
 from apps.router.router import route_problem
 from apps.codegen.codegen import generate_manim
@@ -44,30 +46,74 @@ def _dump_json(path: Path, data: Any) -> None:
 # Pipeline
 # -------------------------------
 
-def load_problem(image_path: str, ocr_json_path: str) -> ProblemDoc:
-    image_p = Path(image_path)
+def load_problem(image_path: Optional[str], ocr_json_path: str) -> ProblemDoc:
     ocr_p = Path(ocr_json_path)
     items_raw = json.loads(ocr_p.read_text(encoding="utf-8"))
     items = [OCRItem(**it) for it in items_raw]
-    return ProblemDoc(items=items, image_path=str(image_p))
-
-def run_pipeline(doc: ProblemDoc) -> str:
+    return ProblemDoc(items=items, image_path=str(Path(image_path)) if image_path else None)
+
+def _checkpointed(
+    ckpt: Optional[CheckpointStore],
+    restore: Sequence[str],
+    name: str,
+    compute: Callable[[], Any],
+    dump: Callable[[Any], Any] = lambda x: x,
+    load: Callable[[Any], Any] = lambda x: x,
+) -> Any:
+    """restore 에 포함된 단계는 저장본에서 복원, 아니면 계산 후 저장."""
+    if ckpt is not None and name in restore:
+        return load(ckpt.load(name))
+    out = compute()
+    if ckpt is not None:
+        ckpt.save(name, dump(out))
+    return out
+
+def run_pipeline(
+    doc: ProblemDoc,
+    checkpoints: Optional[CheckpointStore] = None,
+    resume_from: Optional[str] = None,
+) -> str:
+    """
+    checkpoints 가 주어지면 단계 산출물(GeometryHint, CodegenJob, ExactGeometry, CAS 결과)을 저장하고,
+    resume_from 이전 단계는 저장본에서 복원 (LLM 재호출 없이 GeoCAS/CAS/fill 재검증).
+    """
+    restore = stages_to_restore(resume_from)
+    if restore and checkpoints is None:
+        raise ValueError("resume_from requires a checkpoint store")
+    if checkpoints is not None:
+        image_bytes = doc.image_bytes
+        if image_bytes is None and doc.image_path and Path(doc.image_path).exists():
+            image_bytes = Path(doc.image_path).read_bytes()
+        checkpoints.bind_inputs(input_fingerprint([i.model_dump() for i in doc.items], image_bytes), resume_from)
+
+    # MANION_DEBUG 시 단계별 span → ManimcodeOutput/_debug/<problem>/trace.json (Chrome trace)
+    with session(Path(doc.image_path).stem if doc.image_path else "unknown"):
+        return _run_pipeline(doc, checkpoints, restore)
+
+def _run_pipeline(doc: ProblemDoc, ckpt: Optional[CheckpointStore] = None, restore: Sequence[str] = ()) -> str:
     dd = _dbgdir(doc.image_path) if _is_debug() else None
 
     # 1) 라우팅(정규화)
-    meta: Dict[str, Any] = route_problem(doc)
+    with stage("cli", "route"):
+        meta: Dict[str, Any] = route_problem(doc)
     if _is_debug() and dd:
         _dump_json(dd / "99_meta.route.json", meta)
 
     # 2) GeometryHint (이미지 + OCR 라벨 기반)
     ocr_dump = [{"bbox": i.bbox, "category": i.category, "text": i.text} for i in doc.items]
-    geometry_hint = extract_primitives_from_image(doc.image_path, ocr_json=ocr_dump)
+    def _geometry_hint():
+        with stage("cli", "geometry_hint"):
+            return extract_primitives_from_image(doc.image_path, ocr_json=ocr_dump, image_bytes=doc.image_bytes)
+    geometry_hint = _checkpointed(ckpt, restore, "geometry_hint", _geometry_hint)
     doc.geometry_hint = geometry_hint
     if _is_debug() and dd:
         _dump_json(dd / "10_geometry_hint.json", geometry_hint)
 
     # 3) Codegen (GEO/CAS 작업 분리된 초안; codegen 내부 하드가드 포함)
-    cg = generate_manim(doc)
+    def _codegen():
+        with stage("cli", "codegen"):
+            return generate_manim(doc)
+    cg = _checkpointed(ckpt, restore, "codegen", _codegen, dump=lambda c: c.model_dump(), load=CodegenJob.model_validate)
 
     print("----- GEO TOKENS (raw) -----")
     print(cg.manim_code_draft)
@@ -126,7 +172,10 @@ def run_pipeline(doc: ProblemDoc) -> str:
         raise ValueError(f"CAS placeholders without matching jobs: {missing_cas}")
 
     # 4) GeoCAS (기하 해 계산)
-    exact = run_geocas(constraint_spec=constraint_spec, hint=geometry_hint)
+    def _geocas():
+        with stage("cli", "geocas"):
+            return run_geocas(constraint_spec=constraint_spec, hint=geometry_hint)
+    exact = _checkpointed(ckpt, restore, "geocas", _geocas)
     if _is_debug() and dd:
         _dump_json(dd / "12_geocas_solved.json", exact)
 
@@ -172,21 +221,29 @@ def run_pipeline(doc: ProblemDoc) -> str:
         raise ValueError(f"GEO placeholders without mapping: {missing_geo}")
 
     # 5) CAS (대수 해 계산)
-    cas_res = []
-    if cg.cas_jobs:
+    def _cas():
+        if not cg.cas_jobs:
+            return []
         jobs = [CASJob(**j) for j in cg.cas_jobs]
-        cas_res = run_cas(jobs)
+        with stage("cli", "cas"):
+            return run_cas(jobs)
+    cas_res = _checkpointed(
+        ckpt, restore, "cas", _cas,
+        dump=lambda rs: [r.model_dump() for r in rs],
+        load=lambda ds: [CASResult(**d) for d in ds],
+    )
     if _is_debug() and dd:
         _dump_json(dd / "13_cas_results.json", cas_res)
 
     # 6) GEO → CAS 순서로 치환 (★ geo_replacements 필수!)
     if geo_needed or cas_needed:
-        final = fill_placeholders(
-            draft=cg.manim_code_draft,
-            repls=cas_res,
-            geo_replacements=geo_repls,
-            on_missing="fail_build",
-        )
+        with stage("cli", "fill"):
+            final = fill_placeholders(
+                draft=cg.manim_code_draft,
+                repls=cas_res,
+                geo_replacements=geo_repls,
+                on_missing="fail_build",
+            )
         code = final.manim_code_final
     else:
         code = cg.manim_code_draft
@@ -197,21 +254,9 @@ def run_pipeline(doc: ProblemDoc) -> str:
     return code
 
 
-if __name__ == "__main__":
-    import sys
-    if len(sys.argv) != 3:
-        print("Usage: python -m pipelines.e2e <image_path> <ocr_json>")
-        sys.exit(1)
-
-    image_path, ocr_json = sys.argv[1], sys.argv[2]
-    doc = load_problem(image_path, ocr_json)
-    code = run_pipeline(doc)
-
-    out_root = Path("ManimcodeOutput")
-    out_root.mkdir(exist_ok=True)
-    problem_name = Path(image_path).stem if image_path else "unknown"
+def save_output(code: str, problem_name: str, out_root: Path = Path("ManimcodeOutput")) -> Path:
     problem_dir = out_root / problem_name
-    problem_dir.mkdir(exist_ok=True)
+    problem_dir.mkdir(parents=True, exist_ok=True)
 
     out_py = problem_dir / f"{problem_name}.py"
     out_py.write_text(code, encoding="utf-8")
@@ -223,4 +268,38 @@ if __name__ == "__main__":
         f"```bash\nmanim {problem_name}.py -pql\n```\n",
         encoding="utf-8",
     )
+    return out_py
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    from libs.checkpoint import STAGES
+
+    if len(sys.argv) > 1 and sys.argv[1] == "--batch":
+        from pipelines.batch import main as batch_main
+        sys.exit(batch_main(sys.argv[2:]))
+
+    ap = argparse.ArgumentParser(
+        prog="python -m pipelines.e2e",
+        epilog="batch: python -m pipelines.e2e --batch <problem_root> [--workers N] [--timeout SEC]",
+    )
+    ap.add_argument("image_path")
+    ap.add_argument("ocr_json")
+    ap.add_argument("--resume-from", choices=STAGES, default=None,
+                    help="이전 단계는 ManimcodeOutput/_checkpoints/<문제>/ 저장본에서 복원")
+    ap.add_argument("--no-checkpoint", action="store_true", help="단계 산출물을 저장하지 않음")
+    ap.add_argument("--fresh", action="store_true", help="LLM 응답 캐시를 조회하지 않고 새로 생성 (결과로 캐시 갱신)")
+    args = ap.parse_args()
+    if args.fresh:
+        os.environ["MANION_LLM_CACHE"] = "refresh"
+    if args.resume_from and args.no_checkpoint:
+        ap.error("--resume-from requires checkpoints")
+
+    doc = load_problem(args.image_path, args.ocr_json)
+    problem_name = Path(args.image_path).stem if args.image_path else "unknown"
+    ckpt = None if args.no_checkpoint else CheckpointStore(problem_name)
+    code = run_pipeline(doc, checkpoints=ckpt, resume_from=args.resume_from)
+
+    out_py = save_output(code, problem_name)
     print(f"[OK] Saved: {out_py}")
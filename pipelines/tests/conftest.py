@@ -0,0 +1,30 @@
+import pathlib, sys, types, json, threading
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[2]))
+
+import pytest
+
+DUMMY_OUTPUT = "print([[CAS:a:1+1]])\n---CAS-JOBS---\n[[CAS:a:1+1]]"
+
+
+@pytest.fixture
+def fake_llm(monkeypatch, tmp_path):
+    """
+    서버 async 경로 공용 셋업: 가짜 AsyncOpenAI 응답(DUMMY_OUTPUT), CPU 작업 인라인 실행, tmp_path 로 chdir,
+    텍스트 문제 OCR JSON(ocr). calls 에는 호출별 kwargs, threads 에는 호출된 스레드 id 가 쌓인다.
+    """
+    import server
+    from apps.codegen import codegen
+
+    llm = types.SimpleNamespace(calls=[], threads=set(), output=DUMMY_OUTPUT, ocr=tmp_path / "algebra.json")
+
+    async def fake_create(client, **k):
+        llm.calls.append(k)
+        llm.threads.add(threading.get_ident())
+        return types.SimpleNamespace(output_text=llm.output)
+
+    monkeypatch.setattr(codegen, "get_async_openai_client", lambda: object())
+    monkeypatch.setattr(codegen, "_aresponses_create_with_retry", fake_create)
+    monkeypatch.setattr(server, "_cpu_executor", lambda: None)
+    monkeypatch.chdir(tmp_path)
+    llm.ocr.write_text(json.dumps([{"bbox": [0, 0, 10, 10], "category": "Text", "text": "1+1"}]), encoding="utf-8")
+    return llm
@@ -0,0 +1,54 @@
+import pathlib, sys, json, csv, time
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[2]))
+
+from pipelines.batch import Problem, discover_problems, run_batch, write_report, OK, ERROR, TIMEOUT
+
+
+# spawn 자식이 import 할 수 있도록 모듈 최상위에 정의
+def _fake_target(problem, out_root):
+    if problem.name == "slow":
+        time.sleep(30)
+    if problem.name == "bad":
+        raise ValueError("GeoCAS could not solve coordinates for: ['C']")
+    return {"stages": {"codegen": 0.1, "cas": 0.01}, "output": f"{out_root}/{problem.name}.py"}
+
+
+def test_discover_problems(tmp_path):
+    for name, img in [("p1", True), ("p2", False)]:
+        d = tmp_path / name
+        d.mkdir()
+        (d / f"{name}.json").write_text("[]", encoding="utf-8")
+        (d / f"{name}.md").write_text("", encoding="utf-8")
+        if img:
+            (d / f"{name}.jpg").write_bytes(b"")
+    (tmp_path / "empty").mkdir()
+
+    probs = discover_problems(tmp_path)
+    assert [p.name for p in probs] == ["p1", "p2"]
+    assert probs[0].image_path.endswith("p1.jpg")
+    assert probs[1].image_path is None
+
+
+def test_discover_real_problem_bank():
+    root = pathlib.Path(__file__).resolve().parents[2] / "Probleminput"
+    probs = discover_problems(root)
+    assert len(probs) >= 5
+    assert all(p.image_path for p in probs)
+
+
+def test_run_batch_statuses_and_report(tmp_path):
+    probs = [Problem("good", "good.json"), Problem("bad", "bad.json"), Problem("slow", "slow.json")]
+    results = run_batch(probs, workers=3, timeout_s=5, out_root=tmp_path, target=_fake_target)
+
+    by = {r.problem: r for r in results}
+    assert by["good"].status == OK and by["good"].stages["codegen"] == 0.1
+    assert by["bad"].status == ERROR and "could not solve" in by["bad"].error
+    assert by["slow"].status == TIMEOUT
+
+    paths = write_report(results, tmp_path / "_batch")
+    data = json.loads(paths["json"].read_text(encoding="utf-8"))
+    assert data["summary"] == {**data["summary"], "total": 3, "ok": 1, "error": 1, "timeout": 1}
+    rows = list(csv.DictReader(paths["csv"].open(encoding="utf-8")))
+    assert [r["problem"] for r in rows] == ["good", "bad", "slow"]
+    assert rows[0]["codegen_s"] == "0.1"
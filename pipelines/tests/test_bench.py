@@ -0,0 +1,73 @@
+import pathlib, sys, json
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[2]))
+
+from pipelines import bench
+
+
+def _res(**medians):
+    return {"results": {k: {"median_s": v} for k, v in medians.items()}}
+
+
+def test_compare_flags_only_real_regressions():
+    base = _res(geocas=0.100, cas=0.010, fill=0.0001, gone=1.0)
+    cur = _res(geocas=0.130, cas=0.011, fill=0.0005, new=1.0)
+    rows = {r["name"]: r for r in bench.compare(base, cur, threshold=0.2, min_delta_s=0.001)}
+    assert rows["geocas"]["regression"] is True       # +30%
+    assert rows["cas"]["regression"] is False         # +10% < threshold
+    assert rows["fill"]["regression"] is False        # 5x 지만 절대 증가량이 노이즈 하한 미만
+    assert rows["gone"]["ratio"] is None and rows["new"]["ratio"] is None
+
+
+def test_run_and_compare_cli(tmp_path):
+    out, baseline = tmp_path / "latest.json", tmp_path / "baseline.json"
+    argv = ["run", "--only", "cas,fill", "-r", "1", "--warmup", "0", "--out", str(out), "--baseline", str(baseline)]
+    assert bench.main(argv + ["--save-baseline"]) == 0
+    data = json.loads(out.read_text(encoding="utf-8"))
+    assert set(data["results"]) == {"cas", "fill"}
+    assert data["results"]["cas"]["items"] == len(bench.CAS_CORPUS)
+
+    saved = json.loads(baseline.read_text(encoding="utf-8"))
+    assert "median_s" not in saved["results"]["cas"] and saved["results"]["cas"]["relative"] > 0
+
+    slow = json.loads(out.read_text(encoding="utf-8"))
+    slow["results"]["cas"]["median_s"] += 10.0
+    (tmp_path / "slow.json").write_text(json.dumps(slow), encoding="utf-8")
+    assert bench.main(["compare", "--current", str(tmp_path / "slow.json"), "--baseline", str(baseline)]) == 1
+    assert bench.main(["compare", "--current", str(out), "--baseline", str(baseline)]) == 0
+
+
+def test_relative_baseline_cancels_machine_speed():
+    # 같은 코드를 2배 느린 머신에서 재면 calibration 도 2배 → 회귀 아님
+    base = {"meta": {}, "results": {"geocas": {"relative": 2.0}}}
+    cur = {"meta": {"calibration_s": 0.1}, "results": {"geocas": {"median_s": 0.2}}}
+    (row,) = bench.compare(base, cur, threshold=0.2, min_delta_s=0.001)
+    assert row["ratio"] == 1.0 and not row["regression"]
+    cur["results"]["geocas"]["median_s"] = 0.3
+    (row,) = bench.compare(base, cur, threshold=0.2, min_delta_s=0.001)
+    assert row["regression"] and row["baseline_s"] == 0.2
+
+
+def test_missing_inputs_say_what_to_record(tmp_path, capsys):
+    missing = tmp_path / "none.json"
+    assert bench.main(["compare", "--current", str(missing)]) == 2
+    assert "python -m pipelines.bench run" in capsys.readouterr().out
+
+    (tmp_path / "cur.json").write_text(json.dumps(_res(cas=0.01)), encoding="utf-8")
+    assert bench.main(["compare", "--current", str(tmp_path / "cur.json"), "--baseline", str(missing)]) == 2
+    assert "run --save-baseline" in capsys.readouterr().out
+
+
+def test_committed_baseline_covers_every_benchmark():
+    data = json.loads(bench.DEFAULT_BASELINE.read_text(encoding="utf-8"))
+    assert set(data["results"]) == {b.name for b in bench.BENCHMARKS}
+    assert all(set(r) == {"items", "relative"} for r in data["results"].values())   # 벽시계 시간 없음
+
+
+def test_stub_codegen_satisfies_pipeline_contract():
+    from libs.schemas import ProblemDoc, OCRItem
+    from pipelines import e2e
+
+    doc = ProblemDoc(items=[OCRItem(bbox=[0, 0, 10, 10], category="Text", text="x")], image_path=None)
+    with bench._patched(e2e, "generate_manim", bench.stub_codegen):
+        assert "[[CAS:" not in e2e.run_pipeline(doc)
@@ -0,0 +1,45 @@
+import pathlib, sys
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[2]))
+
+import pytest
+from apps.codegen import codegen
+from libs.cassette import CassetteMiss
+from libs.schemas import ProblemDoc, OCRItem
+from pipelines import e2e as pipeline
+
+
+class DummyResp:
+    output_text = "print([[CAS:a:1+1]])\n---CAS-JOBS---\n[[CAS:a:1+1]]"
+
+
+def _doc(text="1+1"):
+    return ProblemDoc(items=[OCRItem(bbox=[0, 0, 10, 10], category="Text", text=text)], image_path=None)
+
+
+def test_record_then_replay_offline(monkeypatch, tmp_path):
+    calls = []
+
+    def fake_create(*a, **k):
+        calls.append(k["model"])
+        return DummyResp()
+
+    monkeypatch.setenv("MANION_CASSETTE_DIR", str(tmp_path))
+    monkeypatch.setenv("MANION_CASSETTE", "record")
+    monkeypatch.setattr(codegen, "get_openai_client", lambda: object())
+    monkeypatch.setattr(codegen, "_responses_create_with_retry", fake_create)
+    recorded = pipeline.run_pipeline(_doc())
+    assert len(calls) == 1
+    assert len(list(tmp_path.rglob("*.json"))) == 1
+
+    def no_network():
+        raise AssertionError("replay must not create a client")
+
+    monkeypatch.setenv("MANION_CASSETTE", "replay")
+    monkeypatch.setattr(codegen, "get_openai_client", no_network)
+    assert pipeline.run_pipeline(_doc()) == recorded == "print({2})"
+    assert len(calls) == 1
+
+    # 다른 입력 → 다른 키 → 미기록
+    with pytest.raises(CassetteMiss):
+        pipeline.run_pipeline(_doc("2+3"))
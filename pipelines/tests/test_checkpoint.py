@@ -0,0 +1,61 @@
+import pathlib, sys
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[2]))
+
+import pytest
+from libs.checkpoint import CheckpointStore, CheckpointError
+from libs.schemas import ProblemDoc, OCRItem, CodegenJob
+from pipelines import e2e as pipeline
+
+
+DRAFT = CodegenJob(
+    manim_code_draft="print([[CAS:a]])",
+    cas_jobs=[{"id": "a", "expr": "1+1"}],
+)
+
+
+def _doc(text="1+1"):
+    return ProblemDoc(items=[OCRItem(bbox=[0, 0, 10, 10], category="Text", text=text)], image_path=None)
+
+
+def test_resume_from_cas_skips_llm(monkeypatch, tmp_path):
+    calls = []
+
+    def fake_generate(doc):
+        calls.append(1)
+        return DRAFT
+
+    monkeypatch.setattr(pipeline, "generate_manim", fake_generate)
+    store = CheckpointStore("p", root=tmp_path)
+
+    assert pipeline.run_pipeline(_doc(), checkpoints=store) == "print({2})"
+    assert len(calls) == 1
+    for stage in ("geometry_hint", "codegen", "geocas", "cas"):
+        assert store.has(stage)
+
+    # 하류 단계 수정 재현: CAS 결과를 바꿔치기 → codegen 은 저장본, CAS 는 재계산
+    def forbid(*a, **k):
+        raise AssertionError("LLM must not be called on resume")
+
+    monkeypatch.setattr(pipeline, "generate_manim", forbid)
+    monkeypatch.setattr(pipeline, "extract_primitives_from_image", forbid)
+    assert pipeline.run_pipeline(_doc(), checkpoints=store, resume_from="cas") == "print({2})"
+
+    # fill 부터 재개하면 CAS 결과도 저장본 사용
+    monkeypatch.setattr(pipeline, "run_cas", forbid)
+    assert pipeline.run_pipeline(_doc(), checkpoints=store, resume_from="fill") == "print({2})"
+
+
+def test_resume_rejects_changed_inputs_and_missing_stage(monkeypatch, tmp_path):
+    monkeypatch.setattr(pipeline, "generate_manim", lambda doc: DRAFT)
+    store = CheckpointStore("p", root=tmp_path)
+    pipeline.run_pipeline(_doc(), checkpoints=store)
+
+    with pytest.raises(CheckpointError):
+        pipeline.run_pipeline(_doc("2+2"), checkpoints=store, resume_from="geocas")
+
+    with pytest.raises(CheckpointError):
+        pipeline.run_pipeline(_doc(), checkpoints=CheckpointStore("other", root=tmp_path), resume_from="geocas")
+
+    with pytest.raises(ValueError):
+        pipeline.run_pipeline(_doc(), resume_from="geocas")
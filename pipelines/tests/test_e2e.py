@@ -21,3 +21,262 @@ def test_e2e_pipeline(monkeypatch):
     res = client.post("/e2e", json=payload)
     assert res.status_code == 200
     assert "[[CAS:" not in res.json()["manim_code"]
+
+
+def test_e2e_async_text_only(fake_llm):
+    client = TestClient(server.app)
+    res = client.post("/e2e", json={"json_path": str(fake_llm.ocr)})
+    assert res.status_code == 200
+    assert res.json()["manim_code"] == "print({2})"
+
+
+def test_e2e_batch_per_item_results(fake_llm, tmp_path):
+    client = TestClient(server.app)
+    payload = {"items": [{"json_path": str(fake_llm.ocr)}, {"json_path": str(tmp_path / "missing.json")}], "concurrency": 2}
+    res = client.post("/e2e/batch", json=payload)
+    assert res.status_code == 200
+    first, second = res.json()["results"]
+    assert first["ok"] and first["manim_code"] == "print({2})"
+    assert not second["ok"] and second["status_code"] == 422
+
+
+def test_batch_and_stream_map_errors_like_e2e(fake_llm, monkeypatch):
+    from libs.retry import CircuitOpen
+
+    async def open_circuit(*a, **k):
+        raise CircuitOpen("gpt-5", 7.0)
+
+    monkeypatch.setattr(codegen, "_aresponses_create_with_retry", open_circuit)
+    monkeypatch.setattr(server, "_result_cache", None)
+    client = TestClient(server.app)
+    item = {"json_path": str(fake_llm.ocr)}
+    assert client.post("/e2e", json=item).status_code == 503
+
+    (res,) = client.post("/e2e/batch", json={"items": [item]}).json()["results"]
+    assert not res["ok"] and res["status_code"] == 503 and "circuit" in res["error"]
+
+    last = client.post("/e2e/stream", json=item).text.strip().split("\n\n")[-1]
+    assert last.startswith("event: error") and json.loads(last.split("data: ", 1)[1])["status_code"] == 503
+
+
+def test_jobs_submit_and_poll(fake_llm, monkeypatch, tmp_path):
+    import time
+    from libs.jobs import JobStore
+
+    monkeypatch.setattr(server, "_jobs", JobStore(tmp_path / "jobs.sqlite3"))
+    with TestClient(server.app) as client:
+        res = client.post("/jobs", json={"json_path": str(fake_llm.ocr)})
+        assert res.status_code == 202
+        job_id = res.json()["job_id"]
+        for _ in range(100):
+            job = client.get(f"/jobs/{job_id}").json()
+            if job["status"] in {"succeeded", "failed"}:
+                break
+            time.sleep(0.05)
+        assert client.get("/jobs/nope").status_code == 404
+    assert job["status"] == "succeeded"
+    assert job["stage"] == "done"
+    assert job["manim_code"] == "print({2})"
+
+
+def test_job_stage_writes_run_off_event_loop(fake_llm, monkeypatch, tmp_path):
+    import threading, time
+    from libs.jobs import JobStore
+
+    stage_threads = []
+
+    class RecordingStore(JobStore):
+        def set_stage(self, job_id, stage):
+            stage_threads.append((threading.get_ident(), stage))
+            super().set_stage(job_id, stage)
+
+    monkeypatch.setattr(server, "_jobs", RecordingStore(tmp_path / "jobs.sqlite3"))
+    with TestClient(server.app) as client:
+        job_id = client.post("/jobs", json={"json_path": str(fake_llm.ocr)}).json()["job_id"]
+        for _ in range(100):
+            job = client.get(f"/jobs/{job_id}").json()
+            if job["status"] in {"succeeded", "failed"}:
+                break
+            time.sleep(0.05)
+    assert job["status"] == "succeeded" and job["stage"] == "done"   # 늦은 단계 기록이 done 을 덮지 않음
+    assert stage_threads and not {t for t, _ in stage_threads} & fake_llm.threads   # LLM 호출 = 이벤트 루프 스레드
+
+
+def test_e2e_stream_stage_events(fake_llm):
+    client = TestClient(server.app)
+    res = client.post("/e2e/stream", json={"json_path": str(fake_llm.ocr)})
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/event-stream")
+
+    events = []
+    for block in res.text.strip().split("\n\n"):
+        name, data = block.split("\n", 1)
+        events.append((name[len("event: "):], json.loads(data[len("data: "):])))
+    done = [ev["stage"] for name, ev in events if name == "stage"]
+    assert done == ["cache", "route", "geometry_hint", "codegen", "validate", "geocas", "cas", "fill"]
+    codegen_ev = next(ev for name, ev in events if name == "stage" and ev["stage"] == "codegen")
+    assert codegen_ev["elapsed_ms"] >= 0
+    assert "[[CAS:a]]" in codegen_ev["artifacts"]["draft"]
+    assert events[-1] == ("result", {"status": "result", "manim_code": "print({2})"})
+
+
+def test_e2e_result_cache_hit_and_invalidate(fake_llm, monkeypatch):
+    monkeypatch.setattr(server, "_result_cache", None)
+    ocr, calls = fake_llm.ocr, fake_llm.calls
+    client = TestClient(server.app)
+    for _ in range(2):
+        res = client.post("/e2e", json={"json_path": str(ocr)})
+        assert res.json()["manim_code"] == "print({2})"
+    assert len(calls) == 1
+
+    res = client.post("/cache/invalidate", json={"json_path": str(ocr)})
+    assert res.json()["deleted"] is True
+    client.post("/e2e", json={"json_path": str(ocr)})
+    assert len(calls) == 2
+
+
+def test_e2e_upload_in_memory(fake_llm, monkeypatch, tmp_path):
+    monkeypatch.setattr(server, "_cache", lambda: None)
+
+    img = pathlib.Path(__file__).resolve().parents[2] / "Probleminput/중1-2도형/중1-2도형.jpg"
+    ocr = [{"bbox": [0, 0, 10, 10], "category": "Text", "text": "1+1"}]
+    client = TestClient(server.app)
+    res = client.post(
+        "/e2e/upload",
+        data={"ocr_json": json.dumps(ocr)},
+        files={"image": ("upload.jpg", img.read_bytes(), "image/jpeg")},
+    )
+    assert res.status_code == 200
+    assert res.json()["manim_code"] == "print({2})"
+    user_parts = fake_llm.calls[0]["messages"][1]["content"]
+    assert user_parts[0]["type"] == "input_image"
+    assert (tmp_path / "ManimcodeOutput/upload/upload.py").exists()
+
+
+def test_e2e_overload_returns_429(monkeypatch):
+    from libs.admission import AdmissionController
+
+    monkeypatch.setattr(server, "_admission_ctl", AdmissionController(max_queue=0, retry_after_min_s=3))
+    client = TestClient(server.app)
+    res = client.post("/e2e", json={"json_path": "unused.json"})
+    assert res.status_code == 429
+    assert res.headers["Retry-After"] == "3"
+    assert client.get("/admission").json()["rejected_total"] == 1
+
+
+def test_health_reports_ready_after_warmup(monkeypatch, tmp_path):
+    import time
+    from libs.jobs import JobStore
+
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(server, "_cpu_executor", lambda: None)
+    monkeypatch.setattr(server, "_jobs", JobStore(tmp_path / "jobs.sqlite3"))
+    monkeypatch.setattr(server, "_ctx", None)
+    with TestClient(server.app) as client:
+        for _ in range(200):
+            res = client.get("/health")
+            if res.status_code == 200:
+                break
+            assert res.json()["status"] == "starting"
+            time.sleep(0.05)
+        assert res.status_code == 200
+        body = res.json()
+        assert body["ready"] and body["openai_client"] and body["warm_workers"] == 1
+
+
+def test_metrics_exposes_stage_latency_and_cache(fake_llm, monkeypatch):
+    monkeypatch.setattr(server, "_result_cache", None)
+    client = TestClient(server.app)
+    assert client.post("/e2e", json={"json_path": str(fake_llm.ocr)}).status_code == 200
+
+    res = client.get("/metrics")
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/plain")
+    body = res.text
+    assert 'manion_stage_seconds_count{pipeline="server",stage="codegen"}' in body
+    assert 'manion_cache_requests_total{cache="e2e",result="miss"}' in body
+    assert 'manion_cas_jobs_total' in body
+    assert 'manion_admission_lane{lane="llm",state="in_flight"} 0' in body
+
+
+def test_e2e_streaming_codegen_starts_cas_early(fake_llm, monkeypatch):
+    import asyncio
+
+    log = []
+    chunks = ["print([[CAS:a:1", "+1]])\n---CAS-", "JOBS---\n[[CAS:a:1+1]]\n", ""]
+
+    class FakeStream:
+        def __init__(self):
+            self._it = iter(chunks)
+
+        def __aiter__(self):
+            return self
+
+        async def __anext__(self):
+            try:
+                delta = next(self._it)
+            except StopIteration:
+                log.append("stream_end")
+                raise StopAsyncIteration
+            if not delta:
+                await asyncio.sleep(0.2)  # 생성 꼬리: 이 사이에 선행 CAS 가 돌아야 함
+            return types.SimpleNamespace(type="response.output_text.delta", delta=delta)
+
+    class FakeResponses:
+        async def create(self, **kwargs):
+            assert kwargs["stream"] is True
+            return FakeStream()
+
+    real_run_cas = server.run_cas_with_stats
+
+    def logged_run_cas(jobs):
+        log.append("cas")
+        return real_run_cas(jobs)
+
+    cfg = dict(codegen._cfg())
+    cfg["gen"] = {**cfg.get("gen", {}), "stream": True}
+    cfg["models"] = {**cfg["models"], "tiers": []}   # 에스컬레이션 가능한 티어 시도는 채택 후에만 이벤트를 보냄
+    monkeypatch.setattr(codegen, "_cfg", lambda: cfg)
+    monkeypatch.setattr(codegen, "get_async_openai_client", lambda: types.SimpleNamespace(responses=FakeResponses()))
+    monkeypatch.setattr(server, "run_cas_with_stats", logged_run_cas)
+    monkeypatch.setattr(server, "_result_cache", None)
+    res = TestClient(server.app).post("/e2e", json={"json_path": str(fake_llm.ocr)})
+    assert res.status_code == 200
+    assert res.json()["manim_code"] == "print({2})"
+    # 선행 CAS 한 번만 (최종 단계는 재사용), 스트림 종료 전에 시작
+    assert log == ["cas", "stream_end"]
+
+
+def test_server_config_parsed_once(fake_llm, monkeypatch):
+    parsed = []
+    real_load = server.load
+
+    def counting_load(f):
+        parsed.append(1)
+        return real_load(f)
+
+    server._server_cfg.cache_clear()
+    monkeypatch.setattr(server, "load", counting_load)
+    client = TestClient(server.app)
+    for _ in range(2):
+        assert client.post("/e2e", json={"json_path": str(fake_llm.ocr)}).status_code == 200
+        assert client.post("/e2e/batch", json={"items": [{"json_path": str(fake_llm.ocr)}]}).status_code == 200
+    server._server_cfg.cache_clear()
+    assert len(parsed) == 1
+
+
+def test_e2e_file_io_runs_off_event_loop(fake_llm, monkeypatch):
+    import threading
+
+    monkeypatch.setattr(server, "_result_cache", None)
+    io_threads = []
+    for name in ("_load_problem_from_paths", "_save_output"):
+        real = getattr(server, name)
+
+        def wrapped(*a, _real=real, **k):
+            io_threads.append(threading.get_ident())
+            return _real(*a, **k)
+        monkeypatch.setattr(server, name, wrapped)
+
+    assert TestClient(server.app).post("/e2e", json={"json_path": str(fake_llm.ocr)}).status_code == 200
+    assert len(io_threads) == 2 and fake_llm.threads and not set(io_threads) & fake_llm.threads
@@ -1,34 +1,268 @@
 from __future__ import annotations
 
+import asyncio
+import functools
 import json
+import multiprocessing
+import os
+import time
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Set
+from tomllib import load
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
 
 # 내부 파이프라인 구성요소 (엔드포인트는 노출하지 않음)
 from apps.router.router import route_problem
-from apps.codegen.codegen import generate_manim
-from apps.cas.compute import run_geocas, run_cas
+from apps.codegen.codegen import agenerate_manim, validate_placeholders, SYSTEM_PROMPT_TEXT, _cfg as _openai_cfg
+from apps.codegen.stream import StreamEvent
+from apps.cas.compute import run_geocas_with_stats, run_cas_with_stats
 from apps.render.fill import (
     fill_placeholders,
     collect_geo_placeholders,
     collect_cas_placeholders,
-    detect_invalid_cas_token_patterns,
-    extract_geo_labels,
 )
-from libs.schemas import ProblemDoc, OCRItem, CASJob
+from libs.schemas import ProblemDoc, OCRItem, CASJob, CASResult
+from libs.jobs import JobStore
+from libs.cache import DiskCache
+from libs.admission import AdmissionController, Overloaded, Ticket
+from libs.retry import CircuitOpen
+from libs.tokens import aclose_openai_clients
+from libs import metrics, tracing
+from pipelines.context import PipelineContext, build_context
+from libs.io_utils import sha256_bytes, sha256_str, content_key
 from libs.layout import extract_primitives_from_image, build_geo_replacements
 
-app = FastAPI(title="Manion-CAS (E2E-only)")
+CONFIGS = Path(__file__).parent / "configs"
+
+@functools.lru_cache(maxsize=1)
+def _server_cfg() -> Dict[str, Any]:
+    # 프로세스당 한 번만 파싱 (요청 경로의 _cache()/batch 가 매번 toml 을 읽지 않도록; 변경 시 _server_cfg.cache_clear())
+    with open(CONFIGS / "server.toml", "rb") as f:
+        return load(f)
+
+# ──────────────────────────────────────────────────────────
+# CPU 단계 실행기 (OpenCV/inkscape 힌트, SymPy nsolve/simplify)
+# ──────────────────────────────────────────────────────────
+_cpu_pool: Optional[Executor] = None
+
+def _cpu_executor() -> Optional[Executor]:
+    """프로세스풀은 최초 사용 시 생성. cpu_workers=0이면 None(기본 스레드풀)."""
+    global _cpu_pool
+    if _cpu_pool is None:
+        ex_cfg = _server_cfg().get("executor", {})
+        workers = int(ex_cfg.get("cpu_workers", 4))
+        if workers <= 0:
+            return None
+        ctx = multiprocessing.get_context(ex_cfg.get("start_method", "spawn"))
+        _cpu_pool = ProcessPoolExecutor(max_workers=workers, mp_context=ctx)
+    return _cpu_pool
+
+async def _run_cpu(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    loop = asyncio.get_running_loop()
+    tracer = tracing.current()
+    if tracer is None:
+        return await loop.run_in_executor(_cpu_executor(), functools.partial(fn, *args, **kwargs))
+    # 트레이스 활성 시: 워커 쪽 span(nsolve 시드, CAS job, OpenCV 등)을 결과와 함께 받아 병합
+    result, events = await loop.run_in_executor(
+        _cpu_executor(), functools.partial(tracing.run_traced, fn, *args, **kwargs)
+    )
+    tracer.merge(events)
+    return result
+
+# ──────────────────────────────────────────────────────────
+# Admission control (lane별 in-flight 상한 + 대기열 상한)
+# ──────────────────────────────────────────────────────────
+_admission_ctl: Optional[AdmissionController] = None
+
+def _admission() -> AdmissionController:
+    global _admission_ctl
+    if _admission_ctl is None:
+        a = _server_cfg().get("admission", {})
+        _admission_ctl = AdmissionController(
+            llm_max_in_flight=int(a.get("llm_max_in_flight", 16)),
+            cpu_max_in_flight=int(a.get("cpu_max_in_flight", 8)),
+            max_queue=int(a.get("max_queue", 64)),
+            retry_after_min_s=int(a.get("retry_after_min_s", 1)),
+            retry_after_max_s=int(a.get("retry_after_max_s", 60)),
+        )
+    return _admission_ctl
+
+async def _run_cpu_admitted(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    async with _admission().slot("cpu"):
+        return await _run_cpu(fn, *args, **kwargs)
+
+# ──────────────────────────────────────────────────────────
+# 작업 큐 (SQLite)
+# ──────────────────────────────────────────────────────────
+_jobs: Optional[JobStore] = None
+
+def _job_store() -> JobStore:
+    global _jobs
+    if _jobs is None:
+        _jobs = JobStore(_server_cfg().get("jobs", {}).get("db_path", "ManimcodeOutput/_jobs.sqlite3"))
+    return _jobs
+
+# ──────────────────────────────────────────────────────────
+# 결과 캐시 (content-addressed)
+# ──────────────────────────────────────────────────────────
+# 코드 버전: 결과에 영향을 주는 파이프라인 소스의 해시 (코드가 바뀌면 자동 무효화)
+_CODE_FILES = [
+    "server.py",
+    "apps/router/router.py",
+    "apps/codegen/codegen.py",
+    "apps/cas/compute.py",
+    "apps/render/fill.py",
+    "libs/layout.py",
+]
+_code_version_cache: Optional[str] = None
+_result_cache: Optional[DiskCache] = None
+
+def _code_version() -> str:
+    global _code_version_cache
+    if _code_version_cache is None:
+        root = Path(__file__).parent
+        _code_version_cache = content_key({f: sha256_bytes((root / f).read_bytes()) for f in _CODE_FILES})
+    return _code_version_cache
+
+def _cache() -> Optional[DiskCache]:
+    global _result_cache
+    cache_cfg = _server_cfg().get("cache", {})
+    if not cache_cfg.get("enabled", True):
+        return None
+    if _result_cache is None:
+        _result_cache = DiskCache(
+            cache_cfg.get("dir", "ManimcodeOutput/_cache/e2e"),
+            max_bytes=int(cache_cfg.get("max_bytes", 256 * 1024 * 1024)),
+        )
+    return _result_cache
+
+def _result_cache_key(doc: ProblemDoc) -> str:
+    image_digest = None
+    if doc.image_bytes is not None:
+        image_digest = sha256_bytes(doc.image_bytes)
+    elif doc.image_path:
+        try:
+            image_digest = sha256_bytes(Path(doc.image_path).read_bytes())
+        except OSError:
+            image_digest = f"missing:{doc.image_path}"
+    return content_key({
+        "image": image_digest,
+        "ocr": sha256_str(json.dumps([i.model_dump() for i in doc.items], sort_keys=True, ensure_ascii=False)),
+        "prompt": sha256_str(SYSTEM_PROMPT_TEXT),
+        "openai": _openai_cfg(),
+        "code": _code_version(),
+    })
+
+# ──────────────────────────────────────────────────────────
+# Warm start (워커당 1회: 설정, 프롬프트, 클라이언트, 바이너리 probe, CPU 워커 import)
+# ──────────────────────────────────────────────────────────
+_ctx: Optional[PipelineContext] = None
+_warmup_task: Optional[asyncio.Task] = None
+
+async def _warm_up() -> None:
+    global _ctx
+    workers = int(_server_cfg().get("executor", {}).get("cpu_workers", 4))
+    try:
+        _ctx = await build_context(_cpu_executor(), workers)
+    except Exception as e:
+        _ctx = PipelineContext(errors=[f"{type(e).__name__}: {e}"])
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global _warmup_task
+    cfg = _server_cfg()
+    if cfg.get("warmup", {}).get("enabled", True):
+        _warmup_task = asyncio.create_task(_warm_up())
+    jobs_cfg = cfg.get("jobs", {})
+    workers: List[asyncio.Task] = []
+    if int(jobs_cfg.get("workers", 2)) > 0:
+        store = _job_store()
+        prefix = f"{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        workers = [
+            asyncio.create_task(_job_worker(store, f"{prefix}-{k}", jobs_cfg))
+            for k in range(int(jobs_cfg.get("workers", 2)))
+        ]
+    yield
+    for t in workers + ([_warmup_task] if _warmup_task else []):
+        t.cancel()
+    await asyncio.gather(*workers, *([_warmup_task] if _warmup_task else []), return_exceptions=True)
+    await aclose_openai_clients()
+    global _cpu_pool
+    if _cpu_pool is not None:
+        _cpu_pool.shutdown(cancel_futures=True)
+        _cpu_pool = None
+
+app = FastAPI(title="Manion-CAS (E2E-only)", lifespan=lifespan)
+
+@app.exception_handler(Overloaded)
+async def _overloaded_handler(request: Request, exc: Overloaded) -> JSONResponse:
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc), "queue_depth": exc.depth},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+@app.exception_handler(CircuitOpen)
+async def _circuit_open_handler(request: Request, exc: CircuitOpen) -> JSONResponse:
+    # 업스트림 장애로 브레이커가 열려 있고 폴백도 없음 → 스레드/슬롯을 잡지 않고 즉시 503
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(max(1, round(exc.retry_in)))},
+    )
+
+def _error_status(e: Exception) -> tuple:
+    """요청 단위 실패 → (status_code, error): 배치 항목/SSE/잡도 /e2e 응답과 같은 상태 코드를 쓰도록."""
+    if isinstance(e, HTTPException):
+        return e.status_code, str(e.detail)
+    if isinstance(e, Overloaded):
+        return 429, str(e)
+    if isinstance(e, CircuitOpen):
+        return 503, str(e)
+    return 500, f"{type(e).__name__}: {e}"
 
 # ──────────────────────────────────────────────────────────
 # Health
 # ──────────────────────────────────────────────────────────
 @app.get("/health")
 def health():
-    return {"status": "ok"}
+    """워밍업이 끝나기 전(또는 실패 시)에는 503: 로드밸런서가 콜드 워커로 트래픽을 보내지 않도록."""
+    if not _server_cfg().get("warmup", {}).get("enabled", True):
+        return {"status": "ok"}
+    if _ctx is None or not _ctx.ready:
+        status = "starting" if _ctx is None else "error"
+        return JSONResponse(status_code=503, content={"status": status, **(_ctx.summary() if _ctx else {})})
+    return {"status": "ok", **_ctx.summary()}
+
+@app.get("/admission")
+def admission():
+    """대기열 깊이/lane별 in-flight (오토스케일링 지표)."""
+    return _admission().snapshot()
+
+def _admission_gauges() -> List[Any]:
+    snap = _admission().snapshot()
+    out: List[Any] = []
+    for lane, l in snap["lanes"].items():
+        out.append(({"lane": lane, "state": "in_flight"}, l["in_flight"]))
+        out.append(({"lane": lane, "state": "waiting"}, l["waiting"]))
+    return out
+
+_ADMISSION_LANES = metrics.Gauge("manion_admission_lane", "Admission lane occupancy (state=in_flight|waiting)")
+_ADMISSION_LANES.set_function(_admission_gauges)
+_ADMISSION_REJECTED = metrics.Gauge("manion_admission_rejected", "Requests rejected with 429 since start")
+_ADMISSION_REJECTED.set_function(lambda: [({}, _admission().rejected)])
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Prometheus scrape 엔드포인트 (단계별 지연, LLM 토큰, GeoCAS 시드, 캐시 적중, 대기열)."""
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
 
 # ──────────────────────────────────────────────────────────
 # 모델
@@ -40,6 +274,20 @@ class E2EInput(BaseModel):
 class E2EOutput(BaseModel):
     manim_code: str
 
+class E2EBatchInput(BaseModel):
+    items: List[E2EInput]
+    concurrency: Optional[int] = None
+
+class E2EBatchItem(BaseModel):
+    index: int
+    ok: bool
+    manim_code: Optional[str] = None
+    status_code: Optional[int] = None
+    error: Optional[str] = None
+
+class E2EBatchOutput(BaseModel):
+    results: List[E2EBatchItem]
+
 # ──────────────────────────────────────────────────────────
 # 유틸
 # ──────────────────────────────────────────────────────────
@@ -52,91 +300,443 @@ def _load_problem_from_paths(image_path: Optional[str], json_path: str) -> Probl
     items = [OCRItem(**it) for it in items_raw]
     return ProblemDoc(items=items, image_path=str(image_path) if image_path else None)
 
-def _run_e2e(doc: ProblemDoc) -> str:
+StageCallback = Callable[[Dict[str, Any]], None]
+
+class _StageClock:
+    """
+    단계 시작/종료 이벤트를 on_stage 콜백으로 전달.
+      - {"stage": "codegen", "status": "started"}
+      - {"stage": "codegen", "status": "done", "elapsed_ms": 1234.5, "artifacts": {...}}
+    """
+    def __init__(self, on_stage: Optional[StageCallback]):
+        self.on_stage = on_stage
+        self.stage: Optional[str] = None
+        self.t0 = 0.0
+
+    def start(self, stage: str) -> None:
+        self.stage, self.t0 = stage, time.perf_counter()
+        if self.on_stage is not None:
+            self.on_stage({"stage": stage, "status": "started"})
+
+    def done(self, **artifacts: Any) -> None:
+        t1 = time.perf_counter()
+        elapsed = t1 - self.t0
+        metrics.STAGE_SECONDS.observe(elapsed, pipeline="server", stage=self.stage)
+        tracer = tracing.current()
+        if tracer is not None:
+            tracer.record(self.stage, self.t0, t1, cat="stage")
+        if self.on_stage is not None:
+            self.on_stage({
+                "stage": self.stage,
+                "status": "done",
+                "elapsed_ms": round(elapsed * 1000, 3),
+                "artifacts": artifacts,
+            })
+
+class _Speculation:
+    """
+    스트리밍 codegen 이벤트로 GeoCAS/CAS 를 생성 도중에 먼저 시작 (solver 시간이 생성 시간과 겹치도록).
+    최종 CodegenJob 의 입력(정규화 ConstraintSpec, CAS id/expr)이 같을 때만 결과를 채택하고, 아니면 다시 계산.
+    """
+    def __init__(self) -> None:
+        self.hint: Optional[Dict[str, Any]] = None
+        self.geocas: Optional[tuple] = None                 # (spec, task)
+        self.cas: Dict[str, tuple] = {}                     # id -> (expr, task)
+
+    def on_event(self, ev: StreamEvent) -> None:
+        if ev.kind == "constraint_spec" and self.geocas is None:
+            task = asyncio.create_task(
+                _run_cpu_admitted(run_geocas_with_stats, constraint_spec=ev.data, hint=self.hint)
+            )
+            self.geocas = (ev.data, task)
+        elif ev.kind == "cas_job" and ev.data["id"] not in self.cas:
+            task = asyncio.create_task(_run_cpu_admitted(run_cas_with_stats, [CASJob(**ev.data)]))
+            self.cas[ev.data["id"]] = (ev.data["expr"], task)
+
+    async def run_geocas(self, constraint_spec: Dict[str, Any], hint: Any) -> tuple:
+        if self.geocas is not None and self.geocas[0] == constraint_spec:
+            task, self.geocas = self.geocas[1], None
+            return await task
+        return await _run_cpu_admitted(run_geocas_with_stats, constraint_spec=constraint_spec, hint=hint)
+
+    async def run_cas(self, jobs: List[CASJob]) -> tuple:
+        reused = {j.id: self.cas.pop(j.id)[1] for j in jobs if j.id in self.cas and self.cas[j.id][0] == j.expr}
+        rest = [j for j in jobs if j.id not in reused]
+        parts = await asyncio.gather(
+            *reused.values(),
+            *([_run_cpu_admitted(run_cas_with_stats, rest)] if rest else []),
+            return_exceptions=True,
+        )
+        for part in parts:
+            if isinstance(part, BaseException):
+                raise part
+        by_id = {r.id: r for results, _ in parts for r in results}
+        stats: Dict[str, float] = {}
+        for _, st in parts:
+            for k, v in st.items():
+                stats[k] = stats.get(k, 0) + v
+        return [by_id[j.id] for j in jobs], stats
+
+    @property
+    def pending(self) -> int:
+        return (self.geocas is not None) + len(self.cas)
+
+    def cancel(self) -> None:
+        """채택되지 않은 선행 작업 정리 (실패한 작업의 예외도 회수해 경고를 남기지 않음)."""
+        tasks = ([self.geocas[1]] if self.geocas else []) + [t for _, t in self.cas.values()]
+        for t in tasks:
+            if t.done():
+                if not t.cancelled():
+                    t.exception()
+            else:
+                t.cancel()
+        self.geocas, self.cas = None, {}
+
+async def _run_e2e(doc: ProblemDoc, on_stage: Optional[StageCallback] = None) -> str:
+    spec = _Speculation()
+    try:
+        return await _run_e2e_stages(doc, on_stage, spec)
+    finally:
+        spec.cancel()
+
+async def _run_e2e_stages(doc: ProblemDoc, on_stage: Optional[StageCallback], spec: _Speculation) -> str:
+    clock = _StageClock(on_stage)
+
     # 1) 라우팅(정규화)
+    clock.start("route")
     meta = route_problem(doc)
+    clock.done(meta=meta)
 
-    # 2) GeometryHint (이미지 + OCR 라벨 기반)
+    # 2) GeometryHint (이미지 + OCR 라벨 기반, 프로세스풀)
+    clock.start("geometry_hint")
     ocr_dump = [{"bbox": i.bbox, "category": i.category, "text": i.text} for i in doc.items]
-    geometry_hint = extract_primitives_from_image(doc.image_path, ocr_json=ocr_dump)
+    geometry_hint = await _run_cpu_admitted(
+        extract_primitives_from_image, doc.image_path, ocr_json=ocr_dump, image_bytes=doc.image_bytes
+    )
     doc.geometry_hint = geometry_hint
+    spec.hint = geometry_hint
+    clock.done(geometry_hint=geometry_hint)
+
+    # 3) Codegen (AsyncOpenAI, 하드가드 포함; 스트리밍이면 GeoCAS/CAS 선행 시작)
+    clock.start("codegen")
+    async with _admission().slot("llm"):
+        cj = await agenerate_manim(doc, on_event=spec.on_event)
 
-    # 3) Codegen (하드가드 포함)
-    cj = generate_manim(doc)
+    # ConstraintSpec는 Pydantic 모델이므로 dict로 변환
+    raw_cs = getattr(cj, "constraint_spec", None)
+    constraint_spec: Dict[str, Any] = raw_cs.model_dump() if isinstance(raw_cs, BaseModel) else (raw_cs or {})
+    clock.done(
+        draft=cj.manim_code_draft, constraint_spec=constraint_spec or None, cas_jobs=cj.cas_jobs,
+        speculative=spec.pending,
+    )
 
     # 3.1) 사전 검증 (fail fast)
+    clock.start("validate")
+    problem = validate_placeholders(cj, bool(meta.get("has_diagram")))
+    if problem:
+        raise HTTPException(status_code=422, detail=problem)
     geo_needed: Set[str] = collect_geo_placeholders(cj.manim_code_draft)
-
-    if meta.get("has_diagram") and not geo_needed:
-        raise HTTPException(status_code=422, detail="Diagram detected but no GEO placeholders.")
-    if geo_needed and not getattr(cj, "constraint_spec", None):
-        raise HTTPException(status_code=422, detail="GEO placeholders present but ---GEO-JOBS--- (ConstraintSpec) is missing.")
-
-    if getattr(cj, "constraint_spec", None):
-        needed_labels = extract_geo_labels(geo_needed)
-        entities = (cj.constraint_spec or {}).get("entities", {})
-        declared = set((entities.get("points", []) or []))
-        missing = sorted(list(needed_labels - declared))
-        if missing:
-            raise HTTPException(
-                status_code=422,
-                detail=f"ConstraintSpec.entities.points missing labels used in GEO tokens: {missing}"
-            )
-
-    offenders = detect_invalid_cas_token_patterns(cj.manim_code_draft)
-    if offenders:
-        raise HTTPException(status_code=422, detail=f"Malformed CAS token(s): {offenders[:3]}")
-
     cas_needed: Set[str] = collect_cas_placeholders(cj.manim_code_draft)
-    job_ids = {j.get("id") for j in (cj.cas_jobs or [])}
-    if cas_needed and not job_ids:
-        raise HTTPException(status_code=422, detail="CAS placeholders present but ---CAS-JOBS--- is missing.")
-    missing_cas = sorted(list(cas_needed - job_ids))
-    if missing_cas:
-        raise HTTPException(status_code=422, detail=f"CAS placeholders without matching jobs: {missing_cas}")
-
-    # 4) GeoCAS
+    clock.done(geo_placeholders=sorted(geo_needed), cas_placeholders=sorted(cas_needed))
+
+    # 4) GeoCAS (프로세스풀)
+    clock.start("geocas")
     exact = {}
-    if getattr(cj, "constraint_spec", None):
-        exact = run_geocas(constraint_spec=cj.constraint_spec, geometry_hint=geometry_hint)
+    if constraint_spec:
+        exact, geo_stats = await spec.run_geocas(constraint_spec, geometry_hint)
+        metrics.record_geocas_stats(geo_stats)
         # 선언된 포인트가 모두 풀렸는지 체크(선택)
-        declared = set((cj.constraint_spec.get("entities", {}) or {}).get("points", []) or [])
+        declared = set((constraint_spec.get("entities", {}) or {}).get("points", []) or [])
         solved = set((exact.get("points", {}) or {}).keys())
         unsolved = sorted(list(declared - solved))
         if unsolved:
             raise HTTPException(status_code=422, detail=f"GeoCAS could not solve coordinates for: {unsolved}")
 
     geo_repls = build_geo_replacements(exact=exact, hint=geometry_hint, decimals=6)
+    clock.done(exact=exact, geo_replacements=geo_repls)
 
-    # 5) CAS
-    cas_repls: List[Dict[str, Any]] = []
+    # 5) CAS (프로세스풀)
+    clock.start("cas")
+    cas_repls: List[CASResult] = []
     if cj.cas_jobs:
         jobs = [CASJob(**j) for j in cj.cas_jobs]
-        cas_repls = run_cas(jobs)
+        cas_repls, cas_stats = await spec.run_cas(jobs)
+        metrics.record_cas_stats(cas_stats)
+    clock.done(cas_results=[r.model_dump() for r in cas_repls])
 
     # 6) 치환 (on_missing=fail_build)
+    clock.start("fill")
     filled = fill_placeholders(
         draft=cj.manim_code_draft,
         repls=cas_repls,
         geo_replacements=geo_repls,
         on_missing="fail_build",
     )
+    clock.done(manim_code=filled.manim_code_final)
     return filled.manim_code_final
 
 # ──────────────────────────────────────────────────────────
 # E2E 엔드포인트 (유일 권장 경로)
 # ──────────────────────────────────────────────────────────
-@app.post("/e2e", response_model=E2EOutput)
-def e2e(input: E2EInput) -> E2EOutput:
-    doc = _load_problem_from_paths(input.image_path, input.json_path)
-    code = _run_e2e(doc)
-    # 저장(옵션)
+def _save_output(problem_name: str, code: str) -> None:
     out_root = Path("ManimcodeOutput"); out_root.mkdir(exist_ok=True)
-    problem_name = Path(input.image_path).stem if input.image_path else "unknown"
     problem_dir = out_root / problem_name; problem_dir.mkdir(exist_ok=True)
     (problem_dir / f"{problem_name}.py").write_text(code, encoding="utf-8")
     (problem_dir / "README.md").write_text(
         f"# {problem_name} Manim Code\n\n```bash\nmanim {problem_name}.py -pql\n```",
         encoding="utf-8"
     )
-    return E2EOutput(manim_code=code)
+
+async def _run_e2e_cached(doc: ProblemDoc, on_stage: Optional[StageCallback] = None) -> str:
+    cache = _cache()
+    if cache is None:
+        return await _run_e2e(doc, on_stage=on_stage)
+
+    clock = _StageClock(on_stage)
+    clock.start("cache")
+    key = await asyncio.to_thread(_result_cache_key, doc)
+    hit = await asyncio.to_thread(cache.get, key)
+    clock.done(key=key, hit=hit is not None)
+    metrics.CACHE_REQUESTS.inc(cache="e2e", result="hit" if hit is not None else "miss")
+    if hit is not None:
+        return hit["manim_code"]
+
+    code = await _run_e2e(doc, on_stage=on_stage)
+    await asyncio.to_thread(cache.put, key, {"manim_code": code, "created_at": time.time()})
+    return code
+
+async def _e2e_doc(doc: ProblemDoc, problem_name: str, on_stage: Optional[StageCallback] = None) -> str:
+    # MANION_DEBUG 시 ManimcodeOutput/_debug/<problem>/trace.json (Chrome trace) 기록
+    async with tracing.asession(problem_name):
+        code = await _run_e2e_cached(doc, on_stage=on_stage)
+    # 저장(옵션): 파일 I/O 는 스레드에서 (이벤트 루프 비차단)
+    await asyncio.to_thread(_save_output, problem_name, code)
+    return code
+
+async def _e2e_one(input: E2EInput, on_stage: Optional[StageCallback] = None) -> str:
+    doc = await asyncio.to_thread(_load_problem_from_paths, input.image_path, input.json_path)
+    return await _e2e_doc(doc, Path(input.image_path).stem if input.image_path else "unknown", on_stage=on_stage)
+
+@app.post("/e2e", response_model=E2EOutput)
+async def e2e(input: E2EInput) -> E2EOutput:
+    ticket = _admission().try_acquire()
+    try:
+        return E2EOutput(manim_code=await _e2e_one(input))
+    finally:
+        ticket.release()
+
+@app.post("/e2e/upload", response_model=E2EOutput)
+async def e2e_upload(
+    ocr_json: str = Form(...),
+    image: Optional[UploadFile] = File(None),
+    problem_name: Optional[str] = Form(None),
+) -> E2EOutput:
+    """공유 디스크 없이: 이미지 바이트와 OCR JSON을 요청 본문(multipart)으로 받아 메모리에서만 처리."""
+    ticket = _admission().try_acquire()
+    try:
+        try:
+            items = [OCRItem(**it) for it in json.loads(ocr_json)]
+        except Exception as e:
+            raise HTTPException(status_code=422, detail=f"OCR JSON load failed: {e}")
+        image_bytes = await image.read() if image is not None else None
+        doc = ProblemDoc(items=items, image_bytes=image_bytes or None)
+        name = problem_name or (Path(image.filename).stem if image is not None and image.filename else "unknown")
+        return E2EOutput(manim_code=await _e2e_doc(doc, name))
+    finally:
+        ticket.release()
+
+# ──────────────────────────────────────────────────────────
+# 배치 엔드포인트 (동시 실행 상한 + 항목별 결과)
+# ──────────────────────────────────────────────────────────
+@app.post("/e2e/batch", response_model=E2EBatchOutput)
+async def e2e_batch(input: E2EBatchInput) -> E2EBatchOutput:
+    ctl = _admission()
+    if len(input.items) > ctl.max_queue:
+        raise HTTPException(
+            status_code=422, detail=f"batch of {len(input.items)} items exceeds admission max_queue {ctl.max_queue}"
+        )
+    # 항목마다 티켓 1개: 한 번에 예약, 항목이 끝날 때마다 하나씩 반납
+    ticket = ctl.try_acquire(len(input.items))
+    try:
+        return await _e2e_batch_admitted(input, ticket)
+    finally:
+        ticket.release()
+
+async def _e2e_batch_admitted(input: E2EBatchInput, ticket: Ticket) -> E2EBatchOutput:
+    limit = int(_server_cfg().get("batch", {}).get("max_concurrency", 8))
+    if input.concurrency:
+        limit = min(limit, input.concurrency)
+    sem = asyncio.Semaphore(max(1, limit))
+
+    async def _one(index: int, item: E2EInput) -> E2EBatchItem:
+        try:
+            async with sem:
+                try:
+                    code = await _e2e_one(item)
+                except Exception as e:
+                    status, error = _error_status(e)
+                    return E2EBatchItem(index=index, ok=False, status_code=status, error=error)
+            return E2EBatchItem(index=index, ok=True, manim_code=code, status_code=200)
+        finally:
+            ticket.release(1)
+
+    results = await asyncio.gather(*(_one(i, it) for i, it in enumerate(input.items)))
+    return E2EBatchOutput(results=list(results))
+
+# ──────────────────────────────────────────────────────────
+# 결과 캐시 무효화
+# ──────────────────────────────────────────────────────────
+@app.post("/cache/invalidate")
+async def invalidate_cache(input: E2EInput) -> Dict[str, Any]:
+    cache = _cache()
+    if cache is None:
+        return {"key": None, "deleted": False}
+    doc = await asyncio.to_thread(_load_problem_from_paths, input.image_path, input.json_path)
+    key = await asyncio.to_thread(_result_cache_key, doc)
+    return {"key": key, "deleted": await asyncio.to_thread(cache.delete, key)}
+
+@app.delete("/cache")
+async def clear_cache() -> Dict[str, Any]:
+    cache = _cache()
+    return {"deleted": await asyncio.to_thread(cache.clear) if cache is not None else 0}
+
+# ──────────────────────────────────────────────────────────
+# 단계별 진행 스트림 (Server-Sent Events)
+# ──────────────────────────────────────────────────────────
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+async def _e2e_event_stream(input: E2EInput, ticket: Ticket) -> AsyncIterator[str]:
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def _runner() -> None:
+        try:
+            code = await _e2e_one(input, on_stage=queue.put_nowait)
+        except Exception as e:
+            status, error = _error_status(e)
+            queue.put_nowait({"status": "error", "status_code": status, "error": error})
+        else:
+            queue.put_nowait({"status": "result", "manim_code": code})
+
+    task = asyncio.create_task(_runner())
+    try:
+        while True:
+            ev = await queue.get()
+            status = ev.get("status")
+            if status == "started":
+                yield _sse("stage_start", ev)
+            elif status == "done":
+                yield _sse("stage", ev)
+            else:
+                yield _sse(status, ev)
+                break
+    finally:
+        # 클라이언트가 끊으면(조기 취소) 남은 단계 중단
+        if not task.done():
+            task.cancel()
+        ticket.release()
+
+@app.post("/e2e/stream")
+async def e2e_stream(input: E2EInput) -> StreamingResponse:
+    ticket = _admission().try_acquire()
+    # 티켓은 스트림이 끝날 때 반납; 생성기가 시작되지도 못하고 응답이 끝나는 경우는 background 가 반납 (중복 반납 없음)
+    return StreamingResponse(
+        _e2e_event_stream(input, ticket),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(ticket.release),
+    )
+
+# ──────────────────────────────────────────────────────────
+# 작업 큐 엔드포인트 (submit / poll)
+# ──────────────────────────────────────────────────────────
+class JobSubmitted(BaseModel):
+    job_id: str
+    status: str
+
+class JobStatus(BaseModel):
+    job_id: str
+    status: str
+    stage: Optional[str] = None
+    manim_code: Optional[str] = None
+    status_code: Optional[int] = None
+    error: Optional[str] = None
+    attempts: int = 0
+    created_at: float
+    updated_at: float
+
+async def _run_job(store: JobStore, job: Dict[str, Any], lease_s: float) -> None:
+    job_id = job["id"]
+
+    async def _heartbeat() -> None:
+        while True:
+            await asyncio.sleep(max(1.0, lease_s / 3))
+            await asyncio.to_thread(store.heartbeat, job_id)
+
+    # 단계 기록: 이벤트 루프에서 SQLite 를 쓰지 않도록 큐에 넣고 한 태스크가 순서대로 스레드에서 기록
+    stages: asyncio.Queue = asyncio.Queue()
+
+    async def _stage_writer() -> None:
+        while (stage := await stages.get()) is not None:
+            await asyncio.to_thread(store.set_stage, job_id, stage)
+
+    def _on_stage(ev: Dict[str, Any]) -> None:
+        if ev["status"] == "started":
+            stages.put_nowait(ev["stage"])
+
+    hb = asyncio.create_task(_heartbeat())
+    writer = asyncio.create_task(_stage_writer())
+    try:
+        try:
+            item = E2EInput(**json.loads(job["payload"]))
+            code = await _e2e_one(item, on_stage=_on_stage)
+        finally:
+            # 남은 단계 기록을 끝낸 뒤 최종 상태 기록 (늦은 set_stage 가 finish 의 stage="done" 을 덮지 않도록)
+            stages.put_nowait(None)
+            await asyncio.gather(writer, return_exceptions=True)
+    except Exception as e:
+        status, error = _error_status(e)
+        await asyncio.to_thread(store.fail, job_id, error, status)
+    else:
+        await asyncio.to_thread(store.finish, job_id, code)
+    finally:
+        hb.cancel()
+
+async def _job_worker(store: JobStore, worker_id: str, jobs_cfg: Dict[str, Any]) -> None:
+    poll_s = float(jobs_cfg.get("poll_interval_s", 0.5))
+    lease_s = float(jobs_cfg.get("lease_s", 120))
+    max_attempts = int(jobs_cfg.get("max_attempts", 3))
+    last_sweep = 0.0
+    loop = asyncio.get_running_loop()
+    while True:
+        # 죽은 워커가 잡고 있던 작업 회수 (lease 절반 주기)
+        if loop.time() - last_sweep > lease_s / 2:
+            await asyncio.to_thread(store.requeue_stale, lease_s, max_attempts)
+            last_sweep = loop.time()
+        job = await asyncio.to_thread(store.claim, worker_id)
+        if job is None:
+            await asyncio.sleep(poll_s)
+            continue
+        await _run_job(store, job, lease_s)
+
+@app.post("/jobs", response_model=JobSubmitted, status_code=202)
+async def submit_job(input: E2EInput) -> JobSubmitted:
+    job_id = await asyncio.to_thread(_job_store().submit, input.model_dump())
+    return JobSubmitted(job_id=job_id, status="queued")
+
+@app.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str) -> JobStatus:
+    job = await asyncio.to_thread(_job_store().get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"job not found: {job_id}")
+    return JobStatus(
+        job_id=job["id"],
+        status=job["status"],
+        stage=job["stage"],
+        manim_code=job["manim_code"],
+        status_code=job["status_code"],
+        error=job["error"],
+        attempts=job["attempts"],
+        created_at=job["created_at"],
+        updated_at=job["updated_at"],
+    )